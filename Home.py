@@ -1,7 +1,6 @@
 import streamlit as st
-import os
-from supabase import create_client
-from dotenv import load_dotenv
+from utils.repository import insert_user_profile
+from utils.supabase_client import session_client
 
 def app(navigate):
     st.set_page_config(page_title="Loanalyze", layout="centered")
@@ -32,9 +31,7 @@ def app(navigate):
             st.session_state.user["full_name"] = full_name
             st.session_state.user["phone_number"] = phone
 
-            # Load Supabase
-            load_dotenv()
-            supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+            supabase = session_client(st.session_state)
 
             # Insert into user_profile table
             profile_data = {
@@ -46,10 +43,7 @@ def app(navigate):
             }
 
             try:
-                insert_response = supabase.table("user_profile").insert(profile_data).execute()
-                if hasattr(insert_response, "error") and insert_response.error:
-                    st.error(f"Failed to save profile: {insert_response.error.message}")
-                    return
+                insert_user_profile(supabase, profile_data)
                 st.success("Role saved successfully!")
                 st.session_state.page = role
                 st.rerun()
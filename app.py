@@ -1,13 +1,16 @@
 import streamlit as st
-import os
-from supabase import create_client
-from dotenv import load_dotenv
+from utils.metrics import start_exporters
+from utils.profiling import profile_render
+from utils.startup import start_warmup, track_render
+from utils.supabase_client import session_client
 
-# Load env
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Load the model and heavy libraries in the background, once per server process
+start_warmup()
+# Publish this process's metrics if an endpoint or file is configured
+start_exporters()
+
+# One client per browser session, on the process-wide connection pool
+supabase = session_client(st.session_state)
 
 # Session defaults
 if "page" not in st.session_state:
@@ -47,21 +50,22 @@ with st.sidebar:
 # Routing
 page = st.session_state.page
 
-if page == "home":
-    import Home; Home.app(navigate)
-elif page == "login":
-    import dashboards.login as login; login.app(supabase, navigate)
-elif page == "register":
-    import dashboards.register as register; register.app(supabase, navigate)
-elif page == "select_role":
-    import dashboards.select_role as select_role; select_role.app(supabase, navigate)
-elif page == "applicant":
-    import dashboards.applicant as applicant; applicant.app(supabase)
-elif page == "bank":
-    import dashboards.bank as bank; bank.app(supabase)
-elif page == "admin":
-    import dashboards.admin as admin; admin.app(supabase)
-elif page == "public":
-    import dashboards.public as public; public.app(supabase)
-else:
-    st.error("Page not found.")
+with track_render(page), profile_render(page, st.session_state.role):
+    if page == "home":
+        import Home; Home.app(navigate)
+    elif page == "login":
+        import dashboards.login as login; login.app(supabase, navigate)
+    elif page == "register":
+        import dashboards.register as register; register.app(supabase, navigate)
+    elif page == "select_role":
+        import dashboards.select_role as select_role; select_role.app(supabase, navigate)
+    elif page == "applicant":
+        import dashboards.applicant as applicant; applicant.app(supabase)
+    elif page == "bank":
+        import dashboards.bank as bank; bank.app(supabase)
+    elif page == "admin":
+        import dashboards.admin as admin; admin.app(supabase)
+    elif page == "public":
+        import dashboards.public as public; public.app(supabase)
+    else:
+        st.error("Page not found.")
@@ -0,0 +1,199 @@
+"""Benchmarks for the bank batch hot paths.
+
+Times preprocessing, model inference, risk banding, profit computation, the
+Excel export, chart aggregation and chart/PDF generation at several batch
+sizes. Batches are
+resampled from ``data/Test Data.csv``, which has the training schema. Each
+stage is timed on its own, then run once more under tracemalloc to record
+its peak memory.
+
+    python -m benchmarks.bench_hot_paths                    # compare to baseline
+    python -m benchmarks.bench_hot_paths --update-baseline  # record a new baseline
+
+Exits non-zero when a stage is slower, or peaks higher, than the baseline by
+more than ``--max-regression``, or when there is no baseline to compare to.
+Baselines depend on the machine and the model, so none is committed: record
+one on a known-good commit on the machine that runs the check.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utils.batch_scoring import (
+    RISK_BANDS,
+    BatchSummary,
+    align_features,
+    assign_risk_band,
+    estimate_profit,
+)
+from utils.chart_data import ChartData
+from utils.model_registry import get_model_bundle
+from utils.parallel_scoring import feature_matrix, predict_default_proba
+from utils.preprocessing import preprocess_input
+from utils.reports import EXCEL_MAX_ROWS, build_pdf_report, render_chart_pngs, write_excel_report
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(BASE_DIR, "data", "Test Data.csv")
+BASELINE = os.path.join(BASE_DIR, "benchmarks", "baseline.json")
+DEFAULT_SIZES = [1_000, 28_000, 280_000, 1_000_000]
+STAGES = ["preprocess", "inference", "risk_band", "profit", "excel", "chart_data", "charts_pdf"]
+
+# differences below these are treated as noise
+MIN_SECONDS_DELTA = 0.005
+MIN_BYTES_DELTA = 1 << 20
+
+
+def make_batch(fixture: pd.DataFrame, rows: int) -> pd.DataFrame:
+    batch = fixture.sample(n=rows, replace=len(fixture) < rows, random_state=rows).reset_index(drop=True)
+    batch["Requested Loan Amount"] = np.random.default_rng(rows).integers(50_000, 5_000_000, rows)
+    return batch
+
+
+def stage_functions(bundle, batch, work_dir):
+    """Stage name -> zero-argument callable. Each stage's inputs are prepared up front."""
+    processed = align_features(preprocess_input(batch, bundle.encoder_table), bundle.feature_names)
+    X = feature_matrix(processed)
+    probs = predict_default_proba(bundle, X)
+
+    scored = batch.copy()
+    scored["default_probability"] = probs
+    scored["risk_band"] = assign_risk_band(probs)
+    scored["loan_amount"] = scored["Requested Loan Amount"]
+    scored["estimated_profit"] = estimate_profit(scored["default_probability"], scored["loan_amount"])
+    results_path = os.path.join(work_dir, f"results_{len(batch)}.csv")
+    scored.to_csv(results_path, index=False)
+
+    summary = BatchSummary()
+    summary.update(scored)
+
+    def charts_pdf():
+        build_pdf_report(summary, render_chart_pngs(summary.chart_data))
+
+    stages = {
+        "preprocess": lambda: align_features(preprocess_input(batch, bundle.encoder_table), bundle.feature_names),
+        "inference": lambda: predict_default_proba(bundle, feature_matrix(processed)),
+        "risk_band": lambda: assign_risk_band(probs),
+        "profit": lambda: estimate_profit(scored["default_probability"], scored["loan_amount"]),
+        "chart_data": lambda: ChartData.from_frame(scored, RISK_BANDS),
+        "charts_pdf": charts_pdf,
+    }
+    if len(batch) <= EXCEL_MAX_ROWS:
+        excel_path = os.path.join(work_dir, f"report_{len(batch)}.xlsx")
+        stages["excel"] = lambda: write_excel_report(results_path, excel_path, 50_000)
+    return stages
+
+
+def measure(fn, repeats: int) -> dict:
+    timings = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(min(timings), 6), "peak_bytes": int(peak)}
+
+
+def run(sizes, stages, repeats) -> dict:
+    bundle = get_model_bundle()
+    fixture = pd.read_csv(FIXTURE)
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix="loanalyze_bench_")
+    try:
+        for rows in sizes:
+            batch = make_batch(fixture, rows)
+            functions = stage_functions(bundle, batch, work_dir)
+            for stage in stages:
+                if stage not in functions:
+                    continue
+                result = measure(functions[stage], repeats)
+                results[f"{stage}@{rows}"] = result
+                print(f"{stage:>12} {rows:>10,} rows  {result['seconds']:>9.4f} s  "
+                      f"{result['peak_bytes'] / 1024 ** 2:>9.1f} MB", flush=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "model_version": bundle.version,
+        "model_format": bundle.format,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> list:
+    regressions = []
+    for key, result in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        for metric, min_delta in (("seconds", MIN_SECONDS_DELTA), ("peak_bytes", MIN_BYTES_DELTA)):
+            before, after = base[metric], result[metric]
+            if after - before > min_delta and after > before * (1 + max_regression):
+                regressions.append(f"{key} {metric}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bank batch hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed relative slowdown or memory growth (0.2 = 20%%)")
+    parser.add_argument("--out", help="Also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        # a run compared with itself would pass whatever it measured
+        parser.error(f"no baseline at {args.baseline}; record one on a known-good commit with --update-baseline")
+
+    current = run(args.sizes, args.stages, args.repeats)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != current["machine"]:
+        print("Warning: baseline was recorded on a different machine; comparisons may be noisy.")
+    regressions = compare(current, baseline, args.max_regression)
+    if regressions:
+        print("Performance regressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
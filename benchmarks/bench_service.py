@@ -0,0 +1,134 @@
+"""Latency and throughput of the HTTP scoring service.
+
+Drives a running ``service.scoring_api`` with records resampled from
+``data/Test Data.csv``: single-record ``/score`` calls and ``/score/batch``
+calls of several sizes, each at several client concurrencies. Reports
+p50/p95/p99 latency, requests per second and rows per second, and writes them
+to JSON with the machine and server settings, so published figures can always
+be traced to the run that produced them.
+
+    python -m service.scoring_api --workers 4 &
+    python -m benchmarks.bench_service --url http://127.0.0.1:8000 --out service_bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import threading
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(BASE_DIR, "data", "Test Data.csv")
+
+DEFAULT_CONCURRENCY = [1, 4, 16]
+DEFAULT_BATCH_SIZES = [100, 1000]
+
+
+def make_records(rows: int, seed: int = 0) -> list:
+    fixture = pd.read_csv(FIXTURE).drop(columns=["ID"], errors="ignore")
+    rng = np.random.default_rng(seed)
+    sample = fixture.iloc[rng.integers(0, len(fixture), rows)].reset_index(drop=True)
+    sample["Requested Loan Amount"] = rng.integers(50_000, 2_000_000, rows)
+    return json.loads(sample.to_json(orient="records"))
+
+
+def run_load(url: str, path: str, payloads: list, concurrency: int, requests: int) -> dict:
+    """Send ``requests`` POSTs from ``concurrency`` threads, cycling through ``payloads``."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client_loop():
+        with httpx.Client(base_url=url, timeout=60) as client:
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    response = client.post(path, json=payloads[i % len(payloads)])
+                    response.raise_for_status()
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies)
+    ok = len(latencies)
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(ok / elapsed, 2) if elapsed else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2) if ok else None,
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2) if ok else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2) if ok else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the HTTP scoring service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--requests", type=int, default=500, help="Single-record requests per concurrency level")
+    parser.add_argument("--batch-requests", type=int, default=50, help="Batch requests per size and concurrency")
+    parser.add_argument("--out", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    health = httpx.get(f"{args.url}/health", timeout=10).json()
+    records = make_records(max([args.requests, *args.batch_sizes]))
+
+    results = {}
+    for concurrency in args.concurrency:
+        # warm every server worker's connection and caches before measuring
+        run_load(args.url, "/score", records, concurrency, concurrency * 4)
+        result = run_load(args.url, "/score", records, concurrency, args.requests)
+        result["rows_per_second"] = result["requests_per_second"]
+        results[f"single@c{concurrency}"] = result
+
+        for size in args.batch_sizes:
+            payloads = [{"records": records[i:i + size]} for i in range(0, len(records) - size + 1, size)]
+            result = run_load(args.url, "/score/batch", payloads, concurrency, args.batch_requests)
+            result["rows_per_second"] = round(result["requests_per_second"] * size, 1) \
+                if result["requests_per_second"] else None
+            results[f"batch{size}@c{concurrency}"] = result
+
+    print(f"{'case':<18} {'req/s':>9} {'rows/s':>11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for case, r in results.items():
+        print(f"{case:<18} {r['requests_per_second'] or 0:>9,.1f} {r['rows_per_second'] or 0:>11,.1f} "
+              f"{r['p50_ms'] or 0:>9.2f} {r['p95_ms'] or 0:>9.2f} {r['p99_ms'] or 0:>9.2f} {r['errors']:>7}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "machine": {
+                    "platform": platform.platform(),
+                    "python": platform.python_version(),
+                    "cpu_count": os.cpu_count(),
+                },
+                "server": health,
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,26 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from supabase import Client
+from utils.metrics import metrics, span
+from utils.micro_batcher import micro_batcher
+from utils.model_registry import model_stats
+from utils.concurrent_fetch import fetch_all, timings_frame
+from utils.prediction_cache import prediction_cache
+from utils.profiling import PROFILERS, arm, armed, list_profiles, note_input, profile_path
+from utils.job_queue import job_queue
+from utils.query_cache import query_cache
+from utils.report_cache import report_cache
+from utils.submission_mirror import load_submissions, submission_mirrors
+from utils.startup import page_timings, uptime_seconds, warmup_report
+from utils.supabase_client import pool_stats
+from utils.repository import (
+    fetch_audit_log_daily_counts,
+    fetch_audit_log_page,
+    fetch_bank_uploads,
+    fetch_profile_names,
+    fetch_user_profiles,
+    iter_audit_logs,
+)
 
 
 def app(supabase: Client):
@@ -22,15 +41,135 @@ def app(supabase: Client):
 
     st.success(f"Welcome, {user.get('full_name', 'Admin')}")
 
+    # ==============================
+    # 🧠 Model Registry & Runtime
+    # ==============================
+    with st.expander("Model Registry & Runtime"):
+        stats = model_stats()
+        if "version" not in stats:
+            st.info("Model not loaded in this server process yet.")
+        else:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Model Version", stats["version"])
+            col2.metric("Load Time", f"{stats['load_seconds']:.2f} s")
+            col3.metric("Memory Footprint", f"{stats['memory_bytes'] / 1024 ** 2:,.1f} MB")
+            st.caption(f"Format: {stats['format']} • Loads: {stats['loads']} • Hot reloads: {stats['reloads']}")
+        if stats.get("last_error"):
+            st.warning(f"Last reload failed: {stats['last_error']}")
+
+        cache = prediction_cache.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Prediction Cache Hit Rate", f"{cache['hit_rate'] * 100:.1f}%")
+        col2.metric("Cache Hits / Misses", f"{cache['hits']:,} / {cache['misses']:,}")
+        col3.metric("Cached Predictions", f"{cache['entries']:,} / {cache['max_entries']:,}")
+
+        batching = micro_batcher.stats()
+        st.caption(f"Micro-batching (≤ {batching['max_rows']} rows, ≤ {batching['max_wait_ms']:g} ms): "
+                   f"{batching['rows']:,} rows in {batching['batches']:,} batches • "
+                   f"Mean batch {batching['mean_batch_rows']:.1f} rows (p95 {batching['p95_batch_rows']:.0f}) • "
+                   f"Mean wait {batching['mean_wait_ms']:.2f} ms • Queue depth {batching['queue_depth']} "
+                   f"(max {batching['max_queue_depth']})")
+
+        queries = query_cache.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Query Cache Hit Rate", f"{queries['hit_rate'] * 100:.1f}%")
+        col2.metric("Query Hits / Misses", f"{queries['hits'] + queries['coalesced']:,} / {queries['misses']:,}")
+        col3.metric("Query Cache Memory", f"{queries['nbytes'] / 1024 ** 2:,.1f} / {queries['max_bytes'] / 1024 ** 2:,.0f} MB")
+        st.caption(f"Cached queries: {queries['entries']} • Shared in-flight fetches: {queries['coalesced']:,} • "
+                   f"Evictions: {queries['evictions']:,} • Invalidated: {queries['invalidations']:,}")
+
+        mirror = submission_mirrors.for_client(supabase).stats()
+        mirrors = submission_mirrors.stats()
+        st.caption(f"Submissions mirror (your view): {mirror['rows']:,} rows in {mirror['parts']} part(s) • "
+                   f"Last sync: {mirror['last_sync_rows']:,} new rows in {mirror['last_sync_seconds']:.2f} s • "
+                   f"Identities mirrored: {mirrors['identities']}, {mirrors['loaded']} of at most "
+                   f"{mirrors['max_loaded']} in memory, {mirrors['memory_bytes'] / 1024 ** 2:,.1f} MB")
+        if mirror["last_error"]:
+            st.warning(f"Last mirror sync failed: {mirror['last_error']}")
+
+        jobs = job_queue.stats()
+        reports = report_cache.stats()
+        st.caption(f"Batch jobs: {jobs['queued']:,} queued, {jobs['running']:,} running, {jobs['done']:,} done, "
+                   f"{jobs['failed']:,} failed • Cached reports: {reports['entries']}, "
+                   f"{reports['nbytes'] / 1024 ** 2:,.1f} / {reports['max_bytes'] / 1024 ** 2:,.0f} MB, "
+                   f"hit rate {reports['hit_rate'] * 100:.1f}%")
+
+        pool = pool_stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Connection Reuse", f"{pool['reuse_rate'] * 100:.1f}%")
+        col2.metric("Supabase Requests", f"{pool['requests']:,}")
+        col3.metric("Connections Opened", f"{pool['connections_opened']:,}")
+        st.caption(f"TLS handshakes: {pool['tls_handshakes']:,} • Clients created: {pool['clients_created']:,}")
+
+        warmup = warmup_report()
+        warmup_text = f"Warmup {warmup['state']}"
+        if warmup["state"] == "done":
+            warmup_text += f" in {warmup['seconds']:.2f} s"
+        if warmup["tasks"]:
+            warmup_text += " (" + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in warmup["tasks"].items()) + ")"
+        st.caption(f"Server up {uptime_seconds() / 60:,.1f} min • {warmup_text}")
+        for name, error in warmup["errors"].items():
+            st.warning(f"Warmup of {name} failed: {error}")
+
+        timings = pd.DataFrame(page_timings())
+        if not timings.empty:
+            st.caption("Page render times in this server process (the first render includes importing the page)")
+            st.dataframe(timings.round(3), use_container_width=True)
+
+        stages = pd.DataFrame([
+            {"stage": stage, "count": entry["count"], "mean_seconds": entry["mean"], "total_seconds": entry["sum"]}
+            for stage, entry in sorted(metrics.snapshot().items())
+        ])
+        if not stages.empty:
+            st.caption("Stage timings in this server process (full histograms on the metrics endpoint)")
+            st.dataframe(stages.round(4), use_container_width=True)
+
+        st.caption("Profile the next render of a page in this server process, by whichever session renders it next")
+        col1, col2, col3 = st.columns([2, 2, 1])
+        profile_page = col1.selectbox("Page", ["bank", "admin", "public", "applicant"], key="profile_page")
+        profiler = col2.selectbox("Profiler", PROFILERS, key="profile_profiler")
+        if col3.button("Profile Next Render"):
+            arm(profile_page, profiler)
+        pending = armed()
+        if pending:
+            st.caption("Waiting to profile: " + ", ".join(f"{page} ({name})" for page, name in pending.items()))
+
+        profiles = list_profiles()
+        if profiles:
+            st.dataframe(pd.DataFrame([
+                {"started": pd.Timestamp(p["started_at"], unit="s"), "page": p["page"], "role": p["role"],
+                 "input": ", ".join(f"{k}={v:,}" for k, v in p["input"].items()), "profiler": p["profiler"],
+                 "seconds": p["seconds"], "profile": p["profile"]}
+                for p in profiles
+            ]), use_container_width=True)
+            chosen = st.selectbox("Profile", [p["profile"] for p in profiles], key="profile_download")
+            tags = next(p for p in profiles if p["profile"] == chosen)
+            try:
+                with open(profile_path(tags["summary"])) as f:
+                    st.code(f.read())
+                with open(profile_path(chosen), "rb") as f:
+                    st.download_button("⬇ Download Profile", data=f.read(), file_name=chosen)
+            except OSError as e:
+                st.warning(f"Profile is no longer available: {e}")
+
     try:
+        with st.spinner("Loading dashboard data..."), span("admin.fetch"):
+            results = fetch_all({
+                "users": lambda: fetch_user_profiles(supabase),
+                "submissions": lambda: load_submissions(supabase),
+                "uploads": lambda: fetch_bank_uploads(supabase),
+                "audit_log_counts": lambda: fetch_audit_log_daily_counts(supabase),
+            })
+
         # ==============================
         # 👥 Registered Users
         # ==============================
         st.subheader("👥 Registered Users")
-        users_resp = supabase.table("user_profile").select("*").execute()
-        users_df = pd.DataFrame(users_resp.data)
+        users_df = results["users"].value
 
-        if users_df.empty:
+        if not results["users"].ok:
+            st.warning(f"Could not load users: {results['users'].error}")
+        elif users_df.empty:
             st.info("No registered users found.")
         else:
             role_filter = st.selectbox("Filter by Role", ["All"] + sorted(users_df["role"].dropna().unique()))
@@ -48,12 +187,14 @@ def app(supabase: Client):
         # 📄 Applicant Submissions
         # ==============================
         st.subheader("📄 Applicant Submissions")
-        subs_resp = supabase.table("applicant_submissions").select("*").execute()
-        subs_df = pd.DataFrame(subs_resp.data)
+        subs_df = results["submissions"].value
 
-        if subs_df.empty:
+        if not results["submissions"].ok:
+            st.warning(f"Could not load submissions: {results['submissions'].error}")
+        elif subs_df.empty:
             st.info("No applicant submissions yet.")
         else:
+            note_input(submissions=len(subs_df))
             st.dataframe(subs_df, use_container_width=True)
             st.download_button(
                 label="⬇ Download Submissions CSV",
@@ -64,18 +205,19 @@ def app(supabase: Client):
             st.markdown("###Submissions Stats")
             st.metric("Total Submissions", len(subs_df))
             st.metric("Average Loan Amount", f"₹ {subs_df['loan_amount'].mean():,.2f}")
-            st.metric("Low Risk Count", sum(subs_df['risk_band'] == 'Low'))
-            st.metric("Medium Risk Count", sum(subs_df['risk_band'] == 'Medium'))
-            st.metric("High Risk Count", sum(subs_df['risk_band'] == 'High'))
+            st.metric("Low Risk Count", int((subs_df['risk_band'] == 'Low').sum()))
+            st.metric("Medium Risk Count", int((subs_df['risk_band'] == 'Medium').sum()))
+            st.metric("High Risk Count", int((subs_df['risk_band'] == 'High').sum()))
 
         # ==============================
         # 🏦 Bank Uploads
         # ==============================
         st.subheader("Bank Uploads")
-        uploads_resp = supabase.table("bank_uploads").select("*").execute()
-        uploads_df = pd.DataFrame(uploads_resp.data)
+        uploads_df = results["uploads"].value
 
-        if uploads_df.empty:
+        if not results["uploads"].ok:
+            st.warning(f"Could not load bank uploads: {results['uploads'].error}")
+        elif uploads_df.empty:
             st.info("No bank uploads yet.")
         else:
             st.dataframe(uploads_df, use_container_width=True)
@@ -89,49 +231,67 @@ def app(supabase: Client):
         # 📜 Audit Logs
         # ==============================
         st.subheader("Audit Logs")
-        logs_resp = supabase.table("audit_logs").select("*").execute()
-        logs_df = pd.DataFrame(logs_resp.data)
+        counts = results["audit_log_counts"].value
 
-        if logs_df.empty:
+        if not results["audit_log_counts"].ok:
+            st.warning(f"Could not load audit logs: {results['audit_log_counts'].error}")
+        elif counts.empty:
             st.info("No audit logs found.")
         else:
-            # Merge user names if possible
-            if not users_df.empty:
-                logs_df = logs_df.merge(
-                    users_df[["user_id", "full_name"]],
-                    left_on="user_id",
-                    right_on="user_id",
-                    how="left"
-                )
-
             # Filters
-            actions = logs_df['action'].dropna().unique().tolist()
+            actions = sorted(counts['action'].dropna().unique().tolist())
             selected_actions = st.multiselect("Filter by Action", actions, default=actions)
 
-            statuses = logs_df['status'].dropna().unique().tolist()
+            statuses = sorted(counts['status'].dropna().unique().tolist())
             selected_statuses = st.multiselect("Filter by Status", statuses, default=statuses)
 
-            logs_df['created_at'] = pd.to_datetime(logs_df['created_at'])
-            min_date = logs_df['created_at'].min().date()
-            max_date = logs_df['created_at'].max().date()
+            min_date = counts['day'].min()
+            max_date = counts['day'].max()
             date_range = st.date_input("Date Range", [min_date, max_date])
+            start_day = date_range[0]
+            end_day = date_range[1] if len(date_range) > 1 else date_range[0]
 
-            filtered_logs = logs_df[
-                logs_df['action'].isin(selected_actions) &
-                logs_df['status'].isin(selected_statuses) &
-                (logs_df['created_at'].dt.date >= date_range[0]) &
-                (logs_df['created_at'].dt.date <= date_range[1])
-            ]
+            # Keyset pagination: the stack holds the cursor each visited page started after
+            filters = (tuple(selected_actions), tuple(selected_statuses), start_day, end_day)
+            if st.session_state.get("audit_filters") != filters:
+                st.session_state["audit_filters"] = filters
+                st.session_state["audit_cursors"] = [None]
+            cursors = st.session_state["audit_cursors"]
+
+            with span("admin.audit_page"):
+                page_df, next_cursor = fetch_audit_log_page(
+                    supabase, selected_actions, selected_statuses, start_day, end_day, cursor=cursors[-1]
+                )
+
+                # Resolve names for the visible page only
+                if not page_df.empty and "user_id" in page_df.columns:
+                    names = fetch_profile_names(supabase, page_df["user_id"])
+                    page_df = page_df.merge(names, on="user_id", how="left")
+
+            st.dataframe(page_df, use_container_width=True)
 
-            st.dataframe(filtered_logs, use_container_width=True)
+            col1, col2, col3 = st.columns([1, 2, 1])
+            if col1.button("◀ Newer", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+            col2.caption(f"Page {len(cursors)}")
+            if col3.button("Older ▶", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
 
             # Trend chart
-            trend = filtered_logs.groupby(
-                [filtered_logs['created_at'].dt.date, 'action']
-            ).size().reset_index(name="Count")
+            filtered_counts = counts[
+                counts['action'].isin(selected_actions) &
+                counts['status'].isin(selected_statuses) &
+                (counts['day'] >= start_day) &
+                (counts['day'] <= end_day)
+            ]
+            trend = filtered_counts.groupby(['day', 'action'])['count'].sum().reset_index()
             trend.columns = ["Date", "Action", "Count"]
 
             if not trend.empty:
+                import plotly.express as px
+
                 fig = px.bar(
                     trend,
                     x="Date",
@@ -142,11 +302,18 @@ def app(supabase: Client):
                 )
                 st.plotly_chart(fig, use_container_width=True)
 
-            st.download_button(
-                label="⬇ Download Logs CSV",
-                data=filtered_logs.to_csv(index=False),
-                file_name="audit_logs.csv"
-            )
+            if st.button("Prepare Logs CSV"):
+                with span("admin.audit_export"):
+                    pages = list(iter_audit_logs(supabase, selected_actions, selected_statuses, start_day, end_day))
+                export_df = pd.concat(pages, ignore_index=True) if pages else pd.DataFrame()
+                st.download_button(
+                    label="⬇ Download Logs CSV",
+                    data=export_df.to_csv(index=False),
+                    file_name="audit_logs.csv"
+                )
+
+        with st.expander("Query timings"):
+            st.dataframe(timings_frame(results), use_container_width=True)
 
     except Exception as e:
         st.error(f"Error loading dashboard: {e}")
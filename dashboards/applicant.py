@@ -1,13 +1,11 @@
 import streamlit as st
 import numpy as np
-import pickle
-import os
 from supabase import Client
-from dotenv import load_dotenv
-import pandas as pd
-from fpdf import FPDF
 import tempfile
-from io import BytesIO
+from utils.metrics import inc, span
+from utils.model_registry import get_model_bundle
+from utils.prediction_cache import predict_cached
+from utils.repository import fetch_user_submissions, insert_submission
 
 def app(supabase: Client):
     st.set_page_config(page_title="Applicant Dashboard", layout="centered")
@@ -25,21 +23,18 @@ def app(supabase: Client):
     st.title(f"Applicant Dashboard — Welcome, {user.get('full_name', 'User')}")
     st.write("Fill in your loan application details:")
 
-    # Load model and encoders
-    BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-    with open(os.path.join(BASE_DIR, "model", "loan_model.pkl"), "rb") as f:
-        model = pickle.load(f)
-
-    with open(os.path.join(BASE_DIR, "model", "label_encoders.pkl"), "rb") as f:
-        label_encoders = pickle.load(f)
+    # Shared model and encoders (loaded once per server process)
+    with span("applicant.model_load"):
+        bundle = get_model_bundle()
+    encoders = bundle.encoder_table
 
     # Fetch class options
-    marital_status = st.selectbox("Marital Status", label_encoders["marital_status"].classes_)
-    house_ownership = st.selectbox("House Ownership", label_encoders["House_Ownership"].classes_)
-    car_ownership = st.selectbox("Car Ownership", label_encoders["Car_Ownership"].classes_)
-    profession = st.selectbox("Profession", label_encoders["Profession"].classes_)
-    city = st.selectbox("City", label_encoders["CITY"].classes_)
-    state = st.selectbox("State", label_encoders["STATE"].classes_)
+    marital_status = st.selectbox("Marital Status", encoders.classes("marital_status"))
+    house_ownership = st.selectbox("House Ownership", encoders.classes("House_Ownership"))
+    car_ownership = st.selectbox("Car Ownership", encoders.classes("Car_Ownership"))
+    profession = st.selectbox("Profession", encoders.classes("Profession"))
+    city = st.selectbox("City", encoders.classes("CITY"))
+    state = st.selectbox("State", encoders.classes("STATE"))
 
     income = st.number_input("Monthly Income", min_value=1000)
     age = st.number_input("Age", min_value=18)
@@ -56,19 +51,21 @@ def app(supabase: Client):
     if st.button("Predict & Submit"):
         try:
             # Encode values
-            marital_status_enc = label_encoders["marital_status"].transform([marital_status])[0]
-            house_ownership_enc = label_encoders["House_Ownership"].transform([house_ownership])[0]
-            car_ownership_enc = label_encoders["Car_Ownership"].transform([car_ownership])[0]
-            profession_enc = label_encoders["Profession"].transform([profession])[0]
-            city_enc = label_encoders["CITY"].transform([city])[0]
-            state_enc = label_encoders["STATE"].transform([state])[0]
-
-            input_data = np.array([[income, age, experience, marital_status_enc,
-                                    house_ownership_enc, car_ownership_enc, profession_enc,
-                                    city_enc, state_enc, job_years, house_years]])
-
-            prediction = model.predict(input_data)[0]
-            default_prob = round(model.predict_proba(input_data)[0][1], 2)
+            with span("applicant.encode"):
+                marital_status_enc = encoders.encode_value("marital_status", marital_status)
+                house_ownership_enc = encoders.encode_value("House_Ownership", house_ownership)
+                car_ownership_enc = encoders.encode_value("Car_Ownership", car_ownership)
+                profession_enc = encoders.encode_value("Profession", profession)
+                city_enc = encoders.encode_value("CITY", city)
+                state_enc = encoders.encode_value("STATE", state)
+
+                input_data = np.array([[income, age, experience, marital_status_enc,
+                                        house_ownership_enc, car_ownership_enc, profession_enc,
+                                        city_enc, state_enc, job_years, house_years]])
+
+            with span("applicant.predict"):
+                prediction, proba = predict_cached(bundle, input_data)
+            default_prob = round(proba[1], 2)
 
             if default_prob < 0.3:
                 risk_band = "Low"
@@ -110,28 +107,33 @@ def app(supabase: Client):
                 "feature_importance": feature_importance
             }
 
-            response = supabase.table("applicant_submissions").insert(insert_data).execute()
-
-            if hasattr(response, "error") and response.error:
-                st.error(f"Failed to save submission: {response.error.message}")
+            try:
+                with span("applicant.insert"):
+                    insert_submission(supabase, insert_data)
+            except Exception as e:
+                st.error(f"Failed to save submission: {e}")
             else:
+                inc("loanalyze_applicant_submissions_total", risk_band=risk_band)
                 st.success("Submission saved successfully!")
 
                 # Generate PDF summary
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial", size=12)
-                pdf.cell(200, 10, txt="Loan Application Summary", ln=True, align='C')
-                pdf.ln(10)
+                with span("applicant.pdf"):
+                    from fpdf import FPDF
+
+                    pdf = FPDF()
+                    pdf.add_page()
+                    pdf.set_font("Arial", size=12)
+                    pdf.cell(200, 10, txt="Loan Application Summary", ln=True, align='C')
+                    pdf.ln(10)
 
-                for k, v in insert_data.items():
-                    pdf.cell(200, 10, txt=f"{k.replace('_', ' ').title()}: {v}", ln=True)
+                    for k, v in insert_data.items():
+                        pdf.cell(200, 10, txt=f"{k.replace('_', ' ').title()}: {v}", ln=True)
 
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                    pdf.output(tmp_file.name)
-                    tmp_file.seek(0)
-                    pdf_bytes = tmp_file.read()
-                    st.download_button("Download PDF Summary", data=pdf_bytes, file_name="loan_summary.pdf", mime="application/pdf")
+                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+                        pdf.output(tmp_file.name)
+                        tmp_file.seek(0)
+                        pdf_bytes = tmp_file.read()
+                st.download_button("Download PDF Summary", data=pdf_bytes, file_name="loan_summary.pdf", mime="application/pdf")
 
         except Exception as e:
             st.error(f"Prediction failed: {e}")
@@ -140,9 +142,9 @@ def app(supabase: Client):
     st.markdown("---")
     st.subheader("Submission History")
     try:
-        history = supabase.table("applicant_submissions").select("*").eq("user_id", user["user_id"]).execute()
-        if hasattr(history, "data") and history.data:
-            df = pd.DataFrame(history.data)
+        with span("applicant.history"):
+            df = fetch_user_submissions(supabase, user["user_id"])
+        if not df.empty:
             st.dataframe(df)
             csv = df.to_csv(index=False).encode('utf-8')
             st.download_button("⬇ Download History as CSV", data=csv, file_name="submission_history.csv")
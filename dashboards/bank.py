@@ -1,45 +1,33 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import pickle
 import os
-import uuid
-from io import BytesIO
 from supabase import Client
-import matplotlib.pyplot as plt
-from fpdf import FPDF
+from utils.batch_scoring import read_results_preview, read_upload_preview
+from utils.config import JOB_STATUS_REFRESH_SECONDS, RESULTS_PREVIEW_ROWS
+from utils.job_queue import FAILED, job_queue
+from utils.job_worker import start_embedded_workers
+from utils.model_registry import get_model_bundle
+from utils.profiling import note_input
+from utils.report_cache import RESULTS_FILE, report_cache
+from utils.repository import SUBMISSION_BANK_COLUMNS, get_user_profile
+from utils.submission_mirror import load_submissions
 
 
 def app(supabase: Client = None):
     st.set_page_config(page_title="Loan Risk Prediction & Bank Dashboard", layout="wide")
 
     try:
-        with open("model/loan_model.pkl", "rb") as f:
-            model = pickle.load(f)
-        with open("model/label_encoders.pkl", "rb") as f:
-            label_encoders = pickle.load(f)
+        get_model_bundle()
     except Exception as e:
         st.error(f"Failed to load model or encoders: {e}")
         return
 
-    def preprocess_input(df):
-        df = df.copy()
-        df.rename(columns={
-            "Married/Single": "marital_status",
-            "CURRENT_JOB_YRS": "job_years",
-            "CURRENT_HOUSE_YRS": "house_years"
-        }, inplace=True)
-
-        for col in df.select_dtypes(include="object").columns:
-            if col in label_encoders:
-                le = label_encoders[col]
-                df[col] = df[col].map(lambda x: le.transform([x])[0] if x in le.classes_ else -1)
-            else:
-                df[col] = -1
-        return df
-
-    def find_column_by_name(possible_names, df_columns):
-        return next((col for col in df_columns if col.strip().lower() in [n.lower() for n in possible_names]), None)
+    # scoring runs on job workers; this only starts the ones hosted in this process
+    try:
+        start_embedded_workers()
+    except Exception as e:
+        st.error(f"Failed to start the batch job workers: {e}")
+        return
 
     if supabase:
         if "user" not in st.session_state:
@@ -51,9 +39,9 @@ def app(supabase: Client = None):
             user_uid = session.user.id
 
             try:
-                res = supabase.table("user_profiles").select("*").eq("user_id", user_uid).single().execute()
-                if res.data:
-                    st.session_state["user"] = res.data
+                profile = get_user_profile(supabase, user_uid)
+                if profile:
+                    st.session_state["user"] = profile
                 else:
                     st.error("User profile not found. Please contact admin.")
                     st.stop()
@@ -70,21 +58,18 @@ def app(supabase: Client = None):
 
         try:
             st.subheader("Applicant Submissions")
-            response = supabase.table("applicant_submissions").select("*").execute()
-            data = response.data
-            if not data:
+            df = load_submissions(supabase, SUBMISSION_BANK_COLUMNS)
+            note_input(submissions=len(df))
+            if df.empty:
                 st.info("No applicant submissions available.")
             else:
-                df = pd.DataFrame(data)
-                if "created_at" in df.columns:
-                    df["created_at"] = pd.to_datetime(df["created_at"])
-                    df = df.sort_values(by="created_at", ascending=False)
+                df = df.sort_values(by="created_at", ascending=False)
                 st.dataframe(df, use_container_width=True)
 
                 st.subheader("Profit Analysis")
-                st.metric("Total Estimated Profit", f"₹ {df.get('estimated_profit', pd.Series(dtype=float)).sum():,.2f}")
-                st.metric("Average Default Probability", f"{df.get('default_probability', pd.Series(dtype=float)).mean() * 100:.2f}%")
-                st.metric("High Risk Applicants", (df.get("risk_band") == "High").sum())
+                st.metric("Total Estimated Profit", f"₹ {df['estimated_profit'].sum():,.2f}")
+                st.metric("Average Default Probability", f"{df['default_probability'].mean() * 100:.2f}%")
+                st.metric("High Risk Applicants", (df["risk_band"] == "High").sum())
         except Exception as e:
             st.error(f"Error loading data: {e}")
 
@@ -94,131 +79,103 @@ def app(supabase: Client = None):
         notes = st.text_input("Optional Notes about this upload")
 
         if uploaded_batch:
+            note_input(upload_bytes=uploaded_batch.size)
             try:
-                df = pd.read_csv(uploaded_batch) if uploaded_batch.name.endswith(".csv") else pd.read_excel(uploaded_batch)
+                preview = read_upload_preview(uploaded_batch, uploaded_batch.name)
                 st.write("🔍 Preview of uploaded data:")
-                st.dataframe(df.head())
+                st.dataframe(preview)
 
                 if st.button("🔎 Run Predictions"):
-                    df_processed = preprocess_input(df)
-                    for col in set(model.feature_names_in_) - set(df_processed.columns):
-                        df_processed[col] = 0
-                    df_processed = df_processed[model.feature_names_in_]
-                    probs = model.predict_proba(df_processed)[:, 1]
-
-                    df["default_probability"] = probs
-                    df["risk_band"] = pd.cut(probs, bins=[-1, 0.33, 0.66, 1], labels=["Low", "Medium", "High"])
-
-                    loan_col = find_column_by_name(["Requested Loan Amount", "loan_amount", "Loan_Amount"], df.columns)
-                    df["loan_amount"] = pd.to_numeric(df[loan_col], errors="coerce") if loan_col else 0
-                    df["loan_amount"] = df["loan_amount"].fillna(0)
-                    df["estimated_profit"] = (1 - df["default_probability"]) * df["loan_amount"]
-
-                    st.success("Predictions completed!")
-                    st.dataframe(df)
-
-                    upload_id = str(uuid.uuid4())
-                    user_id = user.get("user_id")
-                    try:
-                        supabase.table("bank_uploads").insert({
-                            "id": upload_id,
-                            "user_id": user_id,
-                            "original_filename": uploaded_batch.name,
-                            "notes": str(notes),
-                            "total_clients": int(len(df)),
-                            "low_risk_count": int((df["risk_band"] == "Low").sum()),
-                            "medium_risk_count": int((df["risk_band"] == "Medium").sum()),
-                            "high_risk_count": int((df["risk_band"] == "High").sum())
-                        }).execute()
-                    except Exception as e:
-                        st.error(f"Upload metadata save failed: {e}")
-                        return
-
-                    for i, row in df.iterrows():
-                        try:
-                            supabase.table("bank_clients").insert({
-                                "id": str(uuid.uuid4()),
-                                "bank_upload_id": upload_id,
-                                "processed_by": user_id,
-                                "monthly_income": int(row.get("Monthly Income", 0)),
-                                "cibil_score": int(row.get("CIBIL Score", 0)),
-                                "requested_loan_amount": int(row.get(loan_col, 0)) if loan_col else 0,
-                                "risk_band": row.get("risk_band", None),
-                                "feature_importance": {}
-                            }).execute()
-                        except Exception as e:
-                            st.warning(f"Failed to insert row {i}: {e}")
-
-                    st.markdown("### Analytical Visualizations")
-
-                    # Pie Chart
-                    fig1, ax1 = plt.subplots(figsize=(5, 5))
-                    df["risk_band"].value_counts().plot.pie(
-                        autopct="%1.1f%%", startangle=90, ax=ax1, colors=["#28a745", "#ffc107", "#dc3545"]
-                    )
-                    ax1.set_ylabel("")
-                    ax1.set_title("Risk Band Distribution")
-                    st.pyplot(fig1)
-
-                    # Bar Chart
-                    fig2, ax2 = plt.subplots(figsize=(6, 4))
-                    df["risk_band"].value_counts().plot(
-                        kind="bar", ax=ax2, color=["#28a745", "#ffc107", "#dc3545"]
+                    st.session_state.bank_job = job_queue.enqueue(
+                        uploaded_batch, uploaded_batch.name, user.get("user_id"), str(notes)
                     )
-                    ax2.set_title("Applicants per Risk Band")
-                    ax2.set_xlabel("Risk Band")
-                    ax2.set_ylabel("Count")
-                    st.pyplot(fig2)
-
-                    # Histogram
-                    fig3, ax3 = plt.subplots(figsize=(6, 4))
-                    df["default_probability"].plot(kind="hist", bins=20, ax=ax3, color="#007bff")
-                    ax3.set_title("Default Probability Distribution")
-                    ax3.set_xlabel("Default Probability")
-                    ax3.set_ylabel("Frequency")
-                    st.pyplot(fig3)
-
-                    # Loan vs Profit
-                    grouped = df.groupby("risk_band")[["loan_amount", "estimated_profit"]].sum()
-                    fig4, ax4 = plt.subplots(figsize=(6, 4))
-                    grouped.plot(kind="bar", ax=ax4)
-                    ax4.set_title("Total Loan Amount & Estimated Profit by Risk Band")
-                    ax4.set_xlabel("Risk Band")
-                    ax4.set_ylabel("Amount")
-                    st.pyplot(fig4)
-
-                    excel_buffer = BytesIO()
-                    with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-                        df.to_excel(writer, index=False)
-
-                    st.download_button("Download Prediction Report", excel_buffer.getvalue(), "loan_predictions.xlsx")
-
-                    pdf = FPDF()
-                    pdf.add_page()
-                    pdf.set_font("Arial", "B", 16)
-                    pdf.cell(0, 10, "Loan Prediction Report", ln=True, align="C")
-
-                    pdf.set_font("Arial", "", 12)
-                    pdf.cell(0, 10, f"Total Applicants: {len(df)}", ln=True)
-                    pdf.cell(0, 10, f"Low Risk: {(df['risk_band'] == 'Low').sum()}", ln=True)
-                    pdf.cell(0, 10, f"Medium Risk: {(df['risk_band'] == 'Medium').sum()}", ln=True)
-                    pdf.cell(0, 10, f"High Risk: {(df['risk_band'] == 'High').sum()}", ln=True)
-
-                    for fig, name in zip(
-                        [fig1, fig2, fig3, fig4],
-                        ["pie.png", "bar.png", "hist.png", "loan.png"]
-                    ):
-                        fig.savefig(name, bbox_inches="tight")
-                        pdf.add_page()
-                        pdf.image(name, x=15, y=30, w=180)
-
-                    pdf_bytes = pdf.output(dest="S").encode("latin1")
-                    pdf_buffer = BytesIO(pdf_bytes)
-                    st.download_button("Download PDF Report", pdf_buffer, "loan_report.pdf")
 
             except Exception as e:
                 st.error(f"Error processing batch file: {e}")
 
+        show_jobs(user)
+
         if st.button("Log Out"):
             st.session_state.clear()
             st.rerun()
+
+
+def show_jobs(user):
+    """Progress of the user's batch jobs and the results of a finished one."""
+    jobs = job_queue.list_jobs(user.get("user_id"))
+    if not jobs:
+        return
+
+    st.markdown("### Batch Jobs")
+    active = [job.id for job in jobs if not job.finished]
+    if active:
+        st.fragment(run_every=JOB_STATUS_REFRESH_SECONDS)(show_progress)(active)
+
+    finished = [job for job in jobs if job.finished]
+    if not finished:
+        return
+    labels = {
+        job.id: f"{pd.Timestamp(job.created_at, unit='s'):%Y-%m-%d %H:%M} — {job.filename} ({job.state})"
+        for job in finished
+    }
+    ids = list(labels)
+    selected = st.session_state.get("bank_job")
+    job_id = st.selectbox(
+        "Batch results", ids, index=ids.index(selected) if selected in ids else 0, format_func=labels.get
+    )
+    show_result(next(job for job in finished if job.id == job_id))
+
+
+def show_progress(job_ids):
+    """Re-run on its own every few seconds while jobs are queued or running."""
+    for job_id in job_ids:
+        job = job_queue.get(job_id)
+        if job is None or job.finished:
+            # refresh the whole page so the finished job's results show
+            st.rerun()
+        st.progress(job.progress, text=f"{job.filename}: {job.message}")
+
+
+def show_result(job):
+    result = job.result or {}
+    if job.state == FAILED:
+        st.error(f"Batch scoring failed: {job.error}")
+        return
+
+    report_dir = job_queue.report_dir(job.id)
+    st.success(f"Predictions completed for {result['total_rows']:,} rows!")
+    st.write(" • ".join(f"{band}: {count:,}" for band, count in result["band_counts"].items()))
+    if result["failures"]:
+        st.warning(
+            f"{result['failed_rows']:,} of {result['total_rows']:,} client rows could not be saved "
+            f"({len(result['failures'])} of {result['batches']} batches failed)."
+        )
+        st.dataframe(pd.DataFrame(result["failures"]), use_container_width=True)
+
+    try:
+        if result["total_rows"] > RESULTS_PREVIEW_ROWS:
+            st.caption(f"Showing the first {RESULTS_PREVIEW_ROWS:,} of {result['total_rows']:,} rows.")
+        st.dataframe(read_results_preview(os.path.join(report_dir, RESULTS_FILE), RESULTS_PREVIEW_ROWS))
+        artifacts = report_cache.get(job.id, result["content_hash"], report_dir)
+    except FileNotFoundError:
+        st.info("The files for this batch have been cleaned up. Upload it again to rebuild them.")
+        return
+
+    st.markdown("### Analytical Visualizations")
+    for png in artifacts.charts:
+        st.image(png)
+
+    st.download_button("Download PDF Report", artifacts.pdf, "loan_report.pdf")
+    if artifacts.excel_path is None:
+        st.info("Too many rows for an Excel sheet — download the CSV report instead.")
+
+    # the full results are only read from disk when asked for, never kept in memory
+    if st.button("Prepare Prediction Downloads", key=f"prepare_{job.id}"):
+        try:
+            if artifacts.excel_path is not None:
+                with open(artifacts.excel_path, "rb") as f:
+                    st.download_button("Download Prediction Report", f, "loan_predictions.xlsx")
+            with open(artifacts.csv_path, "rb") as f:
+                st.download_button("Download Predictions CSV", f, "loan_predictions.csv")
+        except FileNotFoundError:
+            st.info("The files for this batch have been cleaned up. Upload it again to rebuild them.")
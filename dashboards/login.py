@@ -1,6 +1,7 @@
 import streamlit as st
 from supabase import Client
 from typing import Callable
+from utils.repository import get_user_profile
 
 def app(supabase: Client, navigate: Callable):
     st.set_page_config(page_title="Login", layout="centered")
@@ -28,10 +29,9 @@ def app(supabase: Client, navigate: Callable):
             user_id = user.id
 
             # Fetch user_profile
-            profile_response = supabase.table("user_profile").select("*").eq("user_id", user_id).execute()
+            profile = get_user_profile(supabase, user_id)
 
-            if profile_response.data:
-                profile = profile_response.data[0]
+            if profile:
                 st.session_state['user'] = profile
                 st.session_state['role'] = profile['role']
                 st.success(f"Welcome, {profile['full_name']}!")
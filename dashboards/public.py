@@ -1,7 +1,11 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 from supabase import Client
+from utils.concurrent_fetch import fetch_all, timings_frame
+from utils.metrics import span
+from utils.profiling import note_input
+from utils.repository import count_user_roles
+from utils.rollups import band_counts, client_counts_exact, daily_counts, mean_loan_amount, refresh_rollups, total
 
 def app(supabase: Client):
     st.set_page_config(
@@ -23,88 +27,92 @@ We display:
     """)
 
     try:
-        with st.spinner("Loading all public dashboard data..."):
-            applicants = supabase.table("applicant_submissions").select("*").execute().data
-            users = supabase.table("user_profile").select("*").execute().data
-            uploads = supabase.table("bank_uploads").select("*").execute().data
-            bank_clients = supabase.table("bank_clients").select("*").execute().data
-
-            df_applicants = pd.DataFrame(applicants)
-            df_users = pd.DataFrame(users)
-            df_uploads = pd.DataFrame(uploads)
-            df_clients = pd.DataFrame(bank_clients)
+        with st.spinner("Loading all public dashboard data..."), span("public.fetch"):
+            results = fetch_all({
+                "rollups": lambda: refresh_rollups(supabase),
+                "roles": lambda: count_user_roles(supabase),
+            })
 
         ### 1️⃣ User Stats
         st.subheader("Platform Users Overview")
-        total_users = len(df_users)
-        role_breakdown = df_users["role"].value_counts().reset_index()
-        role_breakdown.columns = ["Role", "Count"]
-
-        col1, col2 = st.columns(2)
-        col1.metric("Total Registered Users", f"{total_users:,}")
-        col2.dataframe(role_breakdown, use_container_width=True)
+        if results["roles"].ok:
+            role_breakdown = results["roles"].value
+            total_users = int(role_breakdown["count"].sum())
+            note_input(users=total_users)
+            role_breakdown = (
+                role_breakdown[role_breakdown["count"] > 0]
+                .sort_values("count", ascending=False, ignore_index=True)
+            )
+            role_breakdown.columns = ["Role", "Count"]
+
+            col1, col2 = st.columns(2)
+            col1.metric("Total Registered Users", f"{total_users:,}")
+            col2.dataframe(role_breakdown, use_container_width=True)
+        else:
+            st.warning(f"User stats are unavailable right now: {results['roles'].error}")
 
         st.markdown("---")
 
-        ### 2️⃣ Applicants: Risk Bands & Loans
-        st.subheader("Applicants — Risk Bands & Loans")
-        if not df_applicants.empty:
-            if "created_at" in df_applicants.columns:
-                df_applicants["created_at"] = pd.to_datetime(df_applicants["created_at"])
-
-            if "risk_band" in df_applicants.columns:
-                risk_counts = df_applicants["risk_band"].value_counts().reset_index()
-                risk_counts.columns = ["Risk Band", "Count"]
-                pie_fig = px.pie(
-                    risk_counts, names="Risk Band", values="Count",
-                    title="Applicant Submissions — Risk Bands",
-                    color="Risk Band",
-                    color_discrete_map={"Low": "green", "Medium": "orange", "High": "red"}
-                )
-                st.plotly_chart(pie_fig, use_container_width=True)
-
-            if "loan_amount" in df_applicants.columns:
-                avg_loan = df_applicants["loan_amount"].mean()
-                st.metric("Average Requested Loan", f"₹ {avg_loan:,.2f}")
-
-            if "created_at" in df_applicants.columns:
-                trend = df_applicants.groupby(df_applicants["created_at"].dt.date).size().reset_index(name="Applications")
-                trend.columns = ["Date", "Applications"]
+        if not results["rollups"].ok:
+            st.warning(f"Activity stats are unavailable right now: {results['rollups'].error}")
+        else:
+            rollups = results["rollups"].value
+
+            ### 2️⃣ Applicants: Risk Bands & Loans
+            st.subheader("Applicants — Risk Bands & Loans")
+            if total(rollups, "applicant_submissions"):
+                risk_counts = band_counts(rollups, "applicant_submissions")
+                if not risk_counts.empty:
+                    pie_fig = px.pie(
+                        risk_counts, names="Risk Band", values="Count",
+                        title="Applicant Submissions — Risk Bands",
+                        color="Risk Band",
+                        color_discrete_map={"Low": "green", "Medium": "orange", "High": "red"}
+                    )
+                    st.plotly_chart(pie_fig, use_container_width=True)
+
+                st.metric("Average Requested Loan", f"₹ {mean_loan_amount(rollups):,.2f}")
+
+                trend = daily_counts(rollups, "applicant_submissions", "Applications")
                 line_fig = px.line(trend, x="Date", y="Applications", markers=True, title="Applications Over Time")
                 st.plotly_chart(line_fig, use_container_width=True)
 
-        else:
-            st.info("No applicant submissions yet.")
+            else:
+                st.info("No applicant submissions yet.")
 
-        st.markdown("---")
+            st.markdown("---")
+
+            ### 3️⃣ Banks: Uploads & Clients
+            st.subheader("Banks — Uploads & Clients Processed")
+
+            total_uploads = total(rollups, "bank_uploads")
+            total_clients = total(rollups, "bank_clients")
+
+            col1, col2 = st.columns(2)
+            col1.metric("Total Bank Uploads", f"{total_uploads:,}")
+            col2.metric("Total Clients Processed", f"{total_clients:,}")
+
+            if total_uploads:
+                trend_uploads = daily_counts(rollups, "bank_uploads", "Uploads")
+                upload_fig = px.line(trend_uploads, x="Date", y="Uploads", markers=True, title="Bank Uploads Over Time")
+                st.plotly_chart(upload_fig, use_container_width=True)
+
+            risk_client_counts = band_counts(rollups, "bank_clients")
+            if not risk_client_counts.empty:
+                bar_fig = px.bar(risk_client_counts, x="Risk Band", y="Count",
+                                 color="Risk Band",
+                                 color_discrete_map={"Low": "green", "Medium": "orange", "High": "red"},
+                                 title="Bank Clients — Risk Band Breakdown")
+                st.plotly_chart(bar_fig, use_container_width=True)
+            if not client_counts_exact():
+                st.caption("Client counts are taken from each upload's summary and may include "
+                           "clients whose records failed to save.")
+
+        with st.expander("Query timings"):
+            st.dataframe(timings_frame(results), use_container_width=True)
 
-        ### 3️⃣ Banks: Uploads & Clients
-        st.subheader("Banks — Uploads & Clients Processed")
-
-        total_uploads = len(df_uploads)
-        total_clients = len(df_clients)
-
-        col1, col2 = st.columns(2)
-        col1.metric("Total Bank Uploads", f"{total_uploads:,}")
-        col2.metric("Total Clients Processed", f"{total_clients:,}")
-
-        if not df_uploads.empty and "created_at" in df_uploads.columns:
-            df_uploads["created_at"] = pd.to_datetime(df_uploads["created_at"])
-            trend_uploads = df_uploads.groupby(df_uploads["created_at"].dt.date).size().reset_index(name="Uploads")
-            trend_uploads.columns = ["Date", "Uploads"]
-            upload_fig = px.line(trend_uploads, x="Date", y="Uploads", markers=True, title="Bank Uploads Over Time")
-            st.plotly_chart(upload_fig, use_container_width=True)
-
-        if not df_clients.empty and "risk_band" in df_clients.columns:
-            risk_client_counts = df_clients["risk_band"].value_counts().reset_index()
-            risk_client_counts.columns = ["Risk Band", "Count"]
-            bar_fig = px.bar(risk_client_counts, x="Risk Band", y="Count",
-                             color="Risk Band",
-                             color_discrete_map={"Low": "green", "Medium": "orange", "High": "red"},
-                             title="Bank Clients — Risk Band Breakdown")
-            st.plotly_chart(bar_fig, use_container_width=True)
-
-        st.success("Dashboard covers all live data!")
+        if all(result.ok for result in results.values()):
+            st.success("Dashboard covers all live data!")
 
     except Exception as e:
         st.error(f"Failed to load dashboard: {e}")
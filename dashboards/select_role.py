@@ -1,6 +1,7 @@
 import streamlit as st
 from supabase import Client
 from typing import Callable
+from utils.repository import insert_user_profile
 
 def app(supabase: Client, navigate: Callable):
     st.set_page_config(page_title="Choose Role", layout="centered")
@@ -32,11 +33,7 @@ def app(supabase: Client, navigate: Callable):
         }
 
         try:
-            insert_response = supabase.table("user_profile").insert(profile_data).execute()
-
-            if hasattr(insert_response, "error") and insert_response.error:
-                st.error(f"Database error: {insert_response.error.message}")
-                return
+            insert_user_profile(supabase, profile_data)
 
             st.session_state["user"] = profile_data
             st.session_state["role"] = role
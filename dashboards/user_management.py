@@ -1,16 +1,11 @@
 import streamlit as st
-import pandas as pd
-from supabase import create_client
-import os
-from dotenv import load_dotenv
+from utils.repository import delete_user_profile, fetch_user_profiles, update_user_role
+from utils.supabase_client import session_client
 
 # --------------------------
-# Load Supabase credentials
+# Supabase client (shared connection pool)
 # --------------------------
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase = session_client(st.session_state)
 
 # --------------------------
 # Page Config
@@ -21,14 +16,11 @@ st.title("User Management Panel")
 # --------------------------
 # Fetch user data
 # --------------------------
-response = supabase.table("user_profile").select("*").execute()
-users = response.data
+df = fetch_user_profiles(supabase)
 
-if not users:
+if df.empty:
     st.info("No users found.")
 else:
-    df = pd.DataFrame(users)
-
     roles = df["role"].dropna().unique().tolist()
     selected_role = st.selectbox("Filter by Role", ["All"] + roles)
     if selected_role != "All":
@@ -45,9 +37,10 @@ else:
 
     if st.button("Update Role"):
         user_id = df[df["email"] == email_to_update]["user_id"].values[0]
-        result = supabase.table("user_profile").update({"role": new_role}).eq("user_id", user_id).execute()
-        if result.get("error"):
-            st.error(f"Failed to update role: {result['error']['message']}")
+        try:
+            update_user_role(supabase, user_id, new_role)
+        except Exception as e:
+            st.error(f"Failed to update role: {e}")
         else:
             st.success(f"Role updated to '{new_role}' for {email_to_update}")
             st.experimental_rerun()
@@ -59,7 +52,7 @@ else:
         email_to_delete = st.selectbox("Select User to Delete", df["email"].tolist(), key="delete")
         if st.button("Delete User"):
             user_id = df[df["email"] == email_to_delete]["user_id"].values[0]
-            supabase.table("user_profile").delete().eq("user_id", user_id).execute()
+            delete_user_profile(supabase, user_id)
             st.warning(f"User {email_to_delete} deleted. Refresh the page to update the list.")
 
 st.markdown("---")
@@ -1,49 +1,187 @@
-import pandas as pd
-import pickle
+"""Train the loan default model.
+
+    python model/train_model.py --data "data/Training Data.csv" --n-estimators 100 --n-jobs -1
+
+Writes loan_model.pkl, label_encoders.pkl, the memory-mapped artifact and a
+JSON run summary (timings, peak memory, model size, metrics) to --output-dir.
+"""
+import argparse
+import datetime
+import json
 import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import classification_report
-
-# Load your dataset
-data = pd.read_csv("../data/Training Data.csv")
-
-# Clean up: Remove unused columns
-X = data.drop(["Id", "Risk_Flag"], axis=1)
-y = data["Risk_Flag"]
-
-# Consistency: Ensure correct column names
-X.rename(columns={
-    "Married/Single": "marital_status",
-    "CURRENT_JOB_YRS": "job_years",
-    "CURRENT_HOUSE_YRS": "house_years"
-}, inplace=True)
-
-# Label encoding
-label_encoders = {}
-for col in X.select_dtypes(include="object").columns:
-    le = LabelEncoder()
-    le.fit(X[col])
-    X[col] = le.transform(X[col])
-    label_encoders[col] = le
-
-# Train/test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Model training
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-# Evaluation
-y_pred = model.predict(X_test)
-print("Classification Report:\n", classification_report(y_test, y_pred))
-
-# Save model
-output_dir = os.path.dirname(__file__)
-with open(os.path.join(output_dir, "loan_model.pkl"), "wb") as f:
-    pickle.dump(model, f)
-with open(os.path.join(output_dir, "label_encoders.pkl"), "wb") as f:
-    pickle.dump(label_encoders, f)
-
-print("Model & encoders saved.")
+from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+from utils.model_artifact import save_artifact
+from utils.preprocessing import COLUMN_RENAMES, EncoderTable
+
+CATEGORICAL_COLUMNS = ["Married/Single", "House_Ownership", "Car_Ownership", "Profession", "CITY", "STATE"]
+
+
+def peak_memory_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def load_training_data(path):
+    """Read the training CSV with categorical and downcast integer columns."""
+    data = pd.read_csv(path, dtype={col: "category" for col in CATEGORICAL_COLUMNS})
+    for col in data.select_dtypes(include="integer").columns:
+        data[col] = pd.to_numeric(data[col], downcast="integer")
+    return data
+
+
+def encode_features(X):
+    """Label-encode categorical columns; codes match LabelEncoder.fit_transform."""
+    label_encoders = {}
+    for col in X.select_dtypes(include="category").columns:
+        le = LabelEncoder()
+        le.classes_ = np.sort(X[col].dropna().unique().astype(object))
+        label_encoders[col] = le
+
+    table = EncoderTable.from_label_encoders(label_encoders)
+    for col in label_encoders:
+        X[col] = pd.to_numeric(table.encode_column(col, X[col]), downcast="integer")
+    return X, label_encoders
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+def train(args):
+    wall_start = time.perf_counter()
+    timings = {}
+
+    # Load your dataset
+    start = time.perf_counter()
+    data = load_training_data(args.data)
+    X = data.drop(["Id", "Risk_Flag"], axis=1)
+    y = data["Risk_Flag"]
+
+    # Consistency: Ensure correct column names
+    X = X.rename(columns=COLUMN_RENAMES)
+
+    # Label encoding
+    X, label_encoders = encode_features(X)
+    timings["load_seconds"] = time.perf_counter() - start
+
+    # Train/test split
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, random_state=args.seed
+    )
+
+    # Model training
+    start = time.perf_counter()
+    model = RandomForestClassifier(
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth,
+        n_jobs=args.n_jobs,
+        random_state=args.seed,
+    )
+    model.fit(X_train, y_train)
+    timings["fit_seconds"] = time.perf_counter() - start
+
+    # Evaluation
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)
+    y_pred = model.classes_.take(np.argmax(proba, axis=1))
+    timings["predict_seconds"] = time.perf_counter() - start
+    print("Classification Report:\n", classification_report(y_test, y_pred))
+
+    # training parallelism should not leak into inference; the dashboards
+    # parallelize scoring themselves
+    model.n_jobs = None
+
+    # Save model
+    start = time.perf_counter()
+    os.makedirs(args.output_dir, exist_ok=True)
+    model_path = os.path.join(args.output_dir, "loan_model.pkl")
+    with open(model_path, "wb") as f:
+        pickle.dump(model, f)
+    with open(os.path.join(args.output_dir, "label_encoders.pkl"), "wb") as f:
+        pickle.dump(label_encoders, f)
+
+    # Memory-mappable artifact served by the dashboards
+    artifact_dir = os.path.join(args.output_dir, "artifact")
+    manifest = save_artifact(model, label_encoders, artifact_dir)
+    timings["save_seconds"] = time.perf_counter() - start
+    timings["wall_seconds"] = time.perf_counter() - wall_start
+
+    summary = {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "params": {
+            "data": os.path.abspath(args.data),
+            "n_estimators": args.n_estimators,
+            "max_depth": args.max_depth,
+            "n_jobs": args.n_jobs,
+            "seed": args.seed,
+            "test_size": args.test_size,
+        },
+        "data": {
+            "rows": int(len(data)),
+            "features": list(X.columns),
+            "memory_bytes": int(data.memory_usage(deep=True).sum()),
+        },
+        "timings": {name: round(seconds, 4) for name, seconds in timings.items()},
+        "peak_memory_bytes": peak_memory_bytes(),
+        "model": {
+            "artifact_version": manifest["version"],
+            "pickle_bytes": os.path.getsize(model_path),
+            "artifact_bytes": directory_size(os.path.join(artifact_dir, manifest["directory"])),
+            "node_count": int(sum(e.tree_.node_count for e in model.estimators_)),
+            "max_depth": int(max(e.tree_.max_depth for e in model.estimators_)),
+        },
+        "inference": {
+            "test_rows": int(len(X_test)),
+            "rows_per_second": round(len(X_test) / timings["predict_seconds"]),
+        },
+        "metrics": {
+            "accuracy": accuracy_score(y_test, y_pred),
+            "roc_auc": roc_auc_score(y_test, proba[:, 1]),
+            "classification_report": classification_report(y_test, y_pred, output_dict=True),
+        },
+    }
+
+    summary_path = args.summary or os.path.join(args.output_dir, "train_summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"Model & encoders saved (artifact {manifest['version']}); run summary in {summary_path}.")
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the Loanalyze default-risk model.")
+    parser.add_argument("--data", default=os.path.join(BASE_DIR, "data", "Training Data.csv"),
+                        help="Training CSV with Id and Risk_Flag columns")
+    parser.add_argument("--output-dir", default=os.path.join(BASE_DIR, "model"))
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--n-jobs", type=int, default=None, help="Cores used for fitting (-1 for all)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--summary", help="Run summary path (default: <output-dir>/train_summary.json)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    train(parse_args())
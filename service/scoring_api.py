@@ -0,0 +1,223 @@
+"""Headless HTTP scoring service for partner systems.
+
+Scores applicants with the same preprocessing, encoders and model as the
+dashboards (through ``utils.model_registry``, so it follows hot reloads and
+prefers the memory-mapped artifact), without the Streamlit UI in the way.
+Records use the bank upload schema, e.g. ``data/Test Data.csv``:
+
+    {"Income": 7393090, "Age": 59, "Experience": 19, "Married/Single": "single",
+     "House_Ownership": "rented", "Car_Ownership": "no", "Profession": "Geologist",
+     "CITY": "Malda", "STATE": "West Bengal", "CURRENT_JOB_YRS": 4,
+     "CURRENT_HOUSE_YRS": 13, "Requested Loan Amount": 250000}
+
+Every feature and the loan amount are required. Requests with a missing or
+non-numeric value are rejected with a 422 that names the columns and rows.
+
+Endpoints:
+
+- ``GET /health``: model version and format, worker pid and micro-batching
+  stats.
+- ``POST /score``: one JSON record. Concurrent single records are scored
+  together by ``utils.micro_batcher``.
+- ``GET /metrics``: this worker's metrics in Prometheus text format.
+- ``POST /score/batch``: ``{"records": [...]}`` as JSON, or a CSV body sent
+  with ``Content-Type: text/csv``. Results come back as JSON, or as CSV when
+  the request has ``Accept: text/csv``. Up to ``SERVICE_MAX_BATCH_ROWS``
+  rows per request.
+
+Run it under several worker processes, separately from the dashboards:
+
+    python -m service.scoring_api --workers 4
+    uvicorn service.scoring_api:app --workers 4 --port 8000
+
+No latency or throughput figures are published for it. They depend on the
+trained model, which is not part of this repository, and on the host's
+cores and worker count. Measure them on the deployment host with
+``benchmarks/bench_service.py --out``, which records the model version,
+worker settings and machine next to p50/p95/p99 latency and rows per second.
+"""
+import argparse
+import io
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from utils.batch_scoring import LOAN_AMOUNT_COLUMNS, add_scores, encode_features, find_column_by_name, score_frame
+from utils.config import SERVICE_HOST, SERVICE_MAX_BATCH_ROWS, SERVICE_PORT, SERVICE_WORKERS
+from utils.metrics import metrics, span
+from utils.micro_batcher import micro_batcher
+from utils.model_registry import get_model_bundle
+from utils.preprocessing import COLUMN_RENAMES
+
+RESULT_COLUMNS = ["default_probability", "risk_band", "loan_amount", "estimated_profit"]
+
+
+class ScoreResult(BaseModel):
+    default_probability: float
+    risk_band: str
+    loan_amount: float
+    estimated_profit: float
+
+
+class ScoreResponse(ScoreResult):
+    model_version: str
+
+
+class BatchRequest(BaseModel):
+    records: List[Dict[str, Any]]
+
+
+class BatchResponse(BaseModel):
+    model_version: str
+    rows: int
+    seconds: float
+    results: List[ScoreResult]
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # load the model before the worker takes traffic
+    get_model_bundle()
+    yield
+
+
+app = FastAPI(title="Loanalyze scoring service", lifespan=lifespan)
+
+
+# row indexes listed per column in a 422
+MAX_REPORTED_ROWS = 10
+
+
+def _rows_text(rows) -> str:
+    shown = ", ".join(str(row) for row in rows[:MAX_REPORTED_ROWS])
+    more = f" and {len(rows) - MAX_REPORTED_ROWS:,} more" if len(rows) > MAX_REPORTED_ROWS else ""
+    return f"row{'s' if len(rows) > 1 else ''} {shown}{more}"
+
+
+def _validate(df: pd.DataFrame, bundle):
+    """Check and convert the records; returns them with the loan-amount column.
+
+    The dashboards fill missing features with 0 and let a stray string turn a
+    whole numeric column into categories; a partner should be told instead,
+    and one bad row must not change the scores of the others.
+    """
+    provided = {COLUMN_RENAMES.get(col, col): col for col in df.columns}
+    missing = [col for col in bundle.feature_names if col not in provided]
+    loan_col = find_column_by_name(LOAN_AMOUNT_COLUMNS, df.columns)
+    if loan_col is None:
+        missing.append(LOAN_AMOUNT_COLUMNS[0])
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing feature columns: {', '.join(missing)}")
+
+    df = df.copy()
+    problems = []
+    for feature in [*bundle.feature_names, loan_col]:
+        col = provided.get(feature, feature)
+        if feature in bundle.encoder_table:
+            invalid = df[col].isna()
+            # codes are looked up by string, so a number scores as an unseen category
+            df[col] = df[col].where(invalid, df[col].astype(str))
+        else:
+            values = pd.to_numeric(df[col], errors="coerce")
+            invalid = values.isna()
+            df[col] = values
+        if invalid.any():
+            problems.append(f"{col} ({_rows_text(np.flatnonzero(invalid.to_numpy()).tolist())})")
+    if problems:
+        raise HTTPException(status_code=422, detail=f"Missing or invalid values: {'; '.join(problems)}")
+    return df, loan_col
+
+
+def _score(df: pd.DataFrame):
+    if len(df) > SERVICE_MAX_BATCH_ROWS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {SERVICE_MAX_BATCH_ROWS:,} rows per request; got {len(df):,}"
+        )
+    bundle = get_model_bundle()
+    df, loan_col = _validate(df, bundle)
+    scored = score_frame(df, bundle, loan_col)[RESULT_COLUMNS]
+    scored["risk_band"] = scored["risk_band"].astype(str)
+    return bundle, scored
+
+
+@app.get("/health")
+def health():
+    bundle = get_model_bundle()
+    return {
+        "status": "ok",
+        "model_version": bundle.version,
+        "model_format": bundle.format,
+        "pid": os.getpid(),
+        "micro_batching": micro_batcher.stats(),
+    }
+
+
+@app.get("/metrics")
+def metrics_text():
+    return Response(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/score", response_model=ScoreResponse)
+def score(record: Dict[str, Any]):
+    with span("service.score"):
+        return _score_record(record)
+
+
+def _score_record(record: Dict[str, Any]) -> dict:
+    bundle = get_model_bundle()
+    df, loan_col = _validate(pd.DataFrame([record]), bundle)
+    _, proba = micro_batcher.predict(bundle, encode_features(df, bundle))
+    scored = add_scores(df, np.array([proba[1]]), loan_col)
+    return {"model_version": bundle.version, **scored[RESULT_COLUMNS].astype({"risk_band": str}).iloc[0].to_dict()}
+
+
+@app.post("/score/batch", response_model=BatchResponse)
+async def score_batch(request: Request):
+    start = time.perf_counter()
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("text/csv"):
+            df = pd.read_csv(io.BytesIO(body))
+        else:
+            df = pd.DataFrame(BatchRequest.model_validate_json(body).records)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read records: {e}")
+    if df.empty:
+        raise HTTPException(status_code=400, detail="No records to score")
+
+    # scoring is CPU-bound, so it runs on the worker's thread pool
+    with span("service.score_batch"):
+        bundle, scored = await run_in_threadpool(_score, df)
+
+    if "text/csv" in request.headers.get("accept", ""):
+        return Response(scored.to_csv(index=False), media_type="text/csv",
+                        headers={"X-Model-Version": bundle.version})
+    return {
+        "model_version": bundle.version,
+        "rows": len(scored),
+        "seconds": time.perf_counter() - start,
+        "results": scored.to_dict(orient="records"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the HTTP scoring service.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run("service.scoring_api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+-- Daily audit log counts per action and status, used by the admin dashboard
+-- for its filter options and trend chart instead of downloading audit_logs.
+-- Apply with the Supabase SQL editor or `psql -f`.
+
+create or replace function public.audit_log_daily_counts(
+    start_at timestamptz default null,
+    end_at timestamptz default null
+)
+returns table (day date, action text, status text, count bigint)
+language sql
+stable
+as $$
+    select
+        (created_at at time zone 'utc')::date as day,
+        action::text,
+        status::text,
+        count(*) as count
+    from public.audit_logs
+    where (start_at is null or created_at >= start_at)
+      and (end_at is null or created_at < end_at)
+    group by 1, 2, 3
+    order by 1, 2, 3;
+$$;
+
+-- Serves the filtered, newest-first keyset pages: order by created_at desc,
+-- id desc, continuing after the last (created_at, id) shown.
+create index if not exists audit_logs_created_at_id_idx
+    on public.audit_logs (created_at desc, id desc);
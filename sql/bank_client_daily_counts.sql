@@ -0,0 +1,27 @@
+-- Bank clients per upload day and risk band, used by the public dashboard's
+-- rollups (utils/rollups.py). Counts the bank_clients rows that were actually
+-- saved, which can be fewer than an upload's own risk counts when some of its
+-- inserts failed.
+-- Apply with the Supabase SQL editor or `psql -f`.
+
+create or replace function public.bank_client_daily_counts(
+    start_at timestamptz default null
+)
+returns table (day date, risk_band text, count bigint)
+language sql
+stable
+as $$
+    select
+        (u.created_at at time zone 'utc')::date as day,
+        coalesce(c.risk_band::text, '') as risk_band,
+        count(*) as count
+    from public.bank_clients c
+    join public.bank_uploads u on u.id = c.bank_upload_id
+    where start_at is null or u.created_at >= start_at
+    group by 1, 2
+    order by 1, 2;
+$$;
+
+-- Joins each upload to its clients without scanning bank_clients.
+create index if not exists bank_clients_bank_upload_id_idx
+    on public.bank_clients (bank_upload_id);
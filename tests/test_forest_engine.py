@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+import utils.forest_engine as forest_engine
+from utils.forest_engine import FlatForest
+from utils.model_artifact import load_artifact, save_artifact
+
+FEATURES = ["income", "age", "experience", "profession"]
+
+
+def _training_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "income": rng.uniform(1e5, 1e7, rows),
+        "age": rng.integers(21, 80, rows).astype(float),
+        "experience": rng.integers(0, 20, rows).astype(float),
+        "profession": rng.integers(0, 5, rows).astype(float),
+    })
+    target = ((frame["income"] < 3e6) & (rng.random(rows) < 0.7) | (rng.random(rows) < 0.1)).astype(int)
+    return frame, target
+
+
+@pytest.fixture(scope="module")
+def model():
+    frame, target = _training_frame(2_000)
+    # missing values in training give nodes a learned missing_go_to_left
+    frame.loc[frame.sample(frac=0.1, random_state=1).index, "age"] = np.nan
+    return RandomForestClassifier(n_estimators=15, max_depth=8, random_state=42).fit(frame, target)
+
+
+@pytest.fixture(scope="module")
+def scoring_frame():
+    frame, _ = _training_frame(500, seed=7)
+    frame.loc[::7, "age"] = np.nan
+    frame.loc[::11, "income"] = np.nan
+    return frame
+
+
+def test_matches_sklearn_exactly(model, scoring_frame):
+    engine = FlatForest.from_sklearn(model)
+    expected = model.predict_proba(scoring_frame)
+    np.testing.assert_array_equal(engine.predict_proba(scoring_frame), expected)
+
+    labels, proba = engine.predict(scoring_frame)
+    np.testing.assert_array_equal(proba, expected)
+    np.testing.assert_array_equal(labels, model.predict(scoring_frame))
+
+
+def test_blocks_and_single_rows_match(model, scoring_frame, monkeypatch):
+    engine = FlatForest.from_sklearn(model)
+    expected = model.predict_proba(scoring_frame)
+    monkeypatch.setattr(forest_engine, "BLOCK_ROWS", 64)
+    np.testing.assert_array_equal(engine.predict_proba(scoring_frame), expected)
+    np.testing.assert_array_equal(engine.predict_proba(scoring_frame.to_numpy()[3]), expected[3:4])
+
+
+def test_memory_mapped_artifact_matches_sklearn(model, scoring_frame, tmp_path):
+    encoder = LabelEncoder().fit(["doctor", "engineer", "pilot"])
+    manifest = save_artifact(model, {"profession": encoder}, str(tmp_path))
+    engine, encoder_table, loaded = load_artifact(str(tmp_path))
+
+    assert loaded["version"] == manifest["version"]
+    assert isinstance(engine.left, np.memmap)
+    assert engine.feature_names == FEATURES
+    np.testing.assert_array_equal(engine.predict_proba(scoring_frame), model.predict_proba(scoring_frame))
+    np.testing.assert_array_equal(
+        encoder_table.encode_column("profession", ["pilot", "doctor", "astronaut"]), [2, 0, -1]
+    )
+
+
+def test_saving_the_same_model_reuses_its_version(model, tmp_path):
+    first = save_artifact(model, {}, str(tmp_path))
+    second = save_artifact(model, {}, str(tmp_path))
+    assert first["version"] == second["version"]
@@ -0,0 +1,135 @@
+import io
+import os
+import threading
+
+import pytest
+
+from utils.job_queue import DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs"))
+
+
+def _enqueue(queue, name="batch.csv", user_id="bank-1"):
+    return queue.enqueue(io.BytesIO(b"Income,Age\n1,2\n"), name, user_id, "notes")
+
+
+def test_enqueue_stages_the_upload(queue):
+    job_id = _enqueue(queue, name="../batch.csv")
+    job = queue.get(job_id)
+
+    assert job.state == QUEUED
+    assert job.filename == "batch.csv"
+    with open(queue.upload_path(job), "rb") as f:
+        assert f.read() == b"Income,Age\n1,2\n"
+
+
+def test_claim_takes_the_oldest_job(queue):
+    first = _enqueue(queue)
+    _enqueue(queue)
+
+    job = queue.claim("worker-a")
+    assert job.id == first
+    assert job.state == RUNNING
+    assert job.worker == "worker-a"
+
+
+def test_claim_returns_none_when_idle(queue):
+    assert queue.claim("worker-a") is None
+
+
+def test_concurrent_claims_take_each_job_once(queue):
+    job_ids = {_enqueue(queue) for _ in range(20)}
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(name):
+        while True:
+            job = queue.claim(name)
+            if job is None:
+                return
+            with lock:
+                claimed.append(job.id)
+
+    threads = [threading.Thread(target=worker, args=(f"worker-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(job_ids)
+    assert queue.stats() == {QUEUED: 0, RUNNING: 20, DONE: 0, FAILED: 0}
+
+
+def test_finish_records_the_result_and_drops_the_upload(queue):
+    job = queue.get(_enqueue(queue))
+    queue.claim("worker-a")
+    queue.finish(job.id, {"total_rows": 1})
+
+    finished = queue.get(job.id)
+    assert finished.state == DONE
+    assert finished.result == {"total_rows": 1}
+    assert not os.path.exists(queue.upload_path(job))
+
+
+def test_fail_stale_fails_only_silent_running_jobs(queue):
+    stale = _enqueue(queue)
+    waiting = _enqueue(queue)
+    queue.claim("worker-a")
+
+    assert queue.fail_stale(stale_seconds=3600) == 0
+    assert queue.fail_stale(stale_seconds=-1) == 1
+
+    job = queue.get(stale)
+    assert job.state == FAILED
+    assert "stopped responding" in job.error
+    # stale jobs are not put back on the queue
+    assert queue.get(waiting).state == QUEUED
+    assert queue.claim("worker-b").id == waiting
+
+
+def test_fail_stale_leaves_finished_jobs_alone(queue):
+    job_id = _enqueue(queue)
+    queue.claim("worker-a")
+    queue.finish(job_id, {})
+
+    assert queue.fail_stale(stale_seconds=-1) == 0
+    assert queue.get(job_id).state == DONE
+
+
+def test_a_job_failed_as_stale_stays_failed(queue):
+    job_id = _enqueue(queue)
+    queue.claim("worker-a")
+    assert queue.fail_stale(stale_seconds=-1) == 1
+
+    # the worker was only slow, and reports back after all
+    assert queue.finish(job_id, {"inserted": 10}) == 0
+    assert queue.fail(job_id, "boom") == 0
+
+    job = queue.get(job_id)
+    assert job.state == FAILED
+    assert "stopped responding" in job.error
+    assert job.result is None
+
+
+def test_progress_only_updates_running_jobs(queue):
+    job_id = _enqueue(queue)
+    queue.update_progress(job_id, 0.5, "Scoring")
+    assert queue.get(job_id).progress == 0
+
+    queue.claim("worker-a")
+    queue.update_progress(job_id, 1.5, "Scoring")
+    assert queue.get(job_id).progress == 1.0
+
+
+def test_purge_finished_deletes_old_jobs_and_files(queue):
+    job_id = _enqueue(queue)
+    queue.claim("worker-a")
+    queue.fail(job_id, "boom")
+
+    assert queue.purge_finished(retention_hours=1) == 0
+    assert queue.purge_finished(retention_hours=-1) == 1
+    assert queue.get(job_id) is None
+    assert not os.path.exists(queue.job_dir(job_id))
@@ -0,0 +1,100 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from utils.micro_batcher import MicroBatcher
+
+
+class SumEngine:
+    """Scores a row by its sum, and records the size of every batch it sees."""
+
+    def __init__(self, offset=0.0):
+        self.offset = offset
+        self.batch_rows = []
+
+    def predict(self, X):
+        self.batch_rows.append(len(X))
+        positive = X.sum(axis=1) + self.offset
+        return (positive > 1).astype(int), np.column_stack([-positive, positive])
+
+
+def _bundle(offset=0.0):
+    return SimpleNamespace(engine=SumEngine(offset))
+
+
+def _predict_concurrently(batcher, bundles, rows):
+    results = {}
+    barrier = threading.Barrier(len(rows))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.predict(bundles[i % len(bundles)], rows[i], timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_each_row_gets_its_own_result():
+    batcher = MicroBatcher(max_rows=8, max_wait_ms=20)
+    bundle = _bundle()
+    rows = [np.array([i, i / 10], dtype=np.float32) for i in range(20)]
+
+    results = _predict_concurrently(batcher, [bundle], rows)
+
+    for i, row in enumerate(rows):
+        label, proba = results[i]
+        assert proba[1] == pytest.approx(row.sum())
+        assert label == int(row.sum() > 1)
+    assert max(bundle.engine.batch_rows) <= 8
+    assert sum(bundle.engine.batch_rows) == 20
+    assert batcher.stats()["rows"] == 20
+
+
+def test_concurrent_rows_are_scored_together():
+    batcher = MicroBatcher(max_rows=64, max_wait_ms=50)
+    bundle = _bundle()
+    _predict_concurrently(batcher, [bundle], [np.ones(2, dtype=np.float32)] * 16)
+
+    assert len(bundle.engine.batch_rows) < 16
+    assert batcher.stats()["mean_batch_rows"] > 1
+
+
+def test_rows_for_different_models_are_never_mixed():
+    batcher = MicroBatcher(max_rows=64, max_wait_ms=50)
+    bundles = [_bundle(0.0), _bundle(100.0)]
+    rows = [np.ones(2, dtype=np.float32)] * 10
+
+    results = _predict_concurrently(batcher, bundles, rows)
+
+    for i in range(10):
+        assert results[i][1][1] == pytest.approx(2.0 + bundles[i % 2].engine.offset)
+    assert sum(bundles[0].engine.batch_rows) == 5
+    assert sum(bundles[1].engine.batch_rows) == 5
+
+
+def test_single_row_mode_scores_inline():
+    batcher = MicroBatcher(max_rows=1, max_wait_ms=50)
+    bundle = _bundle()
+    label, proba = batcher.predict(bundle, [0.25, 0.25])
+
+    assert (label, proba[1]) == (0, 0.5)
+    assert bundle.engine.batch_rows == [1]
+    assert batcher._thread is None
+
+
+def test_errors_reach_every_row_of_the_failed_batch():
+    batcher = MicroBatcher(max_rows=4, max_wait_ms=1)
+
+    def fail(X):
+        raise ValueError("bad model")
+
+    bundle = SimpleNamespace(engine=SimpleNamespace(predict=fail))
+    with pytest.raises(ValueError, match="bad model"):
+        batcher.predict(bundle, [1.0], timeout=5)
+    assert batcher.stats()["errors"] == 1
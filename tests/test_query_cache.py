@@ -0,0 +1,189 @@
+import base64
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from utils.query_cache import QueryCache
+from utils.repository import _cache_key
+
+
+def _cache(max_bytes=1 << 20, ttl=60.0):
+    return QueryCache(max_bytes, {}, ttl)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _frame(value=1):
+    return pd.DataFrame({"id": [value], "risk_band": ["Low"]})
+
+
+def test_second_lookup_is_a_hit_with_its_own_copy():
+    cache = _cache()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return _frame()
+
+    first = cache.get_or_fetch("t", ("t", "q"), fetch)
+    first.loc[0, "id"] = 99
+    second = cache.get_or_fetch("t", ("t", "q"), fetch)
+
+    assert len(calls) == 1
+    assert second.loc[0, "id"] == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_zero_ttl_bypasses_the_cache():
+    cache = QueryCache(1 << 20, {"t": 0}, 60.0)
+    calls = []
+    for _ in range(2):
+        cache.get_or_fetch("t", ("t", "q"), lambda: calls.append(1) or _frame())
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_drops_only_that_tables_entries():
+    cache = _cache()
+    cache.get_or_fetch("a", ("a", "q"), _frame)
+    cache.get_or_fetch("b", ("b", "q"), _frame)
+
+    cache.invalidate("a")
+
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["invalidations"] == 1
+    assert cache.generation("a") == 1
+    assert cache.generation("b") == 0
+    cache.get_or_fetch("a", ("a", "q"), lambda: _frame(2))
+    assert cache.stats()["misses"] == 3
+
+
+def test_fetch_that_straddles_a_write_is_not_stored():
+    cache = _cache()
+
+    def fetch():
+        # a write lands while the query is running
+        cache.invalidate("t")
+        return _frame(1)
+
+    assert cache.get_or_fetch("t", ("t", "q"), fetch).loc[0, "id"] == 1
+    assert cache.stats()["entries"] == 0
+    assert cache.get_or_fetch("t", ("t", "q"), lambda: _frame(2)).loc[0, "id"] == 2
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = _cache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return _frame()
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.get_or_fetch("t", ("t", "q"), fetch)))
+    owner.start()
+    assert started.wait(5)
+
+    waiters = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch("t", ("t", "q"), fetch)))
+        for _ in range(3)
+    ]
+    for thread in waiters:
+        thread.start()
+    # the waiters are blocked on the owner's fetch; let it finish
+    _wait_for(lambda: cache.stats()["coalesced"] == 3)
+    release.set()
+    for thread in [owner, *waiters]:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 4
+    assert all(result.equals(_frame()) for result in results)
+    assert len({id(result) for result in results}) == 4
+    assert cache.stats()["coalesced"] == 3
+
+
+def test_failed_fetch_reaches_waiters_and_is_not_cached():
+    cache = _cache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("database down")
+
+    errors = []
+
+    def lookup():
+        try:
+            cache.get_or_fetch("t", ("t", "q"), fetch)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    owner = threading.Thread(target=lookup)
+    owner.start()
+    assert started.wait(5)
+    waiter = threading.Thread(target=lookup)
+    waiter.start()
+    _wait_for(lambda: cache.stats()["coalesced"] == 1)
+    release.set()
+    owner.join()
+    waiter.join()
+
+    assert errors == ["database down", "database down"]
+    assert cache.get_or_fetch("t", ("t", "q"), _frame).equals(_frame())
+
+
+def test_least_recently_used_entries_are_evicted_to_fit():
+    one = _frame()
+    nbytes = int(one.memory_usage(index=True, deep=True).sum())
+    cache = _cache(max_bytes=2 * nbytes)
+
+    cache.get_or_fetch("t", ("t", 1), _frame)
+    cache.get_or_fetch("t", ("t", 2), _frame)
+    cache.get_or_fetch("t", ("t", 1), _frame)  # 1 is now the most recent
+    cache.get_or_fetch("t", ("t", 3), _frame)
+
+    assert cache.stats()["evictions"] == 1
+    hits = cache.stats()["hits"]
+    cache.get_or_fetch("t", ("t", 1), _frame)
+    assert cache.stats()["hits"] == hits + 1
+
+
+def test_frames_larger_than_the_budget_are_not_kept():
+    cache = _cache(max_bytes=10)
+    cache.get_or_fetch("t", ("t", "q"), _frame)
+    assert cache.stats()["entries"] == 0
+
+
+def _client(claims):
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+    return SimpleNamespace(options=SimpleNamespace(headers={"Authorization": f"Bearer header.{payload}.signature"}))
+
+
+@pytest.mark.parametrize("claims, scope", [
+    ({"role": "anon"}, "anon"),
+    ({"role": "service_role"}, "service_role"),
+    ({"role": "authenticated", "sub": "user-2"}, "authenticated:user-2"),
+])
+def test_cache_keys_include_who_reads(claims, scope):
+    reader = _client(claims)
+    admin = _client({"role": "authenticated", "sub": "user-1"})
+
+    assert _cache_key(reader, "t", "q") == (scope, "t", "q")
+    assert _cache_key(admin, "t", "q") != _cache_key(reader, "t", "q")
@@ -0,0 +1,96 @@
+import json
+
+import httpx
+import pytest
+from supabase import ClientOptions, create_client
+
+from utils.query_cache import query_cache
+from utils.repository import count_user_roles, fetch_frame, iter_pages
+
+ANON_KEY = "header.eyJyb2xlIjoiYW5vbiJ9.signature"
+
+
+class FakePostgrest:
+    """Just enough of PostgREST for keyset pages: ``select``, ``id=gt.``, ``order`` and ``limit``."""
+
+    def __init__(self, rows, max_rows=1000):
+        self.rows = sorted(rows, key=lambda row: row["id"])
+        self.max_rows = max_rows
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        self.requests.append(params)
+        rows = self.rows
+        if "id" in params:
+            op, _, value = params["id"].partition(".")
+            assert op == "gt"
+            rows = [row for row in rows if row["id"] > int(value)]
+        assert params.get("order") == "id.asc"
+        rows = rows[:min(int(params["limit"]), self.max_rows)]
+        columns = params["select"].split(",")
+        return httpx.Response(200, json=[{col: row[col] for col in columns} for row in rows])
+
+
+def _client(handler):
+    http = httpx.Client(transport=httpx.MockTransport(handler))
+    return create_client("https://example.supabase.co", ANON_KEY, options=ClientOptions(httpx_client=http))
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    query_cache.clear()
+    yield
+    query_cache.clear()
+
+
+def _rows(count):
+    return [{"id": i, "risk_band": ["Low", "Medium", "High"][i % 3], "loan_amount": i * 1000} for i in range(count)]
+
+
+def test_pages_follow_the_key_without_gaps_or_repeats():
+    server = FakePostgrest(_rows(25))
+    pages = list(iter_pages(_client(server), "applicant_submissions", ["risk_band"], page_rows=10))
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [list(page.columns) for page in pages] == [["id", "risk_band"]] * 3
+    ids = [i for page in pages for i in page["id"]]
+    assert ids == list(range(25))
+    assert [params.get("id") for params in server.requests] == [None, "gt.9", "gt.19"]
+
+
+def test_an_exact_multiple_of_the_page_size_ends_on_an_empty_page():
+    server = FakePostgrest(_rows(20))
+    pages = list(iter_pages(_client(server), "applicant_submissions", ["risk_band"], page_rows=10))
+
+    assert [len(page) for page in pages] == [10, 10]
+    assert len(server.requests) == 3
+
+
+def test_fetch_frame_keeps_columns_when_empty_and_caches():
+    server = FakePostgrest([])
+    supabase = _client(server)
+
+    first = fetch_frame(supabase, "bank_uploads", ["created_at"])
+    second = fetch_frame(supabase, "bank_uploads", ["created_at"])
+
+    assert first.empty
+    assert list(first.columns) == ["id", "created_at"]
+    assert second.equals(first)
+    assert len(server.requests) == 1
+
+
+def test_role_counts_use_head_requests():
+    counts = {"eq.applicant": 7, "eq.bank": 3, "eq.admin": 1, None: 12}
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        total = counts[dict(request.url.params).get("role")]
+        return httpx.Response(200, headers={"Content-Range": f"*/{total}"}, content=json.dumps([]))
+
+    frame = count_user_roles(_client(handler))
+
+    assert dict(zip(frame["role"], frame["count"])) == {"applicant": 7, "bank": 3, "admin": 1, "other": 1}
+    assert {request.method for request in requests} == {"HEAD"}
+    assert all("count=exact" in request.headers.get("prefer", "") for request in requests)
@@ -0,0 +1,71 @@
+import httpx
+import pandas as pd
+import pytest
+from supabase import ClientOptions, create_client
+
+from utils import rollups
+from utils.rollups import band_counts, mean_loan_amount, refresh_rollups, store_path, total
+
+ANON_KEY = "header.eyJyb2xlIjoiYW5vbiJ9.signature"
+
+SUBMISSIONS = [
+    {"id": 1, "created_at": "2026-03-01T10:00:00+00:00", "risk_band": "Low", "loan_amount": 1000},
+    {"id": 2, "created_at": "2026-03-01T12:00:00+00:00", "risk_band": "High", "loan_amount": 3000},
+    {"id": 3, "created_at": "2026-03-02T09:00:00+00:00", "risk_band": None, "loan_amount": None},
+]
+# the upload says 5 clients, but only 3 of them were saved
+UPLOADS = [
+    {"id": 1, "created_at": "2026-03-02T08:00:00+00:00", "low_risk_count": 3, "medium_risk_count": 1,
+     "high_risk_count": 1},
+]
+SAVED_CLIENTS = [
+    {"day": "2026-03-02", "risk_band": "Low", "count": 2},
+    {"day": "2026-03-02", "risk_band": "High", "count": 1},
+]
+
+
+def _client(rpc_installed=True):
+    def handler(request):
+        table = request.url.path.rsplit("/", 1)[-1]
+        if table == "bank_client_daily_counts":
+            if not rpc_installed:
+                return httpx.Response(404, json={
+                    "code": "PGRST202", "details": None, "hint": None, "message": "Could not find the function",
+                })
+            return httpx.Response(200, json=SAVED_CLIENTS)
+        rows = {"applicant_submissions": SUBMISSIONS, "bank_uploads": UPLOADS}[table]
+        if "id" in request.url.params:
+            rows = []
+        columns = request.url.params["select"].split(",")
+        return httpx.Response(200, json=[{col: row[col] for col in columns} for row in rows])
+
+    http = httpx.Client(transport=httpx.MockTransport(handler))
+    return create_client("https://example.supabase.co", ANON_KEY, options=ClientOptions(httpx_client=http))
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(rollups, "ROLLUP_DIR", str(tmp_path / "rollups"))
+    monkeypatch.setattr(rollups, "_stores", {})
+    monkeypatch.setattr(rollups, "_client_rpc_available", True)
+
+
+def test_clients_are_counted_in_the_database():
+    supabase = _client()
+    frame = refresh_rollups(supabase, force=True)
+
+    assert total(frame, "applicant_submissions") == 3
+    assert mean_loan_amount(frame) == 2000
+    assert total(frame, "bank_uploads") == 1
+    assert total(frame, "bank_clients") == 3
+    assert dict(band_counts(frame, "bank_clients").values.tolist()) == {"Low": 2, "High": 1}
+    assert rollups.client_counts_exact()
+    assert store_path(supabase).endswith("anon.csv")
+    pd.testing.assert_frame_equal(rollups.read_store(store_path(supabase)), frame, check_dtype=False)
+
+
+def test_without_the_function_clients_come_from_the_uploads():
+    frame = refresh_rollups(_client(rpc_installed=False), force=True)
+
+    assert total(frame, "bank_clients") == 5
+    assert not rollups.client_counts_exact()
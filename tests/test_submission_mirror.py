@@ -0,0 +1,73 @@
+import base64
+import json
+
+import httpx
+from supabase import ClientOptions, create_client
+
+from utils.repository import SUBMISSION_COLUMNS
+from utils.submission_mirror import SubmissionMirrors
+
+
+def _token(claims):
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+def _row(submission_id, user_id):
+    row = {col: None for col in SUBMISSION_COLUMNS}
+    row.update(id=submission_id, user_id=user_id, created_at="2026-01-01T00:00:00+00:00", risk_band="Low")
+    return row
+
+
+# what row-level security lets each token read
+VISIBLE = {
+    _token({"role": "authenticated", "sub": "bank-1"}): [_row("a", "applicant-1"), _row("b", "applicant-2")],
+    _token({"role": "authenticated", "sub": "applicant-1"}): [_row("a", "applicant-1")],
+}
+
+
+def _client(token, requests):
+    def handler(request):
+        requests.append(request)
+        rows = VISIBLE[request.headers["authorization"].removeprefix("Bearer ")]
+        if "id" in request.url.params:
+            rows = []
+        return httpx.Response(200, json=rows)
+
+    http = httpx.Client(transport=httpx.MockTransport(handler))
+    return create_client("https://example.supabase.co", token, options=ClientOptions(httpx_client=http))
+
+
+def test_each_identity_syncs_its_own_mirror(tmp_path):
+    mirrors = SubmissionMirrors(str(tmp_path), max_loaded=2)
+    bank_token, applicant_token = VISIBLE
+    bank_requests, applicant_requests = [], []
+    bank = _client(bank_token, bank_requests)
+    applicant = _client(applicant_token, applicant_requests)
+
+    bank_rows = mirrors.for_client(bank).refresh(bank)
+    applicant_rows = mirrors.for_client(applicant).refresh(applicant)
+
+    assert sorted(bank_rows["id"]) == ["a", "b"]
+    assert list(applicant_rows["id"]) == ["a"]
+    assert bank_requests and applicant_requests
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["authenticated-applicant-1", "authenticated-bank-1"]
+    assert mirrors.for_client(_client(bank_token, [])) is mirrors.for_client(bank)
+
+
+def test_least_recently_read_mirrors_leave_memory(tmp_path):
+    mirrors = SubmissionMirrors(str(tmp_path), max_loaded=1)
+    bank_token, applicant_token = VISIBLE
+    bank = _client(bank_token, [])
+    applicant = _client(applicant_token, [])
+
+    mirrors.for_client(bank).refresh(bank)
+    mirrors.for_client(applicant).refresh(applicant)
+    assert mirrors.stats()["identities"] == 2
+    assert mirrors.stats()["loaded"] == 1
+
+    # read back from its part files, not downloaded again
+    requests = []
+    again = _client(bank_token, requests)
+    assert sorted(mirrors.for_client(again).refresh(again)["id"]) == ["a", "b"]
+    assert all("id" in request.url.params or "created_at" in request.url.params for request in requests)
@@ -0,0 +1,185 @@
+"""Chunked scoring of bank batch uploads.
+
+Uploads are read, encoded, scored and written out a fixed number of rows at
+a time, so peak memory depends on the chunk size rather than the file size.
+Scored rows are appended to a results CSV on disk; only running totals and
+the aggregated chart inputs are kept in memory.
+"""
+import itertools
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from utils.chart_data import ChartData
+from utils.metrics import span
+from utils.parallel_scoring import feature_matrix, predict_default_proba
+from utils.preprocessing import preprocess_input
+
+LOAN_AMOUNT_COLUMNS = ["Requested Loan Amount", "loan_amount", "Loan_Amount"]
+RISK_BANDS = ["Low", "Medium", "High"]
+RISK_BAND_BINS = [-1, 0.33, 0.66, 1]
+
+
+def find_column_by_name(possible_names, df_columns):
+    return next((col for col in df_columns if col.strip().lower() in [n.lower() for n in possible_names]), None)
+
+
+def _is_csv(filename: str) -> bool:
+    return filename.lower().endswith(".csv")
+
+
+def read_upload_preview(file, filename: str, nrows: int = 5) -> pd.DataFrame:
+    """First rows of an upload, without parsing the rest of the file."""
+    file.seek(0)
+    if _is_csv(filename):
+        preview = pd.read_csv(file, nrows=nrows)
+    else:
+        preview = pd.read_excel(file, nrows=nrows)
+    file.seek(0)
+    return preview
+
+
+def _file_size(file):
+    size = getattr(file, "size", None)
+    if size is None:
+        position = file.tell()
+        size = file.seek(0, 2)
+        file.seek(position)
+    return size or 0
+
+
+def _iter_csv_chunks(file, chunk_rows):
+    size = _file_size(file)
+    for chunk in pd.read_csv(file, chunksize=chunk_rows):
+        yield chunk, (file.tell() / size if size else 0.0)
+
+
+def _iter_excel_chunks(file, chunk_rows):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total = (sheet.max_row or 1) - 1
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        done = 0
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) == chunk_rows:
+                done += len(buffer)
+                chunk = pd.DataFrame(buffer, columns=header)
+                chunk.index = pd.RangeIndex(done - len(buffer), done)
+                buffer = []
+                yield chunk, (done / total if total > 0 else 0.0)
+        if buffer:
+            done += len(buffer)
+            chunk = pd.DataFrame(buffer, columns=header)
+            chunk.index = pd.RangeIndex(done - len(buffer), done)
+            yield chunk, 1.0
+    finally:
+        workbook.close()
+
+
+def iter_upload_chunks(file, filename: str, chunk_rows: int):
+    """Yield ``(chunk, fraction_done)`` pairs from a CSV or XLSX upload."""
+    file.seek(0)
+    if _is_csv(filename):
+        yield from _iter_csv_chunks(file, chunk_rows)
+    else:
+        yield from _iter_excel_chunks(file, chunk_rows)
+
+
+def align_features(df_processed: pd.DataFrame, feature_names) -> pd.DataFrame:
+    for col in set(feature_names) - set(df_processed.columns):
+        df_processed[col] = 0
+    return df_processed[feature_names]
+
+
+def assign_risk_band(probs):
+    return pd.cut(probs, bins=RISK_BAND_BINS, labels=RISK_BANDS)
+
+
+def estimate_profit(default_probability, loan_amount):
+    return (1 - default_probability) * loan_amount
+
+
+def encode_features(df: pd.DataFrame, bundle) -> np.ndarray:
+    """The float32 feature matrix the model scores for ``df``."""
+    return feature_matrix(align_features(preprocess_input(df, bundle.encoder_table), bundle.feature_names))
+
+
+def add_scores(df: pd.DataFrame, probs, loan_col=None) -> pd.DataFrame:
+    """Add probability, risk band, loan amount and profit columns to a copy of ``df``."""
+    df = df.copy()
+    df["default_probability"] = probs
+    df["risk_band"] = assign_risk_band(probs)
+    df["loan_amount"] = pd.to_numeric(df[loan_col], errors="coerce") if loan_col else 0
+    df["loan_amount"] = df["loan_amount"].fillna(0)
+    df["estimated_profit"] = estimate_profit(df["default_probability"], df["loan_amount"])
+    return df
+
+
+def score_frame(df: pd.DataFrame, bundle, loan_col=None) -> pd.DataFrame:
+    """Add probability, risk band, loan amount and profit columns to ``df``."""
+    return add_scores(df, predict_default_proba(bundle, encode_features(df, bundle)), loan_col)
+
+
+@dataclass
+class BatchSummary:
+    """Running totals for a streamed batch."""
+    total_rows: int = 0
+    loan_col: str = None
+    band_counts: dict = field(default_factory=lambda: dict.fromkeys(RISK_BANDS, 0))
+    chart_data: ChartData = field(default_factory=lambda: ChartData(RISK_BANDS))
+
+    def update(self, scored: pd.DataFrame):
+        self.total_rows += len(scored)
+        self.chart_data.update(scored)
+        for band, count in zip(RISK_BANDS, self.chart_data.band_counts):
+            self.band_counts[band] = int(count)
+
+
+def score_upload(file, filename: str, bundle, results_path: str, chunk_rows: int, on_chunk=None) -> BatchSummary:
+    """Score an upload chunk by chunk, appending results to ``results_path``.
+
+    ``on_chunk(summary, fraction_done)`` is called after each chunk is written.
+    Parsing, preprocessing, prediction and writing are timed as separate
+    ``batch.*`` stages.
+    """
+    summary = BatchSummary()
+    chunks = iter_upload_chunks(file, filename, chunk_rows)
+    with open(results_path, "w", newline="", encoding="utf-8") as out:
+        for i in itertools.count():
+            with span("batch.parse"):
+                item = next(chunks, None)
+            if item is None:
+                break
+            chunk, fraction = item
+            if i == 0:
+                summary.loan_col = find_column_by_name(LOAN_AMOUNT_COLUMNS, chunk.columns)
+            with span("batch.preprocess"):
+                X = encode_features(chunk, bundle)
+            with span("batch.predict"):
+                probs = predict_default_proba(bundle, X)
+            with span("batch.write"):
+                scored = add_scores(chunk, probs, summary.loan_col)
+                scored.to_csv(out, index=False, header=(i == 0))
+                summary.update(scored)
+            if on_chunk:
+                on_chunk(summary, min(fraction, 1.0))
+    return summary
+
+
+def iter_results(results_path: str, chunk_rows: int, usecols=None):
+    """Read scored results back in chunks."""
+    yield from pd.read_csv(results_path, chunksize=chunk_rows, usecols=usecols)
+
+
+def read_results_preview(results_path: str, nrows: int) -> pd.DataFrame:
+    return pd.read_csv(results_path, nrows=nrows)
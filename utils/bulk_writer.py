@@ -0,0 +1,155 @@
+"""Batched, bounded-concurrency inserts into Supabase tables."""
+import logging
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from utils.config import (
+    BULK_INSERT_BACKOFF_SECONDS,
+    BULK_INSERT_BATCH_ROWS,
+    BULK_INSERT_MAX_IN_FLIGHT,
+    BULK_INSERT_MAX_RETRIES,
+)
+from utils.metrics import inc
+from utils.query_cache import query_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchFailure:
+    batch_index: int
+    first_row: int
+    rows: int
+    attempts: int
+    error: str
+
+
+@dataclass
+class BulkInsertReport:
+    inserted: int = 0
+    batches: int = 0
+    failures: list = field(default_factory=list)
+
+    @property
+    def failed_rows(self) -> int:
+        return sum(failure.rows for failure in self.failures)
+
+
+def _int_column(chunk: pd.DataFrame, name) -> np.ndarray:
+    if not name or name not in chunk.columns:
+        return np.zeros(len(chunk), dtype=np.int64)
+    return pd.to_numeric(chunk[name], errors="coerce").fillna(0).astype(np.int64).to_numpy()
+
+
+def build_bank_client_rows(chunk: pd.DataFrame, upload_id: str, user_id, loan_col) -> list:
+    """``bank_clients`` payloads for a chunk of scored rows."""
+    n = len(chunk)
+    risk_band = chunk["risk_band"].astype(object)
+    payload = pd.DataFrame({
+        "id": [str(uuid.uuid4()) for _ in range(n)],
+        "bank_upload_id": upload_id,
+        "processed_by": user_id,
+        "monthly_income": _int_column(chunk, "Monthly Income"),
+        "cibil_score": _int_column(chunk, "CIBIL Score"),
+        "requested_loan_amount": _int_column(chunk, loan_col),
+        "risk_band": risk_band.where(risk_band.notna(), None).to_numpy(),
+    })
+    rows = payload.to_dict("records")
+    for row in rows:
+        row["feature_importance"] = {}
+    return rows
+
+
+def _insert_batch(supabase, table, rows, max_retries, backoff_seconds):
+    """Insert one batch, retrying with exponential backoff.
+
+    Retries use an upsert that ignores duplicate ids, so a batch that reached
+    the database before its response was lost is not inserted twice.
+    """
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            query = supabase.table(table)
+            if attempts == 1:
+                response = query.insert(rows, returning="minimal").execute()
+            else:
+                response = query.upsert(rows, returning="minimal", ignore_duplicates=True).execute()
+            if hasattr(response, "error") and response.error:
+                raise RuntimeError(response.error.message)
+            inc("loanalyze_supabase_rows_written_total", len(rows), resource=table)
+            return attempts, None
+        except Exception as e:
+            if attempts > max_retries:
+                return attempts, str(e)
+            logger.info("Batch insert into %s failed (attempt %d): %s", table, attempts, e)
+            time.sleep(backoff_seconds * 2 ** (attempts - 1))
+
+
+def iter_batches(row_chunks, batch_rows: int):
+    """Split an iterable of row lists into ``(first_row, rows)`` batches."""
+    first_row = 0
+    for rows in row_chunks:
+        for start in range(0, len(rows), batch_rows):
+            batch = rows[start:start + batch_rows]
+            yield first_row, batch
+            first_row += len(batch)
+
+
+def bulk_insert(
+    supabase,
+    table: str,
+    batches,
+    max_in_flight: int = BULK_INSERT_MAX_IN_FLIGHT,
+    max_retries: int = BULK_INSERT_MAX_RETRIES,
+    backoff_seconds: float = BULK_INSERT_BACKOFF_SECONDS,
+    on_batch=None,
+) -> BulkInsertReport:
+    """Insert ``(first_row, rows)`` batches with at most ``max_in_flight`` pending.
+
+    ``on_batch(report)`` runs in the calling thread after each batch finishes,
+    so it may safely update Streamlit elements.
+    """
+    report = BulkInsertReport()
+
+    def record(future):
+        index, first_row, size = meta.pop(future)
+        attempts, error = future.result()
+        report.batches += 1
+        if error is None:
+            report.inserted += size
+        else:
+            report.failures.append(BatchFailure(index, first_row, size, attempts, error))
+        if on_batch:
+            on_batch(report)
+
+    meta = {}
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="bulk-insert") as pool:
+        pending = set()
+        for index, (first_row, rows) in enumerate(batches):
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future)
+            future = pool.submit(_insert_batch, supabase, table, rows, max_retries, backoff_seconds)
+            meta[future] = (index, first_row, len(rows))
+            pending.add(future)
+
+        for future in wait(pending)[0]:
+            record(future)
+    return report
+
+
+def insert_bank_clients(supabase, result_chunks, upload_id, user_id, loan_col,
+                        batch_rows: int = BULK_INSERT_BATCH_ROWS, on_batch=None) -> BulkInsertReport:
+    """Persist scored result chunks as ``bank_clients`` rows in batches."""
+    row_chunks = (build_bank_client_rows(chunk, upload_id, user_id, loan_col) for chunk in result_chunks)
+    try:
+        return bulk_insert(supabase, "bank_clients", iter_batches(row_chunks, batch_rows), on_batch=on_batch)
+    finally:
+        query_cache.invalidate("bank_clients")
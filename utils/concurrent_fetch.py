@@ -0,0 +1,79 @@
+"""Run a dashboard's independent queries in parallel.
+
+Pages declare their queries as ``name -> callable`` and get one
+``QueryResult`` per query, so a page waits for its slowest query rather than
+the sum of all of them. A query that fails or misses its deadline only marks
+its own result; the page renders the other sections and reports the rest.
+
+The callables run on a shared pool, outside the Streamlit script thread, so
+they must not call ``st.*``.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+from utils.config import FETCH_TIMEOUT_SECONDS, FETCH_WORKERS
+from utils.metrics import observe
+
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="loanalyze-fetch")
+
+
+@dataclass
+class QueryResult:
+    name: str
+    value: object = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _run(name, fn) -> QueryResult:
+    start = time.perf_counter()
+    try:
+        result = QueryResult(name, value=fn(), seconds=time.perf_counter() - start)
+    except Exception as e:
+        result = QueryResult(name, error=str(e) or type(e).__name__, seconds=time.perf_counter() - start)
+    observe("loanalyze_query_seconds", result.seconds, query=name, status="ok" if result.ok else "error")
+    return result
+
+
+def fetch_all(
+    queries: Dict[str, Callable],
+    timeout: float = FETCH_TIMEOUT_SECONDS,
+    timeouts: Optional[Dict[str, float]] = None,
+) -> Dict[str, QueryResult]:
+    """Run ``queries`` concurrently and collect their results by name.
+
+    Each query has its own deadline, ``timeouts[name]`` or ``timeout``
+    seconds after submission. A query past its deadline is reported as timed
+    out; it keeps running in the background, so a result that lands later
+    still warms the query cache for the next rerun.
+    """
+    timeouts = timeouts or {}
+    submitted = time.perf_counter()
+    futures = {name: _executor.submit(_run, name, fn) for name, fn in queries.items()}
+
+    results = {}
+    for name, future in futures.items():
+        limit = timeouts.get(name, timeout)
+        remaining = max(submitted + limit - time.perf_counter(), 0)
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            results[name] = QueryResult(name, error=f"timed out after {limit:g}s", seconds=limit)
+    return results
+
+
+def timings_frame(results: Dict[str, QueryResult]):
+    """Per-query timings as a small DataFrame for display."""
+    return pd.DataFrame([
+        {"Query": r.name, "Seconds": round(r.seconds, 3), "Status": "ok" if r.ok else r.error}
+        for r in results.values()
+    ])
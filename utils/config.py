@@ -0,0 +1,191 @@
+"""Runtime settings, read from the environment (or a local .env file)."""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# --------------------------
+# Batch scoring
+# --------------------------
+SCORING_CHUNK_ROWS = env_int("LOANALYZE_SCORING_CHUNK_ROWS", 50_000)
+RESULTS_PREVIEW_ROWS = env_int("LOANALYZE_RESULTS_PREVIEW_ROWS", 1_000)
+
+# --------------------------
+# Bulk inserts
+# --------------------------
+BULK_INSERT_BATCH_ROWS = env_int("LOANALYZE_BULK_INSERT_BATCH_ROWS", 500)
+BULK_INSERT_MAX_IN_FLIGHT = env_int("LOANALYZE_BULK_INSERT_MAX_IN_FLIGHT", 4)
+BULK_INSERT_MAX_RETRIES = env_int("LOANALYZE_BULK_INSERT_MAX_RETRIES", 3)
+BULK_INSERT_BACKOFF_SECONDS = env_float("LOANALYZE_BULK_INSERT_BACKOFF_SECONDS", 0.5)
+
+# --------------------------
+# Parallel scoring
+# --------------------------
+SCORING_WORKERS = env_int("LOANALYZE_SCORING_WORKERS", os.cpu_count() or 1)
+SCORING_BACKEND = os.getenv("LOANALYZE_SCORING_BACKEND", "thread")
+PARALLEL_SCORING_MIN_ROWS = env_int("LOANALYZE_PARALLEL_SCORING_MIN_ROWS", 20_000)
+
+# --------------------------
+# Model
+# --------------------------
+# "auto" prefers the memory-mapped artifact when present; "artifact" or
+# "pickle" force one format. Artifact mode scores with the flat forest engine.
+MODEL_FORMAT = os.getenv("LOANALYZE_MODEL_FORMAT", "auto")
+
+# --------------------------
+# Prediction cache
+# --------------------------
+PREDICTION_CACHE_MAX_ENTRIES = env_int("LOANALYZE_PREDICTION_CACHE_MAX_ENTRIES", 10_000)
+PREDICTION_CACHE_TTL_SECONDS = env_float("LOANALYZE_PREDICTION_CACHE_TTL_SECONDS", 3600)
+
+# --------------------------
+# Supabase reads
+# --------------------------
+# Rows per keyset page. Keep this at or below the PostgREST max-rows setting
+# (1000 by default), otherwise pages come back short and reads stop early.
+QUERY_PAGE_ROWS = env_int("LOANALYZE_QUERY_PAGE_ROWS", 1_000)
+
+# --------------------------
+# Query cache
+# --------------------------
+# Per-table TTLs for cached dashboard reads; 0 disables caching for a table.
+QUERY_CACHE_MAX_BYTES = env_int("LOANALYZE_QUERY_CACHE_MAX_MB", 256) * 1024 ** 2
+QUERY_CACHE_DEFAULT_TTL_SECONDS = env_float("LOANALYZE_QUERY_CACHE_TTL_SECONDS", 60)
+QUERY_CACHE_TTL_SECONDS = {
+    "applicant_submissions": env_float("LOANALYZE_QUERY_CACHE_TTL_SUBMISSIONS", 30),
+    "user_profile": env_float("LOANALYZE_QUERY_CACHE_TTL_PROFILES", 60),
+    "bank_uploads": env_float("LOANALYZE_QUERY_CACHE_TTL_UPLOADS", 60),
+    "bank_clients": env_float("LOANALYZE_QUERY_CACHE_TTL_CLIENTS", 120),
+    # audit rows are not written through the app, so nothing invalidates them
+    "audit_logs": env_float("LOANALYZE_QUERY_CACHE_TTL_AUDIT_LOGS", 15),
+}
+
+# --------------------------
+# Public dashboard rollups
+# --------------------------
+ROLLUP_REFRESH_SECONDS = env_float("LOANALYZE_ROLLUP_REFRESH_SECONDS", 60)
+# days before the newest rolled-up day that are re-aggregated on each
+# refresh, to pick up rows committed late with an earlier created_at
+ROLLUP_LOOKBACK_DAYS = env_int("LOANALYZE_ROLLUP_LOOKBACK_DAYS", 1)
+
+# --------------------------
+# Concurrent dashboard fetches
+# --------------------------
+FETCH_WORKERS = env_int("LOANALYZE_FETCH_WORKERS", 8)
+FETCH_TIMEOUT_SECONDS = env_float("LOANALYZE_FETCH_TIMEOUT_SECONDS", 15)
+
+# --------------------------
+# Submissions mirror
+# --------------------------
+MIRROR_SYNC_SECONDS = env_float("LOANALYZE_MIRROR_SYNC_SECONDS", 30)
+# re-read this far behind the newest mirrored created_at on each sync, to
+# pick up rows committed late with an earlier timestamp
+MIRROR_LOOKBACK_SECONDS = env_float("LOANALYZE_MIRROR_LOOKBACK_SECONDS", 300)
+MIRROR_MAX_PARTS = env_int("LOANALYZE_MIRROR_MAX_PARTS", 32)
+# there is one mirror per signed-in identity; this many keep their rows in memory
+MIRROR_MAX_LOADED = env_int("LOANALYZE_MIRROR_MAX_LOADED", 8)
+
+# --------------------------
+# Audit log browsing
+# --------------------------
+AUDIT_LOG_PAGE_ROWS = env_int("LOANALYZE_AUDIT_LOG_PAGE_ROWS", 50)
+
+# --------------------------
+# Supabase connection pool
+# --------------------------
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# required by batch job workers and CLIs; never replaced by the anon key
+SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+SUPABASE_POOL_MAX_CONNECTIONS = env_int("LOANALYZE_SUPABASE_POOL_MAX_CONNECTIONS", 32)
+SUPABASE_POOL_MAX_KEEPALIVE = env_int("LOANALYZE_SUPABASE_POOL_MAX_KEEPALIVE", 16)
+SUPABASE_KEEPALIVE_SECONDS = env_float("LOANALYZE_SUPABASE_KEEPALIVE_SECONDS", 60)
+SUPABASE_TIMEOUT_SECONDS = env_float("LOANALYZE_SUPABASE_TIMEOUT_SECONDS", 30)
+
+# --------------------------
+# Batch reports
+# --------------------------
+# finished charts, PDF, Excel and CSV bytes kept for download
+REPORT_CACHE_MAX_BYTES = env_int("LOANALYZE_REPORT_CACHE_MAX_MB", 512) * 1024 ** 2
+
+# --------------------------
+# Batch scoring jobs
+# --------------------------
+# worker threads started inside each dashboard process; set to 0 when
+# running dedicated workers with `python -m utils.job_worker`
+JOB_EMBEDDED_WORKERS = env_int("LOANALYZE_JOB_EMBEDDED_WORKERS", 1)
+JOB_POLL_SECONDS = env_float("LOANALYZE_JOB_POLL_SECONDS", 1)
+JOB_HEARTBEAT_SECONDS = env_float("LOANALYZE_JOB_HEARTBEAT_SECONDS", 10)
+# a running job whose worker has not checked in for this long is failed
+JOB_STALE_SECONDS = env_float("LOANALYZE_JOB_STALE_SECONDS", 120)
+JOB_RETENTION_HOURS = env_float("LOANALYZE_JOB_RETENTION_HOURS", 24)
+# how often the bank page re-reads the status of running jobs
+JOB_STATUS_REFRESH_SECONDS = env_float("LOANALYZE_JOB_STATUS_REFRESH_SECONDS", 2)
+
+# --------------------------
+# Micro-batching of single-row predictions
+# --------------------------
+# concurrent single-row predictions are scored together, up to this many
+# rows per call; 1 scores every row on its own
+MICRO_BATCH_MAX_ROWS = env_int("LOANALYZE_MICRO_BATCH_MAX_ROWS", 64)
+# how long the first row of a batch waits for others to join it
+MICRO_BATCH_MAX_WAIT_MS = env_float("LOANALYZE_MICRO_BATCH_MAX_WAIT_MS", 2)
+
+# --------------------------
+# HTTP scoring service
+# --------------------------
+SERVICE_HOST = os.getenv("LOANALYZE_SERVICE_HOST", "0.0.0.0")
+SERVICE_PORT = env_int("LOANALYZE_SERVICE_PORT", 8000)
+SERVICE_WORKERS = env_int("LOANALYZE_SERVICE_WORKERS", 2)
+# larger batches belong on the bank page's job queue
+SERVICE_MAX_BATCH_ROWS = env_int("LOANALYZE_SERVICE_MAX_BATCH_ROWS", 10_000)
+
+# --------------------------
+# Metrics export
+# --------------------------
+# Prometheus text endpoint per process; 0 disables it
+METRICS_PORT = env_int("LOANALYZE_METRICS_PORT", 0)
+METRICS_HOST = os.getenv("LOANALYZE_METRICS_HOST", "127.0.0.1")
+# file rewritten with the metrics; "{pid}" is replaced by the process id
+METRICS_FILE = os.getenv("LOANALYZE_METRICS_FILE")
+METRICS_FILE_SECONDS = env_float("LOANALYZE_METRICS_FILE_SECONDS", 15)
+
+# --------------------------
+# Profiling
+# --------------------------
+# pages whose every render is profiled, comma separated, or "all"; admins can
+# also arm a one-off profile of the next render from the admin dashboard
+PROFILE_PAGES = os.getenv("LOANALYZE_PROFILE", "")
+# "sampling" (collapsed stacks for flamegraphs) or "cprofile" (.prof for pstats/snakeviz)
+PROFILER = os.getenv("LOANALYZE_PROFILER", "sampling")
+PROFILE_SAMPLE_MS = env_float("LOANALYZE_PROFILE_SAMPLE_MS", 5)
+PROFILE_TOP_N = env_int("LOANALYZE_PROFILE_TOP_N", 25)
+# defaults to profiles/ in the project directory
+PROFILES_DIR = os.getenv("LOANALYZE_PROFILES_DIR")
+# oldest profiles are deleted beyond this many
+PROFILE_MAX_FILES = env_int("LOANALYZE_PROFILE_MAX_FILES", 200)
+
+# --------------------------
+# Startup
+# --------------------------
+# load the model and heavy libraries in a background thread at server start
+WARMUP_ENABLED = env_bool("LOANALYZE_WARMUP", True)
@@ -0,0 +1,240 @@
+"""Flattened-array inference for the random-forest loan model.
+
+Every tree of the fitted ``RandomForestClassifier`` is exported into one set
+of flat NumPy node arrays, and all trees are walked together with vectorized
+indexing: the (tree, row) pairs that have not reached a leaf yet advance one
+level per step, so each step only touches live paths.
+
+Results match scikit-learn exactly: inputs are evaluated as float32 against
+float64 thresholds, missing values follow each node's ``missing_go_to_left``,
+and per-tree probabilities are summed in estimator order before dividing by
+the tree count.
+
+Run ``python -m utils.forest_engine`` to compare single-row latency and batch
+throughput against scikit-learn.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# rows evaluated per traversal block; bounds the (n_trees, rows) work arrays
+BLOCK_ROWS = 4096
+
+ARRAY_NAMES = (
+    "left", "right", "feature", "threshold", "missing_go_to_left",
+    "is_leaf", "leaf_proba", "roots", "classes",
+)
+
+
+class FlatForest:
+    def __init__(self, left, right, feature, threshold, missing_go_to_left, leaf_proba,
+                 roots, classes, max_depth, feature_names=None, is_leaf=None):
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_go_to_left = missing_go_to_left
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.classes = classes
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        if is_leaf is None:
+            is_leaf = left == np.arange(len(left), dtype=left.dtype)
+        self.is_leaf = is_leaf
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.arrays().values())
+
+    def arrays(self) -> dict:
+        """The node arrays, by name, for serialization."""
+        return {name: getattr(self, name) for name in ARRAY_NAMES}
+
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        lefts, rights, features, thresholds, missing, probas, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = tree.__getstate__()["nodes"]
+            count = tree.node_count
+            ids = np.arange(offset, offset + count, dtype=np.int32)
+            leaf = tree.children_left == -1
+
+            lefts.append(np.where(leaf, ids, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(leaf, ids, tree.children_right + offset).astype(np.int32))
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            if "missing_go_to_left" in nodes.dtype.names:
+                missing.append(nodes["missing_go_to_left"].astype(bool))
+            else:
+                missing.append(np.zeros(count, dtype=bool))
+
+            value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            # scikit-learn divides by the leaf's sum at predict time, whether it stores
+            # counts or fractions; do the same so the results match bit for bit
+            normalizer = value.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(value / normalizer[:, np.newaxis])
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += count
+
+        return cls(
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            missing_go_to_left=np.concatenate(missing),
+            leaf_proba=np.concatenate(probas),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            max_depth=max_depth,
+            feature_names=getattr(model, "feature_names_in_", None),
+        )
+
+    def _as_matrix(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame) and self.feature_names is not None:
+            X = X[self.feature_names]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        return X
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        n = X.shape[0]
+        # flat (tree, row) paths, tree-major
+        node = np.repeat(self.roots, n)
+        rows = np.tile(np.arange(n), self.n_trees)
+        active = np.flatnonzero(~self.is_leaf[node])
+        has_missing = bool(np.isnan(X).any())
+
+        while active.size:
+            nodes = node[active]
+            values = X[rows[active], self.feature[nodes]]
+            go_left = values <= self.threshold[nodes]
+            if has_missing:
+                go_left = np.where(np.isnan(values), self.missing_go_to_left[nodes], go_left)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            node[active] = nodes
+            active = active[~self.is_leaf[nodes]]
+        return node.reshape(self.n_trees, n)
+
+    def _proba_block(self, X: np.ndarray) -> np.ndarray:
+        # reducing over the outer (tree) axis adds trees one after another,
+        # the same order scikit-learn accumulates them in
+        proba = self.leaf_proba[self._leaves(X)].sum(axis=0)
+        proba /= self.n_trees
+        return proba
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = self._as_matrix(X)
+        if len(X) <= BLOCK_ROWS:
+            return self._proba_block(X)
+        return np.concatenate([
+            self._proba_block(X[start:start + BLOCK_ROWS]) for start in range(0, len(X), BLOCK_ROWS)
+        ])
+
+    def predict(self, X):
+        """Return ``(labels, proba)`` from a single traversal."""
+        proba = self.predict_proba(X)
+        return self.classes.take(np.argmax(proba, axis=1)), proba
+
+
+# --------------------------
+# Benchmark against sklearn
+# --------------------------
+def _latency_percentiles(fn, rows, repeats):
+    timings = []
+    for i in range(repeats):
+        row = rows[i % len(rows):i % len(rows) + 1]
+        start = time.perf_counter()
+        fn(row)
+        timings.append(time.perf_counter() - start)
+    timings = np.asarray(timings) * 1000
+    return {"p50_ms": round(float(np.percentile(timings, 50)), 4),
+            "p99_ms": round(float(np.percentile(timings, 99)), 4)}
+
+
+def _throughput(fn, X, repeats=3):
+    best = min(_timed(fn, X) for _ in range(repeats))
+    return round(len(X) / best)
+
+
+def _timed(fn, X):
+    start = time.perf_counter()
+    fn(X)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    import pickle
+
+    from utils.batch_scoring import align_features
+    from utils.model_registry import MODEL_PATH, get_model_bundle
+    from utils.preprocessing import preprocess_input
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Benchmark the flattened forest against scikit-learn.")
+    parser.add_argument("--data", default=os.path.join(base_dir, "data", "Test Data.csv"))
+    parser.add_argument("--single-repeats", type=int, default=2000)
+    parser.add_argument("--batch-rows", type=int, nargs="+", default=[1_000, 28_000, 280_000])
+    parser.add_argument("--out", help="Write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    bundle = get_model_bundle()
+    engine = bundle.engine
+    model = bundle.model
+    if model is None:
+        with open(MODEL_PATH, "rb") as f:
+            model = pickle.load(f)
+    df = pd.read_csv(args.data)
+    frame = align_features(preprocess_input(df, bundle.encoder_table), bundle.feature_names).astype(np.float32)
+
+    labels, proba = engine.predict(frame)
+    exact = bool(np.array_equal(proba, model.predict_proba(frame))
+                 and np.array_equal(labels, model.predict(frame)))
+
+    def sklearn_applicant(row):
+        model.predict(row)
+        model.predict_proba(row)
+
+    results = {
+        "model_version": bundle.version,
+        "n_trees": engine.n_trees,
+        "max_depth": engine.max_depth,
+        "matches_sklearn": exact,
+        "single_row": {
+            "sklearn_predict_and_proba": _latency_percentiles(sklearn_applicant, frame, args.single_repeats),
+            "sklearn_predict_proba": _latency_percentiles(model.predict_proba, frame, args.single_repeats),
+            "flat_forest_predict": _latency_percentiles(engine.predict, frame, args.single_repeats),
+        },
+        "batch_rows_per_second": [],
+    }
+    for rows in args.batch_rows:
+        X = frame.sample(n=rows, replace=len(frame) < rows, random_state=0)
+        results["batch_rows_per_second"].append({
+            "rows": rows,
+            "sklearn": _throughput(model.predict_proba, X),
+            "flat_forest": _throughput(engine.predict_proba, X),
+        })
+
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
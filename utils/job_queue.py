@@ -0,0 +1,254 @@
+"""Local SQLite queue of bank batch-scoring jobs.
+
+A batch upload becomes a job. ``enqueue()`` stages the uploaded file under
+``data/jobs/<job id>/upload/`` and records a queued row in
+``data/jobs/jobs.sqlite3``. Workers (``utils.job_worker``, in dashboard
+processes or on their own) ``claim()`` the oldest queued job atomically,
+report progress as they go, and leave the results and report files in
+``data/jobs/<job id>/report/``. The job id doubles as the ``bank_uploads``
+id, so every upload row can be traced back to its job.
+
+SQLite in WAL mode stands in for a broker: any number of processes on the
+host can enqueue and claim, and each job is claimed exactly once.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+
+from utils.config import JOB_RETENTION_HOURS, JOB_STALE_SECONDS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOBS_DIR = os.path.join(BASE_DIR, "data", "jobs")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    filename TEXT NOT NULL,
+    notes TEXT,
+    state TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_created ON jobs (state, created_at);
+CREATE INDEX IF NOT EXISTS jobs_user_created ON jobs (user_id, created_at);
+"""
+
+
+@dataclass
+class Job:
+    id: str
+    user_id: Optional[str]
+    filename: str
+    notes: Optional[str]
+    state: str
+    progress: float
+    message: Optional[str]
+    result: Optional[dict]
+    error: Optional[str]
+    worker: Optional[str]
+    created_at: float
+    started_at: Optional[float]
+    heartbeat_at: Optional[float]
+    finished_at: Optional[float]
+
+    @classmethod
+    def from_row(cls, row) -> "Job":
+        values = dict(row)
+        values["result"] = json.loads(values["result"]) if values["result"] else None
+        return cls(**values)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+
+class JobQueue:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, "jobs.sqlite3")
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(self.directory, exist_ok=True)
+        # autocommit; multi-statement changes take an explicit write lock
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._initialized = True
+        return conn
+
+    def _execute(self, sql: str, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).rowcount
+        finally:
+            conn.close()
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id)
+
+    def upload_path(self, job: Job) -> str:
+        return os.path.join(self.job_dir(job.id), "upload", job.filename)
+
+    def report_dir(self, job_id: str) -> str:
+        return os.path.join(self.job_dir(job_id), "report")
+
+    def enqueue(self, file, filename: str, user_id: str, notes: str = None) -> str:
+        """Stage an uploaded file and queue it for scoring; returns the job id."""
+        job_id = str(uuid.uuid4())
+        filename = os.path.basename(filename)
+        upload_dir = os.path.join(self.job_dir(job_id), "upload")
+        os.makedirs(upload_dir)
+        file.seek(0)
+        with open(os.path.join(upload_dir, filename), "wb") as out:
+            shutil.copyfileobj(file, out, 1024 * 1024)
+        file.seek(0)
+
+        self._execute(
+            "INSERT INTO jobs (id, user_id, filename, notes, state, message, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, user_id, filename, notes, QUEUED, "Waiting for a worker", time.time()),
+        )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Move the oldest queued job to running for ``worker``, or return None."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE state = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET state = ?, worker = ?, started_at = ?, heartbeat_at = ?, message = ? WHERE id = ?",
+                    (RUNNING, worker, now, now, "Starting", row["id"]),
+                )
+                job = Job.from_row(conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+                conn.execute("COMMIT")
+                return job
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: str):
+        self._execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND state = ?", (time.time(), job_id, RUNNING))
+
+    def update_progress(self, job_id: str, progress: float, message: str):
+        self._execute(
+            "UPDATE jobs SET progress = ?, message = ?, heartbeat_at = ? WHERE id = ? AND state = ?",
+            (min(max(progress, 0.0), 1.0), message, time.time(), job_id, RUNNING),
+        )
+
+    def finish(self, job_id: str, result: dict) -> int:
+        """Mark a running job done; returns 0 if it is no longer running, e.g. failed as stale."""
+        finished = self._execute(
+            "UPDATE jobs SET state = ?, progress = 1, message = ?, result = ?, finished_at = ? "
+            "WHERE id = ? AND state = ?",
+            (DONE, "Done", json.dumps(result), time.time(), job_id, RUNNING),
+        )
+        # either way the job is over and is never retried
+        shutil.rmtree(os.path.join(self.job_dir(job_id), "upload"), ignore_errors=True)
+        return finished
+
+    def fail(self, job_id: str, error: str, result: dict = None) -> int:
+        """Mark a running job failed; returns 0 if it is no longer running."""
+        failed = self._execute(
+            "UPDATE jobs SET state = ?, message = ?, error = ?, result = ?, finished_at = ? "
+            "WHERE id = ? AND state = ?",
+            (FAILED, "Failed", error, json.dumps(result) if result else None, time.time(), job_id, RUNNING),
+        )
+        shutil.rmtree(os.path.join(self.job_dir(job_id), "upload"), ignore_errors=True)
+        return failed
+
+    def get(self, job_id: str) -> Optional[Job]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return Job.from_row(row) if row else None
+
+    def list_jobs(self, user_id: str, limit: int = 10) -> List[Job]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [Job.from_row(row) for row in rows]
+
+    def fail_stale(self, stale_seconds: float = JOB_STALE_SECONDS) -> int:
+        """Fail running jobs whose worker stopped checking in.
+
+        They are not retried: the worker may already have saved some of the
+        batch, and saving it again would duplicate client rows.
+        """
+        cutoff = time.time() - stale_seconds
+        conn = self._connect()
+        try:
+            ids = [row["id"] for row in conn.execute(
+                "SELECT id FROM jobs WHERE state = ? AND heartbeat_at < ?", (RUNNING, cutoff)
+            )]
+        finally:
+            conn.close()
+        failed = 0
+        for job_id in ids:
+            # the state check keeps a job that just finished from being failed
+            failed += self._execute(
+                "UPDATE jobs SET state = ?, message = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND state = ? AND heartbeat_at < ?",
+                (FAILED, "Failed", "The worker stopped responding; please upload the batch again.",
+                 time.time(), job_id, RUNNING, cutoff),
+            )
+        return failed
+
+    def purge_finished(self, retention_hours: float = JOB_RETENTION_HOURS) -> int:
+        """Delete finished jobs, and their files, older than the retention period."""
+        cutoff = time.time() - retention_hours * 3600
+        conn = self._connect()
+        try:
+            ids = [row["id"] for row in conn.execute(
+                "SELECT id FROM jobs WHERE state IN (?, ?) AND finished_at < ?", (DONE, FAILED, cutoff)
+            )]
+        finally:
+            conn.close()
+        for job_id in ids:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+            self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(ids)
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        finally:
+            conn.close()
+        return {state: counts.get(state, 0) for state in (QUEUED, RUNNING, DONE, FAILED)}
+
+
+job_queue = JobQueue(JOBS_DIR)
@@ -0,0 +1,238 @@
+"""Workers that run queued bank batch-scoring jobs.
+
+A job is scored chunk by chunk from its staged upload, saved as a
+``bank_uploads`` row (with the job id as its id) plus its ``bank_clients``
+rows, and finished by building the report files the bank page serves.
+Progress goes to the job queue as it runs, and a heartbeat thread keeps long
+steps from being mistaken for a dead worker.
+
+Dashboard processes start ``JOB_EMBEDDED_WORKERS`` worker threads on first
+use of the bank page. Dedicated workers, for more throughput or to keep
+scoring off the dashboard hosts entirely, run on their own:
+
+    python -m utils.job_worker --workers 4
+"""
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from dataclasses import asdict
+
+from utils.batch_scoring import iter_results, score_upload
+from utils.bulk_writer import insert_bank_clients
+from utils.config import (
+    JOB_EMBEDDED_WORKERS,
+    JOB_HEARTBEAT_SECONDS,
+    JOB_POLL_SECONDS,
+    SCORING_CHUNK_ROWS,
+)
+from utils.job_queue import JobQueue, job_queue
+from utils.metrics import ROW_BUCKETS, inc, observe, span, start_exporters
+from utils.model_registry import get_model_bundle
+from utils.report_cache import RESULTS_FILE, build_report, content_hash
+from utils.repository import insert_bank_upload
+from utils.supabase_client import service_client
+
+logger = logging.getLogger(__name__)
+
+# share of the progress bar for scoring, then saving; reports take the rest
+SCORING_SHARE = 0.6
+SAVING_SHARE = 0.3
+# housekeeping (stale and expired jobs) at most this often per worker
+HOUSEKEEPING_SECONDS = 60
+
+
+def run_job(queue: JobQueue, job, supabase) -> dict:
+    """Score, save and report one claimed job; returns the job's result."""
+    bundle = get_model_bundle()
+    report_dir = queue.report_dir(job.id)
+    os.makedirs(report_dir, exist_ok=True)
+    results_path = os.path.join(report_dir, RESULTS_FILE)
+    result = {}
+
+    start = time.perf_counter()
+    with open(queue.upload_path(job), "rb") as upload:
+        result["content_hash"] = content_hash(upload, bundle.version)
+
+        def show_scored(summary, fraction):
+            queue.update_progress(job.id, SCORING_SHARE * fraction, f"Scored {summary.total_rows:,} rows")
+
+        summary = score_upload(upload, job.filename, bundle, results_path, SCORING_CHUNK_ROWS, on_chunk=show_scored)
+    result.update(
+        model_version=bundle.version,
+        total_rows=summary.total_rows,
+        band_counts=summary.band_counts,
+        scoring_seconds=time.perf_counter() - start,
+    )
+
+    observe("loanalyze_batch_rows", summary.total_rows, buckets=ROW_BUCKETS)
+
+    queue.update_progress(job.id, SCORING_SHARE, "Saving upload")
+    with span("batch.upload_insert"):
+        insert_bank_upload(supabase, {
+            "id": job.id,
+            "user_id": job.user_id,
+            "original_filename": job.filename,
+            "notes": str(job.notes),
+            "total_clients": int(summary.total_rows),
+            "low_risk_count": int(summary.band_counts["Low"]),
+            "medium_risk_count": int(summary.band_counts["Medium"]),
+            "high_risk_count": int(summary.band_counts["High"])
+        })
+
+    def show_saved(report):
+        done = report.inserted / summary.total_rows if summary.total_rows else 1.0
+        queue.update_progress(
+            job.id, SCORING_SHARE + SAVING_SHARE * min(done, 1.0),
+            f"Saved {report.inserted:,} of {summary.total_rows:,} clients",
+        )
+
+    with span("batch.client_inserts"):
+        report = insert_bank_clients(
+            supabase, iter_results(results_path, SCORING_CHUNK_ROWS), job.id, job.user_id, summary.loan_col,
+            on_batch=show_saved,
+        )
+    result.update(
+        inserted=report.inserted,
+        batches=report.batches,
+        failed_rows=report.failed_rows,
+        failures=[asdict(failure) for failure in report.failures],
+    )
+
+    queue.update_progress(job.id, SCORING_SHARE + SAVING_SHARE, "Building reports")
+    result["report_seconds"] = build_report(report_dir, summary)
+    return result
+
+
+class JobWorker:
+    def __init__(self, queue: JobQueue, name: str, supabase_factory=service_client):
+        self.queue = queue
+        self.name = name
+        self.supabase_factory = supabase_factory
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self._last_housekeeping = 0.0
+
+    def _heartbeat(self, job_id: str, stop: threading.Event):
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                self.queue.heartbeat(job_id)
+            except Exception as e:
+                logger.warning("Heartbeat for job %s failed: %s", job_id, e)
+
+    def run_once(self) -> bool:
+        """Run the next queued job, if any; returns whether there was one."""
+        job = self.queue.claim(self.name)
+        if job is None:
+            return False
+
+        logger.info("%s running job %s (%s)", self.name, job.id, job.filename)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job.id, stop), daemon=True)
+        heartbeat.start()
+        try:
+            result = run_job(self.queue, job, self.supabase_factory())
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            if not self.queue.fail(job.id, str(e) or type(e).__name__):
+                logger.warning("Job %s had already been failed as stale", job.id)
+            self.jobs_failed += 1
+            inc("loanalyze_batch_jobs_total", state="failed")
+        else:
+            if self.queue.finish(job.id, result):
+                self.jobs_done += 1
+                inc("loanalyze_batch_jobs_total", state="done")
+            else:
+                # fail_stale() gave up on the job while it ran; it stays failed
+                logger.warning("Job %s finished after it was failed as stale; %s rows were saved",
+                               job.id, result.get("inserted", 0))
+                self.jobs_failed += 1
+                inc("loanalyze_batch_jobs_total", state="lost")
+        finally:
+            stop.set()
+            heartbeat.join()
+        return True
+
+    def _housekeeping(self):
+        if time.monotonic() - self._last_housekeeping < HOUSEKEEPING_SECONDS:
+            return
+        self._last_housekeeping = time.monotonic()
+        try:
+            self.queue.fail_stale()
+            self.queue.purge_finished()
+        except Exception as e:
+            logger.warning("Job housekeeping failed: %s", e)
+
+    def run_forever(self, stop: threading.Event = None):
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                # the queue itself is unavailable; back off and retry
+                logger.warning("%s could not claim a job: %s", self.name, e)
+            self._housekeeping()
+            stop.wait(JOB_POLL_SECONDS)
+
+
+def _worker_name(index: int) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def start_workers(count: int, queue: JobQueue = job_queue, stop: threading.Event = None) -> list:
+    if count > 0:
+        # fail now, not on every job, if the service key is missing
+        service_client()
+    threads = []
+    for index in range(count):
+        worker = JobWorker(queue, _worker_name(index))
+        thread = threading.Thread(
+            target=worker.run_forever, args=(stop,), name=f"loanalyze-job-{index}", daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+_embedded_lock = threading.Lock()
+_embedded_threads = None
+
+
+def start_embedded_workers(count: int = JOB_EMBEDDED_WORKERS):
+    """Start this process's worker threads once; later calls do nothing."""
+    global _embedded_threads
+    if _embedded_threads is not None:
+        return
+    with _embedded_lock:
+        if _embedded_threads is None:
+            _embedded_threads = start_workers(count)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run bank batch-scoring jobs from the local job queue.")
+    parser.add_argument("--workers", type=int, default=1, help="Jobs to run at the same time")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(levelname)s %(message)s")
+    start_exporters()
+    stop = threading.Event()
+    try:
+        threads = start_workers(args.workers, stop=stop)
+    except RuntimeError as e:
+        parser.error(str(e))
+    print(f"{args.workers} worker(s) polling {job_queue.path}; Ctrl+C to stop")
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        # running jobs finish before their threads exit
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""In-process metrics with a Prometheus text export.
+
+Stages are timed with ``span()``:
+
+    with span("applicant.predict"):
+        ...
+
+Each span observes its duration into the ``loanalyze_stage_seconds``
+histogram under its stage label. ``inc()`` and ``observe()`` feed any other
+counter or histogram. Recording costs a ``perf_counter`` pair, a bisect and
+a short lock, so instrumentation stays on in production.
+
+Every process keeps its own registry. ``start_exporters()`` publishes it once
+per process:
+
+- on ``http://<host>:LOANALYZE_METRICS_PORT/metrics`` (stdlib http.server),
+- and/or by rewriting ``LOANALYZE_METRICS_FILE`` every
+  ``LOANALYZE_METRICS_FILE_SECONDS``, e.g. for node_exporter's textfile
+  collector. ``{pid}`` in the path is replaced by the process id, so several
+  server processes do not overwrite each other.
+"""
+import bisect
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.config import METRICS_FILE, METRICS_FILE_SECONDS, METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+# seconds; from a single-row prediction up to a large batch job
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600,
+)
+# rows; from one applicant up to a million-row upload
+ROW_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+STAGE_SECONDS = "loanalyze_stage_seconds"
+
+HELP = {
+    STAGE_SECONDS: "Duration of instrumented pipeline stages",
+    "loanalyze_stage_errors_total": "Instrumented stages that raised",
+    "loanalyze_supabase_request_seconds": "Supabase HTTP request latency, up to the response headers",
+    "loanalyze_supabase_rows_read_total": "Rows returned by Supabase reads",
+    "loanalyze_supabase_rows_written_total": "Rows written to Supabase",
+    "loanalyze_query_seconds": "Dashboard queries run through concurrent_fetch",
+    "loanalyze_page_render_seconds": "Streamlit page renders",
+    "loanalyze_batch_rows": "Rows per scored bank batch",
+    "loanalyze_batch_jobs_total": "Finished bank batch jobs",
+    "loanalyze_applicant_submissions_total": "Applicant predictions submitted",
+}
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # name -> {label key: value}
+        self._histograms = {}  # name -> {label key: _Histogram}
+        self._buckets = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets=DEFAULT_BUCKETS, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self._buckets.setdefault(name, tuple(buckets)))
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """Time a block into ``loanalyze_stage_seconds``; errors are counted too."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            # Streamlit's st.stop()/st.rerun() exceptions are control flow, not errors
+            if isinstance(e, Exception):
+                self.inc("loanalyze_stage_errors_total", stage=stage, **labels)
+            raise
+        finally:
+            self.observe(STAGE_SECONDS, time.perf_counter() - start, stage=stage, **labels)
+
+    def snapshot(self) -> dict:
+        """Stage timings as ``{stage: {count, sum, mean}}``, for display."""
+        with self._lock:
+            stages = {}
+            for key, histogram in self._histograms.get(STAGE_SECONDS, {}).items():
+                stage = dict(key)["stage"]
+                entry = stages.setdefault(stage, {"count": 0, "sum": 0.0})
+                entry["count"] += histogram.count
+                entry["sum"] += histogram.sum
+        for entry in stages.values():
+            entry["mean"] = entry["sum"] / entry["count"] if entry["count"] else 0.0
+        return stages
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name in sorted(self._histograms):
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, (('le', _format_value(float(bound))),))} "
+                                     f"{cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._buckets.clear()
+
+
+metrics = MetricsRegistry()
+span = metrics.span
+inc = metrics.inc
+observe = metrics.observe
+
+
+# --------------------------
+# Exporters
+# --------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_metrics_file(path: str):
+    """Atomically replace ``path`` with the current metrics."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(metrics.render_prometheus())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _file_loop(path: str, interval: float):
+    while True:
+        try:
+            write_metrics_file(path)
+        except Exception as e:
+            logger.warning("Could not write metrics to %s: %s", path, e)
+        time.sleep(interval)
+
+
+_exporters_lock = threading.Lock()
+_exporters_started = False
+
+
+def start_exporters(port: int = METRICS_PORT, path: str = METRICS_FILE):
+    """Start the configured exporters once per process; later calls do nothing."""
+    global _exporters_started
+    if _exporters_started:
+        return
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        if port:
+            try:
+                server = ThreadingHTTPServer((METRICS_HOST, port), _MetricsHandler)
+            except OSError as e:
+                # another process on the host already serves this port
+                logger.warning("Metrics endpoint not started on port %d: %s", port, e)
+            else:
+                threading.Thread(target=server.serve_forever, name="loanalyze-metrics", daemon=True).start()
+        if path:
+            path = path.replace("{pid}", str(os.getpid()))
+            threading.Thread(
+                target=_file_loop, args=(path, METRICS_FILE_SECONDS), name="loanalyze-metrics-file", daemon=True
+            ).start()
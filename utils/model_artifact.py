@@ -0,0 +1,164 @@
+"""Versioned, memory-mappable model artifact.
+
+Layout under ``model/artifact/``::
+
+    manifest.json          points at the current version directory
+    v-<version>/*.npy      uncompressed tree arrays and encoder vocabularies
+
+Arrays are loaded with ``np.load(mmap_mode="r")``, so every worker process on
+a host maps the same page-cache pages instead of unpickling a private copy,
+and a cold start only parses the manifest. A new version is written to its
+own directory and ``manifest.json`` is swapped in atomically last, so readers
+never see a half-written artifact and existing mappings stay valid.
+
+Convert existing pickles with ``python -m utils.model_artifact``.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+
+from utils.forest_engine import ARRAY_NAMES, FlatForest
+from utils.preprocessing import EncoderTable
+
+FORMAT_NAME = "loanalyze-model"
+FORMAT_VERSION = 1
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARTIFACT_DIR = os.path.join(BASE_DIR, "model", "artifact")
+MANIFEST_NAME = "manifest.json"
+
+
+def manifest_path(artifact_dir: str = ARTIFACT_DIR) -> str:
+    return os.path.join(artifact_dir, MANIFEST_NAME)
+
+
+def _content_hash(arrays: dict, meta: dict) -> str:
+    digest = hashlib.sha256(json.dumps(meta, sort_keys=True).encode())
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(name.encode())
+        digest.update(str(array.dtype).encode())
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()[:12]
+
+
+def save_artifact(model, label_encoders: dict, artifact_dir: str = ARTIFACT_DIR, keep: int = 2) -> dict:
+    """Write ``model`` and its encoders as a new artifact version.
+
+    Returns the manifest. Up to ``keep`` versions are retained on disk.
+    """
+    engine = FlatForest.from_sklearn(model)
+    arrays = dict(engine.arrays())
+    encoders = {}
+    for i, (col, le) in enumerate(sorted(label_encoders.items())):
+        name = f"vocab_{i}"
+        # fixed-width unicode so the vocabulary itself can be memory-mapped
+        arrays[name] = np.asarray(le.classes_).astype(str)
+        encoders[col] = name
+
+    meta = {
+        "feature_names": [str(name) for name in engine.feature_names],
+        "max_depth": engine.max_depth,
+        "encoders": encoders,
+    }
+    version = _content_hash(arrays, meta)
+    directory = f"v-{version}"
+    version_dir = os.path.join(artifact_dir, directory)
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    if not os.path.isdir(version_dir):
+        tmp_dir = f"{version_dir}.tmp-{os.getpid()}"
+        os.makedirs(tmp_dir)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(tmp_dir, version_dir)
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "directory": directory,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "n_trees": engine.n_trees,
+        "arrays": {
+            name: {"file": f"{name}.npy", "dtype": str(array.dtype), "shape": list(array.shape)}
+            for name, array in arrays.items()
+        },
+        **meta,
+    }
+    tmp_manifest = f"{manifest_path(artifact_dir)}.tmp-{os.getpid()}"
+    with open(tmp_manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, manifest_path(artifact_dir))
+
+    _prune(artifact_dir, directory, keep)
+    return manifest
+
+
+def _prune(artifact_dir, current, keep):
+    versions = sorted(
+        (entry for entry in os.scandir(artifact_dir) if entry.is_dir() and entry.name.startswith("v-")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    # unlinking is safe for processes still mapping the old files
+    for entry in [entry for entry in versions if entry.name != current][keep - 1:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def read_manifest(artifact_dir: str = ARTIFACT_DIR) -> dict:
+    with open(manifest_path(artifact_dir)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_NAME or manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported model artifact {manifest.get('format')} v{manifest.get('format_version')}"
+        )
+    return manifest
+
+
+def load_artifact(artifact_dir: str = ARTIFACT_DIR, manifest: dict = None):
+    """Memory-map an artifact; returns ``(engine, encoder_table, manifest)``."""
+    manifest = manifest or read_manifest(artifact_dir)
+    version_dir = os.path.join(artifact_dir, manifest["directory"])
+
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        array = np.load(os.path.join(version_dir, spec["file"]), mmap_mode="r", allow_pickle=False)
+        if str(array.dtype) != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ValueError(f"Model artifact array {name} does not match its manifest")
+        arrays[name] = array
+
+    engine = FlatForest(
+        **{name: arrays[name] for name in ARRAY_NAMES},
+        max_depth=manifest["max_depth"],
+        feature_names=manifest["feature_names"],
+    )
+    encoder_table = EncoderTable({col: arrays[name] for col, name in manifest["encoders"].items()})
+    return engine, encoder_table, manifest
+
+
+def main(argv=None):
+    model_dir = os.path.join(BASE_DIR, "model")
+    parser = argparse.ArgumentParser(description="Convert pickled model and encoders to a mmap artifact.")
+    parser.add_argument("--model", default=os.path.join(model_dir, "loan_model.pkl"))
+    parser.add_argument("--encoders", default=os.path.join(model_dir, "label_encoders.pkl"))
+    parser.add_argument("--out", default=ARTIFACT_DIR)
+    args = parser.parse_args(argv)
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    with open(args.encoders, "rb") as f:
+        label_encoders = pickle.load(f)
+    manifest = save_artifact(model, label_encoders, args.out)
+    print(f"Wrote model artifact {manifest['version']} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Process-wide registry for the loan model and its label encoders.
+
+Streamlit re-executes a page on every widget interaction, so loading the
+pickles inside ``app()`` paid the full unpickling cost on each rerun. The
+registry keeps a single copy per server process that every session and
+dashboard shares, and reloads it when the files on disk change.
+
+When ``model/artifact/manifest.json`` exists (see ``utils.model_artifact``)
+the model is memory-mapped from it and served by the flat forest engine, so
+processes on a host share the same pages. Otherwise, or with
+``LOANALYZE_MODEL_FORMAT=pickle``, the pickled scikit-learn model is loaded.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+
+from utils.config import MODEL_FORMAT
+from utils.forest_engine import FlatForest
+from utils.model_artifact import load_artifact, manifest_path, read_manifest
+from utils.preprocessing import EncoderTable
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BASE_DIR, "model")
+MODEL_PATH = os.path.join(MODEL_DIR, "loan_model.pkl")
+ENCODERS_PATH = os.path.join(MODEL_DIR, "label_encoders.pkl")
+MANIFEST_PATH = manifest_path()
+
+
+@dataclass
+class ModelBundle:
+    # the scikit-learn model is only present in pickle format
+    model: object
+    label_encoders: dict
+    encoder_table: EncoderTable
+    engine: FlatForest
+    feature_names: list
+    format: str
+    version: str
+    loaded_at: float
+    load_seconds: float
+    memory_bytes: int
+
+
+_lock = threading.Lock()
+_bundle = None
+_fingerprint = None
+_stats = {"loads": 0, "reloads": 0, "last_error": None}
+
+
+def _artifact_paths():
+    if MODEL_FORMAT == "artifact" or (MODEL_FORMAT != "pickle" and os.path.exists(MANIFEST_PATH)):
+        return (MANIFEST_PATH,)
+    return (MODEL_PATH, ENCODERS_PATH)
+
+
+def _fingerprint_of(paths):
+    # mtime + size is cheap enough to check on every rerun
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+def _version_of(paths):
+    if paths == (MANIFEST_PATH,):
+        return read_manifest(os.path.dirname(MANIFEST_PATH))["version"]
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def _estimate_nbytes(model, encoder_table, engine):
+    """Approximate size of the tree arrays and encoder vocabularies."""
+    total = engine.nbytes
+    for estimator in getattr(model, "estimators_", []):
+        state = estimator.tree_.__getstate__()
+        total += state["nodes"].nbytes + state["values"].nbytes
+    for col in encoder_table.columns:
+        total += encoder_table.classes(col).nbytes
+    return total
+
+
+def _load_pickles(model_path, encoders_path):
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    with open(encoders_path, "rb") as f:
+        label_encoders = pickle.load(f)
+    engine = FlatForest.from_sklearn(model)
+    return model, label_encoders, EncoderTable.from_label_encoders(label_encoders), engine
+
+
+def _load(paths, version):
+    start = time.perf_counter()
+    if paths == (MANIFEST_PATH,):
+        model, label_encoders, model_format = None, None, "artifact"
+        engine, encoder_table, manifest = load_artifact(os.path.dirname(MANIFEST_PATH))
+        version = manifest["version"]
+    else:
+        model_format = "pickle"
+        model, label_encoders, encoder_table, engine = _load_pickles(*paths)
+    elapsed = time.perf_counter() - start
+
+    bundle = ModelBundle(
+        model=model,
+        label_encoders=label_encoders,
+        encoder_table=encoder_table,
+        engine=engine,
+        feature_names=list(engine.feature_names),
+        format=model_format,
+        version=version,
+        loaded_at=time.time(),
+        load_seconds=elapsed,
+        memory_bytes=_estimate_nbytes(model, encoder_table, engine),
+    )
+    logger.info("Loaded %s model %s in %.3fs (%d bytes)", model_format, version, elapsed, bundle.memory_bytes)
+    return bundle
+
+
+def get_model_bundle() -> ModelBundle:
+    """Return the shared model bundle, reloading it if the artifact changed.
+
+    If a reload fails (e.g. the file is mid-write) the previous bundle keeps
+    serving and the reload is retried on the next call.
+    """
+    global _bundle, _fingerprint
+
+    paths = _artifact_paths()
+    fingerprint = _fingerprint_of(paths)
+    bundle = _bundle
+    if bundle is not None and fingerprint == _fingerprint:
+        return bundle
+
+    with _lock:
+        if _bundle is not None and fingerprint == _fingerprint:
+            return _bundle
+
+        try:
+            version = _version_of(paths)
+            if _bundle is not None and version == _bundle.version:
+                # touched but unchanged
+                _fingerprint = fingerprint
+                return _bundle
+
+            new_bundle = _load(paths, version)
+        except Exception as e:
+            _stats["last_error"] = str(e)
+            if _bundle is None:
+                raise
+            logger.warning("Model reload failed, keeping %s: %s", _bundle.version, e)
+            return _bundle
+
+        if _bundle is not None:
+            _stats["reloads"] += 1
+        _stats["loads"] += 1
+        _stats["last_error"] = None
+        _bundle = new_bundle
+        _fingerprint = fingerprint
+        return _bundle
+
+
+def model_stats() -> dict:
+    """Load statistics for the currently registered model, for worker sizing."""
+    bundle = _bundle
+    stats = dict(_stats)
+    if bundle is not None:
+        stats.update({
+            "version": bundle.version,
+            "format": bundle.format,
+            "loaded_at": bundle.loaded_at,
+            "load_seconds": bundle.load_seconds,
+            "memory_bytes": bundle.memory_bytes,
+        })
+    return stats
@@ -0,0 +1,184 @@
+"""Multi-core scoring of large encoded feature matrices.
+
+The encoded frame is converted once into a C-contiguous float32 matrix (the
+dtype the trees evaluate in) and split into contiguous row shards.
+
+* ``thread`` backend: shards are views of that matrix. Tree traversal in
+  scikit-learn runs without the GIL, so threads scale across cores with no
+  copies at all.
+* ``process`` backend: the matrix is placed in a ``SharedMemory`` block once;
+  spawned workers attach to it by name and score their row range against
+  their own registry copy of the model (memory-mapped, and so shared, in
+  artifact format). Only the probabilities come back.
+
+Run ``python -m utils.parallel_scoring`` to print a speedup curve against
+worker count.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from utils.config import PARALLEL_SCORING_MIN_ROWS, SCORING_BACKEND, SCORING_WORKERS
+from utils.model_registry import get_model_bundle
+
+_thread_pools = {}
+_process_pools = {}
+
+
+def feature_matrix(df_processed: pd.DataFrame) -> np.ndarray:
+    return np.ascontiguousarray(df_processed.to_numpy(dtype=np.float32))
+
+
+def _shard_bounds(n_rows: int, shards: int):
+    bounds = np.linspace(0, n_rows, shards + 1, dtype=np.int64)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _predict_block(bundle, block: np.ndarray) -> np.ndarray:
+    if bundle.model is None:
+        return bundle.engine.predict_proba(block)[:, 1]
+    # wrap without copying so sklearn still sees the fitted feature names
+    frame = pd.DataFrame(block, columns=bundle.feature_names, copy=False)
+    return bundle.model.predict_proba(frame)[:, 1]
+
+
+def _thread_pool(workers: int) -> ThreadPoolExecutor:
+    if workers not in _thread_pools:
+        _thread_pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scoring")
+    return _thread_pools[workers]
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    if workers not in _process_pools:
+        # spawn, not fork: the Streamlit server is multi-threaded
+        _process_pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    return _process_pools[workers]
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # the parent owns and unlinks the block; spawned workers share its
+    # resource tracker, so attaching must not register the block again
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _score_shared_block(shm_name, shape, start, stop, version):
+    shm = _attach(shm_name)
+    try:
+        bundle = get_model_bundle()
+        if bundle.version != version:
+            raise RuntimeError(f"Worker has model {bundle.version}, expected {version}")
+        X = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        probs = _predict_block(bundle, X[start:stop])
+        del X
+        return probs
+    finally:
+        shm.close()
+
+
+def _predict_threads(bundle, X, workers):
+    pool = _thread_pool(workers)
+    futures = [pool.submit(_predict_block, bundle, X[a:b]) for a, b in _shard_bounds(len(X), workers)]
+    return np.concatenate([f.result() for f in futures])
+
+
+def _predict_processes(bundle, X, workers):
+    shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+    try:
+        shared = np.ndarray(X.shape, dtype=np.float32, buffer=shm.buf)
+        shared[:] = X
+        del shared
+        pool = _process_pool(workers)
+        futures = [
+            pool.submit(_score_shared_block, shm.name, X.shape, a, b, bundle.version)
+            for a, b in _shard_bounds(len(X), workers)
+        ]
+        return np.concatenate([f.result() for f in futures])
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def predict_default_proba(bundle, X: np.ndarray, workers: int = SCORING_WORKERS,
+                          backend: str = SCORING_BACKEND) -> np.ndarray:
+    """Probability of default for each row of a float32 feature matrix."""
+    if workers <= 1 or len(X) < PARALLEL_SCORING_MIN_ROWS:
+        return _predict_block(bundle, X)
+    if backend == "process":
+        return _predict_processes(bundle, X, workers)
+    if backend == "thread":
+        return _predict_threads(bundle, X, workers)
+    raise ValueError(f"Unknown scoring backend: {backend}")
+
+
+# --------------------------
+# Speedup curve
+# --------------------------
+def benchmark_speedup(bundle, X: np.ndarray, worker_counts, backend: str, repeats: int = 3) -> list:
+    results = []
+    for workers in worker_counts:
+        predict_default_proba(bundle, X[:PARALLEL_SCORING_MIN_ROWS], workers, backend)  # warm pools
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predict_default_proba(bundle, X, workers, backend)
+            timings.append(time.perf_counter() - start)
+        seconds = min(timings)
+        results.append({
+            "workers": workers,
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(len(X) / seconds),
+        })
+    for row in results:
+        row["speedup"] = round(results[0]["seconds"] / row["seconds"], 2)
+        row["efficiency"] = round(row["speedup"] / (row["workers"] / results[0]["workers"]), 2)
+    return results
+
+
+def main(argv=None):
+    from utils.batch_scoring import align_features
+    from utils.preprocessing import preprocess_input
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Measure batch scoring speedup against worker count.")
+    parser.add_argument("--data", default=os.path.join(base_dir, "data", "Test Data.csv"))
+    parser.add_argument("--rows", type=int, default=280_000)
+    parser.add_argument("--backend", choices=["thread", "process"], default=SCORING_BACKEND)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, 8, os.cpu_count() or 1}))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--out", help="Write the curve as JSON to this path")
+    args = parser.parse_args(argv)
+
+    bundle = get_model_bundle()
+    df = pd.read_csv(args.data)
+    df = df.sample(n=args.rows, replace=len(df) < args.rows, random_state=0)
+    X = feature_matrix(align_features(preprocess_input(df, bundle.encoder_table), bundle.feature_names))
+
+    curve = benchmark_speedup(bundle, X, args.workers, args.backend, args.repeats)
+    print(f"{'workers':>8} {'seconds':>9} {'rows/s':>11} {'speedup':>8} {'efficiency':>10}")
+    for row in curve:
+        print(f"{row['workers']:>8} {row['seconds']:>9.3f} {row['rows_per_second']:>11,} "
+              f"{row['speedup']:>8.2f} {row['efficiency']:>10.2f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "backend": args.backend,
+                "rows": len(X),
+                "cpu_count": os.cpu_count(),
+                "model_version": bundle.version,
+                "curve": curve,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
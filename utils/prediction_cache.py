@@ -0,0 +1,101 @@
+"""Process-wide LRU/TTL cache of single-application predictions.
+
+Keys hash the encoded feature vector as float32 (the precision the trees
+compare in, so inputs that score identically share an entry) together with
+the model version. Seeing a new model version clears the cache.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.config import PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_TTL_SECONDS
+from utils.micro_batcher import micro_batcher
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key_for(features, version: str) -> str:
+        vector = np.ascontiguousarray(features, dtype=np.float32)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(version.encode())
+        digest.update(str(vector.shape).encode())
+        digest.update(vector.tobytes())
+        return digest.hexdigest()
+
+    def _sync_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._sync_version(version)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_TTL_SECONDS)
+
+
+def predict_cached(bundle, features):
+    """``(label, probabilities)`` for one encoded feature row, memoized.
+
+    Misses are scored through the micro-batcher together with other
+    sessions' concurrent predictions.
+    """
+    key = PredictionCache.key_for(features, bundle.version)
+    result = prediction_cache.get(key, bundle.version)
+    if result is None:
+        result = micro_batcher.predict(bundle, features)
+        prediction_cache.put(key, bundle.version, result)
+    return result
@@ -0,0 +1,62 @@
+"""Feature preprocessing shared by the bank and applicant dashboards."""
+import numpy as np
+import pandas as pd
+
+COLUMN_RENAMES = {
+    "Married/Single": "marital_status",
+    "CURRENT_JOB_YRS": "job_years",
+    "CURRENT_HOUSE_YRS": "house_years",
+}
+
+UNSEEN_CODE = -1
+
+
+class EncoderTable:
+    """Precompiled label-encoder vocabularies.
+
+    Codes are positions in each column's sorted vocabulary, exactly as
+    ``LabelEncoder.transform`` assigns them, and values outside the
+    vocabulary encode to ``UNSEEN_CODE``. Whole columns are encoded in one
+    vectorized hash lookup through a pandas ``Index``.
+    """
+
+    def __init__(self, vocabularies: dict):
+        self._classes = {col: np.asarray(classes) for col, classes in vocabularies.items()}
+        self._indexes = {col: pd.Index(classes) for col, classes in self._classes.items()}
+        self._lookup = {
+            col: {value: code for code, value in enumerate(classes.tolist())}
+            for col, classes in self._classes.items()
+        }
+
+    @classmethod
+    def from_label_encoders(cls, label_encoders: dict) -> "EncoderTable":
+        return cls({col: le.classes_ for col, le in label_encoders.items()})
+
+    def __contains__(self, col) -> bool:
+        return col in self._classes
+
+    @property
+    def columns(self) -> list:
+        return list(self._classes)
+
+    def classes(self, col) -> np.ndarray:
+        return self._classes[col]
+
+    def encode_column(self, col, values) -> np.ndarray:
+        # -1 (UNSEEN_CODE) for values outside the vocabulary and for missing values
+        return self._indexes[col].get_indexer(values).astype(np.int64)
+
+    def encode_value(self, col, value) -> int:
+        return self._lookup[col].get(value, UNSEEN_CODE)
+
+
+def preprocess_input(df: pd.DataFrame, encoder_table: EncoderTable) -> pd.DataFrame:
+    """Rename upload columns to the training schema and label-encode categoricals."""
+    df = df.rename(columns=COLUMN_RENAMES)
+
+    for col in df.select_dtypes(include=["object", "string", "category"]).columns:
+        if col in encoder_table:
+            df[col] = encoder_table.encode_column(col, df[col])
+        else:
+            df[col] = UNSEEN_CODE
+    return df
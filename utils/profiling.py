@@ -0,0 +1,278 @@
+"""On-demand profiles of page renders.
+
+``app.py`` wraps each page render in ``profile_render(page, role)``. A render
+is profiled when its page is listed in ``LOANALYZE_PROFILE`` (or it is
+``all``), or when an admin armed a one-off profile of that page's next render
+with ``arm()``. Only one render per process is profiled at a time; others run
+as usual.
+
+Two profilers, chosen by ``LOANALYZE_PROFILER`` or when arming:
+
+- ``sampling`` samples the render's thread every ``LOANALYZE_PROFILE_SAMPLE_MS``
+  and writes collapsed stacks, ready for ``flamegraph.pl`` or speedscope.
+  Other sessions' threads are not sampled.
+- ``cprofile`` traces every call with cProfile and writes a ``.prof`` file for
+  pstats or snakeviz. It slows the render down more.
+
+Each profile also gets a top-N hotspot summary (``.txt``) and its tags
+(``.json``): page, role, input size, duration and profiler. Pages report their
+input size with ``note_input()``, e.g. the rows or bytes they are working on.
+Files go to ``profiles/`` (``LOANALYZE_PROFILES_DIR``), and only the newest
+``LOANALYZE_PROFILE_MAX_FILES`` profiles are kept.
+"""
+import collections
+import cProfile
+import glob
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from utils.config import (
+    PROFILE_MAX_FILES,
+    PROFILE_PAGES,
+    PROFILE_SAMPLE_MS,
+    PROFILE_TOP_N,
+    PROFILER,
+    PROFILES_DIR,
+)
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES_PATH = PROFILES_DIR or os.path.join(BASE_DIR, "profiles")
+
+SAMPLING, CPROFILE = "sampling", "cprofile"
+PROFILERS = [SAMPLING, CPROFILE]
+
+_lock = threading.Lock()
+_armed = {}  # page -> profiler, consumed by the page's next render
+_active = threading.Lock()  # held while a render is being profiled
+_current = threading.local()
+
+
+def _configured_pages() -> set:
+    return {page.strip().lower() for page in PROFILE_PAGES.split(",") if page.strip()}
+
+
+def arm(page: str, profiler: str = PROFILER):
+    """Profile the next render of ``page`` in this process, from any session."""
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler {profiler!r}; expected one of {', '.join(PROFILERS)}")
+    with _lock:
+        _armed[page] = profiler
+
+
+def armed() -> dict:
+    with _lock:
+        return dict(_armed)
+
+
+def _take(page: str) -> Optional[str]:
+    """The profiler to run for this render of ``page``, if any.
+
+    Holds ``_active`` when it returns one. An armed profile waits for a
+    render that finds no other profile running.
+    """
+    pages = _configured_pages()
+    with _lock:
+        profiler = _armed.get(page)
+        if profiler is None and ("all" in pages or page in pages):
+            profiler = PROFILER if PROFILER in PROFILERS else SAMPLING
+        if profiler is None or not _active.acquire(blocking=False):
+            return None
+        _armed.pop(page, None)
+    return profiler
+
+
+def note_input(**sizes):
+    """Tag the profile of the current render, if any, with its input size."""
+    tags = getattr(_current, "input", None)
+    if tags is not None:
+        tags.update(sizes)
+
+
+# --------------------------
+# Sampling profiler
+# --------------------------
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loanalyze-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+                self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def hotspots(self, top_n: int) -> str:
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            # recursive frames count once per sample
+            for name in set(frames):
+                total[name] += count
+        samples = self.samples or 1
+        lines = [f"{'own %':>7} {'total %':>8}  function"]
+        for name, count in own.most_common(top_n):
+            lines.append(f"{100 * count / samples:>7.1f} {100 * total[name] / samples:>8.1f}  {name}")
+        lines.append("")
+        lines.append("Largest total share (including callees):")
+        for name, count in total.most_common(top_n):
+            lines.append(f"{100 * count / samples:>7.1f}%  {name}")
+        return "\n".join(lines) + "\n"
+
+
+# --------------------------
+# Output
+# --------------------------
+def _slug(value) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", str(value)).strip("-") or "none"
+
+
+def _prune(directory: str, keep: int):
+    tags = sorted(glob.glob(os.path.join(directory, "*.json")), key=os.path.getmtime)
+    for path in tags[:max(len(tags) - keep, 0)]:
+        for old in glob.glob(path[:-len(".json")] + ".*"):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+def _write_profile(tags: dict, artifact_ext: str, write_artifact, hotspots: str) -> str:
+    os.makedirs(PROFILES_PATH, exist_ok=True)
+    stem = "-".join([
+        time.strftime("%Y%m%d-%H%M%S", time.localtime(tags["started_at"])) + f"{tags['started_at'] % 1:.3f}"[1:],
+        _slug(tags["page"]), _slug(tags["role"]), str(os.getpid()),
+    ])
+    base = os.path.join(PROFILES_PATH, stem)
+    write_artifact(base + artifact_ext)
+
+    header = [f"{key}: {tags[key]}" for key in ("page", "role", "input", "profiler", "seconds", "pid")]
+    if "samples" in tags:
+        header.append(f"samples: {tags['samples']}")
+    with open(base + ".txt", "w") as f:
+        f.write("\n".join(header) + "\n\n" + hotspots)
+
+    tags = dict(tags, profile=os.path.basename(base + artifact_ext), summary=os.path.basename(base + ".txt"))
+    with open(base + ".json", "w") as f:
+        json.dump(tags, f, indent=2)
+    _prune(PROFILES_PATH, PROFILE_MAX_FILES)
+    return base
+
+
+@contextmanager
+def profile_render(page: str, role: str = None):
+    """Profile one render of ``page`` if it is configured or armed."""
+    profiler = _take(page)
+    if profiler is None:
+        yield
+        return
+
+    _current.input = {}
+    tags = {
+        "page": page,
+        "role": role or "anonymous",
+        "profiler": profiler,
+        "pid": os.getpid(),
+        "started_at": time.time(),
+    }
+    sampler = profile = None
+    try:
+        if profiler == CPROFILE:
+            profile = cProfile.Profile()
+            profile.enable()
+        else:
+            sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_MS / 1000)
+            sampler.start()
+    except Exception as e:
+        # e.g. another profiler already attached to the process
+        logger.warning("Could not start profiling %s: %s", page, e)
+        _current.input = None
+        _active.release()
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        # Streamlit ends a script early by raising, so the profile is written however it exits
+        yield
+    finally:
+        try:
+            if profile is not None:
+                profile.disable()
+            if sampler is not None:
+                sampler.stop()
+            tags["seconds"] = round(time.perf_counter() - start, 4)
+            tags["input"] = _current.input
+            if profile is not None:
+                stream = io.StringIO()
+                pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+                base = _write_profile(tags, ".prof", profile.dump_stats, stream.getvalue())
+            else:
+                tags["samples"] = sampler.samples
+
+                def write_collapsed(path):
+                    with open(path, "w") as f:
+                        f.write(sampler.collapsed())
+
+                base = _write_profile(tags, ".collapsed", write_collapsed, sampler.hotspots(PROFILE_TOP_N))
+            logger.info("Profiled %s render in %.2fs: %s", page, tags["seconds"], base)
+        except Exception as e:
+            # a failed profile must not break the page
+            logger.warning("Could not write the profile of %s: %s", page, e)
+        finally:
+            _current.input = None
+            _active.release()
+
+
+def list_profiles(limit: int = 20) -> list:
+    """Tags of the newest profiles, newest first."""
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(PROFILES_PATH, "*.json")), key=os.path.getmtime, reverse=True)[:limit]:
+        try:
+            with open(path) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(name: str) -> str:
+    return os.path.join(PROFILES_PATH, os.path.basename(name))
@@ -0,0 +1,155 @@
+"""Process-wide cache of dashboard query results.
+
+Public, admin and bank pages re-run their reads on every rerun of every
+session. Results are kept per query with a per-table TTL, inside a memory
+budget enforced by evicting the least recently used entries. Concurrent
+misses for the same query wait on one fetch instead of each hitting the
+database. Writes made through ``utils.repository`` invalidate every entry
+of the tables they touch.
+
+Sessions read through their own signed-in clients, so what a query returns
+depends on who runs it. Keys include the reader's ``auth_scope()`` and
+results are only shared between sessions reading as the same identity.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+
+from utils.config import QUERY_CACHE_DEFAULT_TTL_SECONDS, QUERY_CACHE_MAX_BYTES, QUERY_CACHE_TTL_SECONDS
+
+# with copy-on-write (always on from pandas 3) a shallow copy is enough to
+# keep callers that add or convert columns from changing the cached frame
+_SHALLOW_COPY = int(pd.__version__.split(".")[0]) >= 3 or pd.options.mode.copy_on_write is True
+
+
+def _frame_nbytes(frame: pd.DataFrame) -> int:
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+class QueryCache:
+    def __init__(self, max_bytes: int, ttl_seconds: dict, default_ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = dict(ttl_seconds)
+        self.default_ttl_seconds = default_ttl_seconds
+        # key -> (table, expires_at, nbytes, frame)
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for(self, table: str) -> float:
+        return self.ttl_seconds.get(table, self.default_ttl_seconds)
+
+    def _drop(self, key):
+        _, _, nbytes, _ = self._entries.pop(key)
+        self.nbytes -= nbytes
+
+    def _store(self, key, table, frame):
+        nbytes = _frame_nbytes(frame)
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (table, time.monotonic() + self.ttl_for(table), nbytes, frame)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get_or_fetch(self, table: str, key, fetch) -> pd.DataFrame:
+        """Cached result of ``fetch()`` for ``key``, fetching it on a miss.
+
+        ``key`` must identify the query (table, columns, filters) and who runs
+        it (``utils.supabase_client.auth_scope``). Callers get their own copy
+        of the frame and may modify it.
+        """
+        if self.ttl_for(table) <= 0:
+            return fetch()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[3].copy(deep=not _SHALLOW_COPY)
+                self._drop(key)
+
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = Future()
+                self._in_flight[key] = future
+                generation = self._generations.get(table, 0)
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result().copy(deep=not _SHALLOW_COPY)
+
+        try:
+            frame = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            # a write landed while this fetch ran; the result may predate it
+            if self._generations.get(table, 0) == generation:
+                self._store(key, table, frame)
+        future.set_result(frame)
+        return frame.copy(deep=not _SHALLOW_COPY)
+
+    def generation(self, table: str) -> int:
+        """Counter bumped whenever ``table`` is invalidated by a write."""
+        with self._lock:
+            return self._generations.get(table, 0)
+
+    def invalidate(self, *tables: str):
+        """Drop every cached query of ``tables``."""
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key, entry in self._entries.items() if entry[0] in tables]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            tables = set(self.ttl_seconds) | set(self._generations) | {entry[0] for entry in self._entries.values()}
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+query_cache = QueryCache(QUERY_CACHE_MAX_BYTES, QUERY_CACHE_TTL_SECONDS, QUERY_CACHE_DEFAULT_TTL_SECONDS)
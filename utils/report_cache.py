@@ -0,0 +1,146 @@
+"""Batch report artifacts on disk, cached in memory for download.
+
+The batch job worker scores an upload into ``predictions.csv`` and then
+calls ``build_report()``, which writes the charts, PDF and Excel workbook
+next to it. Charts and PDF are rendered in memory from the batch's
+aggregated chart data. The bank page reads a finished report's charts and
+PDF once through ``report_cache`` and then keeps their bytes in an LRU
+bounded by bytes, keyed by upload id and content hash. Those stay small
+however many rows the batch has. The results CSV and Excel workbook grow
+with the batch, so they are only ever served from their files on disk.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+from utils.config import REPORT_CACHE_MAX_BYTES, SCORING_CHUNK_ROWS
+from utils.metrics import span
+from utils.reports import CHART_NAMES, EXCEL_MAX_ROWS, build_pdf_report, render_chart_pngs, write_excel_report
+
+RESULTS_FILE = "predictions.csv"
+PDF_FILE = "loan_report.pdf"
+EXCEL_FILE = "loan_predictions.xlsx"
+
+
+def content_hash(file, model_version: str) -> str:
+    """Hash an uploaded file's bytes together with the model that scores them."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model_version.encode())
+    file.seek(0)
+    for block in iter(lambda: file.read(1024 * 1024), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _chart_file(name: str) -> str:
+    return f"chart_{name}.png"
+
+
+def _write_file(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_report(report_dir: str, summary) -> float:
+    """Write charts, PDF and (if it fits) Excel next to ``RESULTS_FILE``; returns seconds taken."""
+    start = time.perf_counter()
+    with span("batch.charts"):
+        charts = render_chart_pngs(summary.chart_data)
+        for name, png in zip(CHART_NAMES, charts):
+            _write_file(os.path.join(report_dir, _chart_file(name)), png)
+    with span("batch.pdf"):
+        _write_file(os.path.join(report_dir, PDF_FILE), build_pdf_report(summary, charts))
+
+    if summary.total_rows <= EXCEL_MAX_ROWS:
+        excel_path = os.path.join(report_dir, EXCEL_FILE)
+        with span("batch.excel"):
+            write_excel_report(os.path.join(report_dir, RESULTS_FILE), f"{excel_path}.tmp", SCORING_CHUNK_ROWS)
+        os.replace(f"{excel_path}.tmp", excel_path)
+    return time.perf_counter() - start
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@dataclass
+class ReportArtifacts:
+    charts: List[bytes]
+    pdf: bytes
+    excel_path: Optional[str]
+    csv_path: str
+
+    @classmethod
+    def load(cls, report_dir: str) -> "ReportArtifacts":
+        excel_path = os.path.join(report_dir, EXCEL_FILE)
+        csv_path = os.path.join(report_dir, RESULTS_FILE)
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(csv_path)
+        return cls(
+            charts=[_read_file(os.path.join(report_dir, _chart_file(name))) for name in CHART_NAMES],
+            pdf=_read_file(os.path.join(report_dir, PDF_FILE)),
+            excel_path=excel_path if os.path.exists(excel_path) else None,
+            csv_path=csv_path,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(map(len, self.charts)) + len(self.pdf)
+
+
+class ReportCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (upload_id, content_hash) -> ReportArtifacts
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, upload_id: str, content_hash: str, report_dir: str) -> ReportArtifacts:
+        """The report for a finished batch, read from ``report_dir`` on first use."""
+        key = (upload_id, content_hash)
+        with self._lock:
+            artifacts = self._entries.get(key)
+            if artifacts is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return artifacts
+            self.misses += 1
+
+        artifacts = ReportArtifacts.load(report_dir)
+        with self._lock:
+            # a report larger than the whole budget is served but not kept
+            if key not in self._entries and artifacts.nbytes <= self.max_bytes:
+                self._entries[key] = artifacts
+                self._nbytes += artifacts.nbytes
+                while self._nbytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._nbytes -= evicted.nbytes
+                    self.evictions += 1
+        return artifacts
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "nbytes": self._nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+report_cache = ReportCache(REPORT_CACHE_MAX_BYTES)
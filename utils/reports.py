@@ -0,0 +1,147 @@
+"""Report artifacts for scored bank batches.
+
+Charts are drawn on standalone ``Figure`` objects and rendered to PNG bytes
+in memory, never through pyplot's global figure state or the working
+directory, so reports for concurrent batches can be built on any thread.
+
+matplotlib, xlsxwriter and fpdf are imported on first use: most visits to
+the bank page never produce a report, and together they add noticeably to
+the page's first load.
+"""
+import os
+import tempfile
+from io import BytesIO
+
+from utils.batch_scoring import iter_results
+
+RISK_COLORS = ["#28a745", "#ffc107", "#dc3545"]
+
+# xlsx sheets hold 1,048,576 rows including the header
+EXCEL_MAX_ROWS = 1_048_575
+
+
+CHART_NAMES = ["pie", "bar", "hist", "loan"]
+
+
+def load_chart_backend():
+    """Import matplotlib on the headless Agg backend.
+
+    pandas' plotting imports pyplot, so the backend is pinned first.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    return Figure, FigureCanvasAgg
+
+
+def _new_figure(figsize):
+    Figure, FigureCanvasAgg = load_chart_backend()
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def figure_png(fig) -> bytes:
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def write_excel_report(results_path: str, out_path: str, chunk_rows: int):
+    """Stream a results CSV into an xlsx file with constant memory.
+
+    xlsxwriter's constant_memory mode flushes each row as soon as the next
+    one starts, so rows are written strictly in order, one chunk at a time.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(out_path, {"constant_memory": True})
+    try:
+        sheet = workbook.add_worksheet()
+        row_index = 0
+        for chunk in iter_results(results_path, chunk_rows):
+            if row_index == 0:
+                sheet.write_row(0, 0, list(chunk.columns))
+                row_index = 1
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for values in chunk.itertuples(index=False, name=None):
+                if row_index > EXCEL_MAX_ROWS:
+                    return
+                sheet.write_row(row_index, 0, values)
+                row_index += 1
+    finally:
+        workbook.close()
+
+
+def render_chart_pngs(chart_data) -> list:
+    """Risk pie, risk bar, probability histogram and loan/profit charts as PNG bytes.
+
+    Drawn from a ``ChartData`` aggregate, so each chart has a few dozen
+    points whatever the batch size.
+    """
+    counts = chart_data.band_series()
+
+    # Pie Chart
+    fig1 = _new_figure((5, 5))
+    ax1 = fig1.subplots()
+    present = counts > 0
+    counts[present].plot.pie(
+        autopct="%1.1f%%", startangle=90, ax=ax1, colors=[c for c, p in zip(RISK_COLORS, present) if p]
+    )
+    ax1.set_ylabel("")
+    ax1.set_title("Risk Band Distribution")
+
+    # Bar Chart
+    fig2 = _new_figure((6, 4))
+    ax2 = fig2.subplots()
+    counts.plot(kind="bar", ax=ax2, color=RISK_COLORS)
+    ax2.set_title("Applicants per Risk Band")
+    ax2.set_xlabel("Risk Band")
+    ax2.set_ylabel("Count")
+
+    # Histogram
+    fig3 = _new_figure((6, 4))
+    ax3 = fig3.subplots()
+    edges = chart_data.bin_edges
+    ax3.hist(edges[:-1], bins=edges, weights=chart_data.histogram, color="#007bff")
+    ax3.set_title("Default Probability Distribution")
+    ax3.set_xlabel("Default Probability")
+    ax3.set_ylabel("Frequency")
+
+    # Loan vs Profit
+    fig4 = _new_figure((6, 4))
+    ax4 = fig4.subplots()
+    chart_data.sums_frame().plot(kind="bar", ax=ax4)
+    ax4.set_title("Total Loan Amount & Estimated Profit by Risk Band")
+    ax4.set_xlabel("Risk Band")
+    ax4.set_ylabel("Amount")
+
+    return [figure_png(fig) for fig in (fig1, fig2, fig3, fig4)]
+
+
+def build_pdf_report(summary, chart_pngs) -> bytes:
+    """Summary page plus one page per chart."""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, "Loan Prediction Report", ln=True, align="C")
+
+    pdf.set_font("Arial", "", 12)
+    pdf.cell(0, 10, f"Total Applicants: {summary.total_rows}", ln=True)
+    pdf.cell(0, 10, f"Low Risk: {summary.band_counts['Low']}", ln=True)
+    pdf.cell(0, 10, f"Medium Risk: {summary.band_counts['Medium']}", ln=True)
+    pdf.cell(0, 10, f"High Risk: {summary.band_counts['High']}", ln=True)
+
+    # pyfpdf only embeds images from files, so they go to a private directory
+    with tempfile.TemporaryDirectory(prefix="loanalyze_pdf_") as image_dir:
+        for png, name in zip(chart_pngs, CHART_NAMES):
+            path = os.path.join(image_dir, f"{name}.png")
+            with open(path, "wb") as f:
+                f.write(png)
+            pdf.add_page()
+            pdf.image(path, x=15, y=30, w=180)
+
+        return pdf.output(dest="S").encode("latin1")
@@ -0,0 +1,369 @@
+"""Read access to the Supabase tables used by the dashboards.
+
+Every query names the columns its view needs and pages through the table
+with keyset pagination (``order by key``, ``key > last seen``), so reads are
+neither truncated at the server's max-rows limit nor slowed down by deep
+offsets. Pages are turned into DataFrames as they arrive and concatenated
+once at the end; empty results keep their columns, so views can index them
+without checking first.
+
+Results are shared through ``utils.query_cache`` between sessions reading
+as the same identity; the write functions here invalidate the tables they
+change, so writes made through the app show up on the next read.
+"""
+import datetime
+import logging
+from typing import Iterator, Optional, Sequence, Tuple
+
+import pandas as pd
+from supabase import Client
+
+from utils.config import AUDIT_LOG_PAGE_ROWS, QUERY_PAGE_ROWS
+from utils.metrics import inc
+from utils.query_cache import query_cache
+from utils.supabase_client import auth_scope
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Column projections
+# --------------------------
+SUBMISSION_COLUMNS = [
+    "id", "created_at", "user_id", "income", "age", "experience", "marital_status",
+    "house_ownership", "car_ownership", "profession", "city", "state", "job_years",
+    "house_years", "loan_amount", "loan_duration", "interest_rate", "prediction",
+    "default_probability", "risk_band", "estimated_profit", "prediction_status", "comments",
+]
+# what a bank sees of an applicant, without account or free-text fields
+SUBMISSION_BANK_COLUMNS = [
+    "id", "created_at", "income", "age", "experience", "marital_status",
+    "house_ownership", "car_ownership", "profession", "city", "state", "job_years",
+    "house_years", "loan_amount", "loan_duration", "interest_rate", "prediction",
+    "default_probability", "risk_band", "estimated_profit",
+]
+SUBMISSION_HISTORY_COLUMNS = [
+    "id", "created_at", "income", "age", "experience", "marital_status",
+    "house_ownership", "car_ownership", "profession", "city", "state", "job_years",
+    "house_years", "loan_amount", "loan_duration", "interest_rate",
+    "default_probability", "risk_band", "estimated_profit", "comments",
+]
+SUBMISSION_NUMERIC_COLUMNS = [
+    "id", "created_at", "income", "age", "experience", "job_years", "house_years",
+    "loan_amount", "loan_duration", "interest_rate", "prediction",
+    "default_probability", "estimated_profit",
+]
+SUBMISSION_PUBLIC_COLUMNS = ["id", "created_at", "risk_band", "loan_amount"]
+
+PROFILE_COLUMNS = ["user_id", "full_name", "email", "phone_number", "role"]
+USER_ROLES = ["applicant", "bank", "admin"]
+
+UPLOAD_COLUMNS = [
+    "id", "created_at", "user_id", "original_filename", "notes", "total_clients",
+    "low_risk_count", "medium_risk_count", "high_risk_count",
+]
+UPLOAD_PUBLIC_COLUMNS = ["id", "created_at"]
+
+CLIENT_PUBLIC_COLUMNS = ["id", "risk_band"]
+
+# the audit log schema is owned by database triggers; read it as-is
+AUDIT_LOG_COLUMNS = "*"
+AUDIT_LOG_COUNT_COLUMNS = ["day", "action", "status", "count"]
+
+
+def _cache_key(supabase: Client, *query) -> tuple:
+    # row-level security makes results depend on who reads them
+    return (auth_scope(supabase), *query)
+
+
+def _check(response):
+    if hasattr(response, "error") and response.error:
+        raise RuntimeError(response.error.message)
+    return response
+
+
+def iter_pages(
+    supabase: Client,
+    table: str,
+    columns,
+    key: str = "id",
+    filters: Optional[dict] = None,
+    page_rows: int = QUERY_PAGE_ROWS,
+    gte: Optional[dict] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield ``table`` one keyset page at a time, each as a DataFrame.
+
+    ``columns`` is a list of column names or ``"*"``; the key column is always
+    fetched since the next page starts after it. ``filters`` are equality
+    filters and ``gte`` lower bounds, applied to every page.
+    """
+    if columns == "*":
+        select, frame_columns = "*", None
+    else:
+        frame_columns = list(columns) if key in columns else [key, *columns]
+        select = ",".join(frame_columns)
+
+    last_key = None
+    while True:
+        query = supabase.table(table).select(select)
+        for name, value in (filters or {}).items():
+            query = query.eq(name, value)
+        for name, value in (gte or {}).items():
+            query = query.gte(name, value)
+        if last_key is not None:
+            query = query.gt(key, last_key)
+        rows = _check(query.order(key).limit(page_rows).execute()).data or []
+        if rows:
+            yield pd.DataFrame.from_records(rows, columns=frame_columns)
+        if len(rows) < page_rows:
+            return
+        last_key = rows[-1][key]
+
+
+def fetch_frame(
+    supabase: Client,
+    table: str,
+    columns,
+    key: str = "id",
+    filters: Optional[dict] = None,
+    page_rows: int = QUERY_PAGE_ROWS,
+) -> pd.DataFrame:
+    """All matching rows of ``table`` as one DataFrame, read page by page and cached."""
+    def fetch():
+        pages = list(iter_pages(supabase, table, columns, key, filters, page_rows))
+        if pages:
+            return pd.concat(pages, ignore_index=True)
+        if columns == "*":
+            return pd.DataFrame()
+        return pd.DataFrame(columns=list(columns) if key in columns else [key, *columns])
+
+    cache_key = _cache_key(
+        supabase, table, columns if columns == "*" else tuple(columns), key, tuple(sorted((filters or {}).items()))
+    )
+    return query_cache.get_or_fetch(table, cache_key, fetch)
+
+
+def _write(table: str, query):
+    try:
+        response = _check(query.execute())
+        if isinstance(response.data, list):
+            inc("loanalyze_supabase_rows_written_total", len(response.data), resource=table)
+        return response
+    finally:
+        # also after a failure: the write may have reached the database
+        query_cache.invalidate(table)
+
+
+# --------------------------
+# Applicant submissions
+# --------------------------
+def fetch_submissions(supabase: Client, columns: Sequence[str] = SUBMISSION_COLUMNS) -> pd.DataFrame:
+    return fetch_frame(supabase, "applicant_submissions", columns)
+
+
+def fetch_user_submissions(
+    supabase: Client, user_id: str, columns: Sequence[str] = SUBMISSION_HISTORY_COLUMNS
+) -> pd.DataFrame:
+    return fetch_frame(supabase, "applicant_submissions", columns, filters={"user_id": user_id})
+
+
+def insert_submission(supabase: Client, row: dict):
+    return _write("applicant_submissions", supabase.table("applicant_submissions").insert(row))
+
+
+# --------------------------
+# User profiles
+# --------------------------
+def fetch_user_profiles(supabase: Client, columns: Sequence[str] = PROFILE_COLUMNS) -> pd.DataFrame:
+    return fetch_frame(supabase, "user_profile", columns, key="user_id")
+
+
+def _count_rows(query) -> int:
+    # head request: PostgREST sends only the count, no rows
+    return _check(query.execute()).count or 0
+
+
+def count_user_roles(supabase: Client) -> pd.DataFrame:
+    """``role``/``count`` rows for ``USER_ROLES``, plus ``other`` for any remaining profiles."""
+    def fetch():
+        def profiles():
+            return supabase.table("user_profile").select("user_id", count="exact", head=True)
+
+        counts = {role: _count_rows(profiles().eq("role", role)) for role in USER_ROLES}
+        other = _count_rows(profiles()) - sum(counts.values())
+        if other > 0:
+            counts["other"] = other
+        return pd.DataFrame({"role": list(counts), "count": list(counts.values())})
+
+    return query_cache.get_or_fetch("user_profile", _cache_key(supabase, "user_profile", "role_counts"), fetch)
+
+
+def get_user_profile(supabase: Client, user_id: str) -> Optional[dict]:
+    """The profile row for ``user_id``, or None if the user has not picked a role yet."""
+    response = _check(
+        supabase.table("user_profile")
+        .select(",".join(PROFILE_COLUMNS))
+        .eq("user_id", user_id)
+        .limit(1)
+        .execute()
+    )
+    return response.data[0] if response.data else None
+
+
+def insert_user_profile(supabase: Client, profile: dict):
+    return _write("user_profile", supabase.table("user_profile").insert(profile))
+
+
+def update_user_role(supabase: Client, user_id: str, role: str):
+    return _write("user_profile", supabase.table("user_profile").update({"role": role}).eq("user_id", user_id))
+
+
+def delete_user_profile(supabase: Client, user_id: str):
+    return _write("user_profile", supabase.table("user_profile").delete().eq("user_id", user_id))
+
+
+# --------------------------
+# Bank uploads and clients
+# --------------------------
+def fetch_bank_uploads(supabase: Client, columns: Sequence[str] = UPLOAD_COLUMNS) -> pd.DataFrame:
+    return fetch_frame(supabase, "bank_uploads", columns)
+
+
+def insert_bank_upload(supabase: Client, upload: dict):
+    return _write("bank_uploads", supabase.table("bank_uploads").insert(upload))
+
+
+def fetch_bank_clients(supabase: Client, columns: Sequence[str] = CLIENT_PUBLIC_COLUMNS) -> pd.DataFrame:
+    return fetch_frame(supabase, "bank_clients", columns)
+
+
+# --------------------------
+# Audit logs
+# --------------------------
+_audit_rpc_available = True
+
+
+def _count_audit_logs_locally(supabase: Client) -> pd.DataFrame:
+    counts = pd.DataFrame(columns=AUDIT_LOG_COUNT_COLUMNS)
+    for page in iter_pages(supabase, "audit_logs", ["created_at", "action", "status"]):
+        page_counts = pd.DataFrame({
+            "day": pd.to_datetime(page["created_at"], utc=True, format="ISO8601").dt.strftime("%Y-%m-%d"),
+            "action": page["action"],
+            "status": page["status"],
+        }).groupby(["day", "action", "status"], dropna=False).size().reset_index(name="count")
+        counts = pd.concat([counts, page_counts], ignore_index=True)
+        counts = counts.groupby(["day", "action", "status"], dropna=False, as_index=False)["count"].sum()
+    return counts
+
+
+def fetch_audit_log_daily_counts(supabase: Client) -> pd.DataFrame:
+    """Audit log counts per UTC day, action and status.
+
+    Grouped by the ``audit_log_daily_counts`` function from
+    ``sql/audit_log_daily_counts.sql``. Databases without it fall back to
+    paging through the three columns involved and grouping here.
+    """
+    def fetch():
+        global _audit_rpc_available
+        frame = None
+        if _audit_rpc_available:
+            try:
+                rows = _check(supabase.rpc("audit_log_daily_counts", {}).execute()).data or []
+                frame = pd.DataFrame.from_records(rows, columns=AUDIT_LOG_COUNT_COLUMNS)
+            except Exception as e:
+                # PGRST202: no such function in the schema cache
+                if getattr(e, "code", None) != "PGRST202":
+                    raise
+                logger.warning("audit_log_daily_counts is not installed, grouping audit logs locally")
+                _audit_rpc_available = False
+        if frame is None:
+            frame = _count_audit_logs_locally(supabase)
+        frame["day"] = pd.to_datetime(frame["day"]).dt.date
+        frame["count"] = frame["count"].astype("int64")
+        return frame
+
+    return query_cache.get_or_fetch("audit_logs", _cache_key(supabase, "audit_logs", "daily_counts"), fetch)
+
+
+def _audit_log_query(supabase: Client, actions, statuses, start_day: datetime.date, end_day: datetime.date,
+                     cursor, page_rows: int):
+    """Newest-first audit logs matching the filters, after ``cursor``; up to ``page_rows`` rows."""
+    query = (
+        supabase.table("audit_logs")
+        .select(AUDIT_LOG_COLUMNS)
+        .in_("action", list(actions))
+        .in_("status", list(statuses))
+        .gte("created_at", f"{start_day.isoformat()}T00:00:00+00:00")
+        .lt("created_at", f"{(end_day + datetime.timedelta(days=1)).isoformat()}T00:00:00+00:00")
+    )
+    if cursor is not None:
+        created_at, row_id = cursor
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")'
+        )
+    query = query.order("created_at", desc=True).order("id", desc=True).limit(page_rows)
+    return _check(query.execute()).data or []
+
+
+def fetch_audit_log_page(
+    supabase: Client,
+    actions: Sequence[str],
+    statuses: Sequence[str],
+    start_day: datetime.date,
+    end_day: datetime.date,
+    cursor: Optional[tuple] = None,
+    page_rows: int = AUDIT_LOG_PAGE_ROWS,
+) -> Tuple[pd.DataFrame, Optional[tuple]]:
+    """One newest-first page of audit logs within ``start_day``..``end_day`` (UTC, inclusive).
+
+    ``cursor`` is the ``(created_at, id)`` of the last row already shown.
+    Returns the page and the cursor for the next one, which is None on the
+    last page.
+    """
+    def fetch():
+        # one extra row tells whether another page follows
+        rows = _audit_log_query(supabase, actions, statuses, start_day, end_day, cursor, page_rows + 1)
+        return pd.DataFrame.from_records(rows)
+
+    key = _cache_key(
+        supabase, "audit_logs", "page", tuple(actions), tuple(statuses), start_day, end_day, cursor, page_rows
+    )
+    frame = query_cache.get_or_fetch("audit_logs", key, fetch)
+    if len(frame) <= page_rows:
+        return frame, None
+    frame = frame.iloc[:page_rows]
+    last = frame.iloc[-1]
+    return frame, (last["created_at"], last["id"])
+
+
+def iter_audit_logs(
+    supabase: Client,
+    actions: Sequence[str],
+    statuses: Sequence[str],
+    start_day: datetime.date,
+    end_day: datetime.date,
+    page_rows: int = QUERY_PAGE_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """Every audit log matching the filters, newest first, one page at a time (uncached)."""
+    cursor = None
+    while True:
+        rows = _audit_log_query(supabase, actions, statuses, start_day, end_day, cursor, page_rows)
+        if rows:
+            yield pd.DataFrame.from_records(rows)
+        if len(rows) < page_rows:
+            return
+        cursor = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def fetch_profile_names(supabase: Client, user_ids) -> pd.DataFrame:
+    """``user_id``/``full_name`` for just the given users."""
+    ids = tuple(sorted({str(user_id) for user_id in user_ids if pd.notna(user_id)}))
+    if not ids:
+        return pd.DataFrame(columns=["user_id", "full_name"])
+
+    def fetch():
+        rows = _check(
+            supabase.table("user_profile").select("user_id,full_name").in_("user_id", list(ids)).execute()
+        ).data or []
+        return pd.DataFrame.from_records(rows, columns=["user_id", "full_name"])
+
+    return query_cache.get_or_fetch("user_profile", _cache_key(supabase, "user_profile", "names", ids), fetch)
@@ -0,0 +1,305 @@
+"""Daily rollups behind the public dashboard.
+
+The public page only shows counts, risk-band breakdowns, mean loan amounts
+and daily trends, so instead of downloading whole tables it reads a small
+long-format store in ``data/rollups/``:
+
+    source, day, risk_band, count, loan_count, loan_sum
+
+with one row per source table, UTC day and risk band ("" where a row has no
+band). Each refresh re-aggregates only the days from the newest stored day
+(minus ``ROLLUP_LOOKBACK_DAYS``) onwards and replaces those rows, so it is
+idempotent and its cost does not grow with the table.
+
+Bank clients are counted in the database by the ``bank_client_daily_counts``
+function from ``sql/bank_client_daily_counts.sql``, by the day of their
+upload. Databases without it fall back to the per-upload risk counts in
+``bank_uploads``, which overcount uploads whose client inserts partly failed;
+``client_counts_exact()`` tells the page which one it got.
+
+Row-level security decides which rows the refreshing client sees, so each
+``auth_scope()`` has its own store, ``data/rollups/<identity>.csv``.
+
+    python -m utils.rollups            # incremental refresh of the anonymous visitors' store
+    python -m utils.rollups --rebuild  # re-aggregate everything
+"""
+import argparse
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from utils.config import ROLLUP_LOOKBACK_DAYS, ROLLUP_REFRESH_SECONDS
+from utils.repository import iter_pages
+from utils.supabase_client import auth_scope, new_client
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROLLUP_DIR = os.path.join(BASE_DIR, "data", "rollups")
+ROLLUP_COLUMNS = ["source", "day", "risk_band", "count", "loan_count", "loan_sum"]
+KEY_COLUMNS = ["source", "day", "risk_band"]
+RISK_BAND_COUNT_COLUMNS = {"Low": "low_risk_count", "Medium": "medium_risk_count", "High": "high_risk_count"}
+
+
+def _days(created_at: pd.Series) -> pd.Series:
+    return pd.to_datetime(created_at, utc=True, format="ISO8601").dt.strftime("%Y-%m-%d")
+
+
+def _aggregate_submissions(page: pd.DataFrame) -> pd.DataFrame:
+    loans = pd.to_numeric(page["loan_amount"], errors="coerce")
+    frame = pd.DataFrame({
+        "source": "applicant_submissions",
+        "day": _days(page["created_at"]),
+        "risk_band": page["risk_band"].fillna("").astype(str),
+        "count": 1,
+        "loan_count": loans.notna().astype(int),
+        "loan_sum": loans.fillna(0.0),
+    })
+    return frame.groupby(KEY_COLUMNS, as_index=False).sum()
+
+
+def _aggregate_uploads(page: pd.DataFrame) -> pd.DataFrame:
+    frame = pd.DataFrame({
+        "source": "bank_uploads",
+        "day": _days(page["created_at"]),
+        "risk_band": "",
+        "count": 1,
+        "loan_count": 0,
+        "loan_sum": 0.0,
+    })
+    return frame.groupby(KEY_COLUMNS, as_index=False).sum()
+
+
+def _aggregate_upload_risk_counts(page: pd.DataFrame) -> pd.DataFrame:
+    days = _days(page["created_at"])
+    frames = []
+    for band, column in RISK_BAND_COUNT_COLUMNS.items():
+        frames.append(pd.DataFrame({
+            "source": "bank_clients",
+            "day": days,
+            "risk_band": band,
+            "count": pd.to_numeric(page[column], errors="coerce").fillna(0).astype(int),
+            "loan_count": 0,
+            "loan_sum": 0.0,
+        }))
+    return pd.concat(frames, ignore_index=True).groupby(KEY_COLUMNS, as_index=False).sum()
+
+
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame({
+        "source": pd.Series(dtype=object),
+        "day": pd.Series(dtype=object),
+        "risk_band": pd.Series(dtype=object),
+        "count": pd.Series(dtype="int64"),
+        "loan_count": pd.Series(dtype="int64"),
+        "loan_sum": pd.Series(dtype="float64"),
+    })
+
+
+def _aggregate_pages(supabase, table: str, columns, aggregate, gte) -> pd.DataFrame:
+    # aggregate page by page so a full rebuild never holds the raw table
+    fresh = _empty()
+    for page in iter_pages(supabase, table, columns, gte=gte):
+        fresh = pd.concat([fresh, aggregate(page)], ignore_index=True).groupby(KEY_COLUMNS, as_index=False).sum()
+    return fresh
+
+
+def _fetch_submissions(supabase, gte) -> pd.DataFrame:
+    return _aggregate_pages(
+        supabase, "applicant_submissions", ["id", "created_at", "risk_band", "loan_amount"], _aggregate_submissions, gte
+    )
+
+
+def _fetch_uploads(supabase, gte) -> pd.DataFrame:
+    return _aggregate_pages(supabase, "bank_uploads", ["id", "created_at"], _aggregate_uploads, gte)
+
+
+_client_rpc_available = True
+
+
+def _fetch_clients(supabase, gte) -> pd.DataFrame:
+    global _client_rpc_available
+    if _client_rpc_available:
+        try:
+            params = {"start_at": gte["created_at"]} if gte else {}
+            rows = supabase.rpc("bank_client_daily_counts", params).execute().data or []
+            counts = pd.DataFrame.from_records(rows, columns=["day", "risk_band", "count"])
+            return pd.DataFrame({
+                "source": "bank_clients",
+                "day": counts["day"].astype(str),
+                "risk_band": counts["risk_band"].fillna("").astype(str),
+                "count": counts["count"].astype("int64"),
+                "loan_count": 0,
+                "loan_sum": 0.0,
+            })
+        except Exception as e:
+            # PGRST202: no such function in the schema cache
+            if getattr(e, "code", None) != "PGRST202":
+                raise
+            logger.warning("bank_client_daily_counts is not installed, using the uploads' risk counts")
+            _client_rpc_available = False
+    return _aggregate_pages(
+        supabase, "bank_uploads", ["id", "created_at", *RISK_BAND_COUNT_COLUMNS.values()],
+        _aggregate_upload_risk_counts, gte,
+    )
+
+
+# rollup source -> fetch(supabase, gte) of its aggregated rows
+SOURCES = {
+    "applicant_submissions": _fetch_submissions,
+    "bank_uploads": _fetch_uploads,
+    "bank_clients": _fetch_clients,
+}
+
+
+def client_counts_exact() -> bool:
+    """Whether bank clients are counted from ``bank_clients`` rather than from the uploads' risk counts."""
+    return _client_rpc_available
+
+
+def _scope_file(scope: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", scope) + ".csv"
+
+
+def read_store(path: str) -> pd.DataFrame:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return _empty()
+    # keep "" bands as empty strings rather than NaN
+    return pd.read_csv(
+        path, dtype={"source": str, "day": str, "risk_band": str}, keep_default_na=False
+    )[ROLLUP_COLUMNS]
+
+
+def _write_store(rollups: pd.DataFrame, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            rollups.to_csv(f, index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _refresh_source(supabase, rollups: pd.DataFrame, source: str, full: bool) -> pd.DataFrame:
+    stored_days = rollups.loc[rollups["source"] == source, "day"]
+
+    start = None
+    if not full and not stored_days.empty:
+        start = (pd.Timestamp(stored_days.max()) - pd.Timedelta(days=ROLLUP_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    gte = {"created_at": f"{start}T00:00:00+00:00"} if start else None
+
+    fresh = SOURCES[source](supabase, gte)
+
+    replaced = rollups["source"] == source
+    if start is not None:
+        replaced &= rollups["day"] >= start
+    return pd.concat([rollups[~replaced], fresh], ignore_index=True)
+
+
+class _Store:
+    """One identity's rollups in memory, and when they were last refreshed."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rollups = None
+        self.last_refresh = 0.0
+
+
+_stores_lock = threading.Lock()
+_stores = {}  # store path -> _Store
+
+
+def store_path(supabase) -> str:
+    return os.path.join(ROLLUP_DIR, _scope_file(auth_scope(supabase)))
+
+
+def refresh_rollups(supabase, force: bool = False, full: bool = False, path: str = None) -> pd.DataFrame:
+    """Bring the rollup store of ``supabase``'s identity up to date and return it.
+
+    Refreshes at most once every ``ROLLUP_REFRESH_SECONDS`` per process and
+    identity unless ``force``; sessions arriving while another one refreshes
+    get the current rollups instead of waiting. If the database cannot be
+    reached, the stored rollups keep being served.
+    """
+    path = path or store_path(supabase)
+    with _stores_lock:
+        store = _stores.setdefault(path, _Store())
+
+    current = store.rollups
+    if not force and current is not None and time.monotonic() - store.last_refresh < ROLLUP_REFRESH_SECONDS:
+        return current
+    if not store.lock.acquire(blocking=current is None or force):
+        return current
+
+    try:
+        rollups = _empty() if full else (store.rollups if store.rollups is not None else read_store(path))
+        try:
+            for source in SOURCES:
+                rollups = _refresh_source(supabase, rollups, source, full)
+        except Exception as e:
+            if store.rollups is None and rollups.empty:
+                raise
+            logger.warning("Rollup refresh failed, serving stored rollups: %s", e)
+        else:
+            rollups = rollups.sort_values(KEY_COLUMNS, ignore_index=True)
+            _write_store(rollups, path)
+        store.rollups = rollups
+        store.last_refresh = time.monotonic()
+        return rollups
+    finally:
+        store.lock.release()
+
+
+# --------------------------
+# Views over the rollups
+# --------------------------
+def total(rollups: pd.DataFrame, source: str) -> int:
+    return int(rollups.loc[rollups["source"] == source, "count"].sum())
+
+
+def band_counts(rollups: pd.DataFrame, source: str) -> pd.DataFrame:
+    """``Risk Band``/``Count`` rows, largest first, excluding rows without a band."""
+    rows = rollups[(rollups["source"] == source) & (rollups["risk_band"] != "")]
+    counts = rows.groupby("risk_band")["count"].sum().sort_values(ascending=False)
+    counts = counts[counts > 0].reset_index()
+    counts.columns = ["Risk Band", "Count"]
+    return counts
+
+
+def daily_counts(rollups: pd.DataFrame, source: str, label: str) -> pd.DataFrame:
+    rows = rollups[rollups["source"] == source]
+    trend = rows.groupby("day")["count"].sum().reset_index()
+    trend.columns = ["Date", label]
+    trend["Date"] = pd.to_datetime(trend["Date"]).dt.date
+    return trend
+
+
+def mean_loan_amount(rollups: pd.DataFrame, source: str = "applicant_submissions") -> float:
+    rows = rollups[rollups["source"] == source]
+    loan_count = rows["loan_count"].sum()
+    return float(rows["loan_sum"].sum() / loan_count) if loan_count else float("nan")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the public dashboard rollups.")
+    parser.add_argument("--rebuild", action="store_true", help="Re-aggregate every row instead of only new days")
+    parser.add_argument("--path", help="Store to refresh (default: the anonymous visitors' store in data/rollups/)")
+    args = parser.parse_args(argv)
+
+    # the anon key sees what anonymous visitors of the public page see
+    supabase = new_client()
+    path = args.path or store_path(supabase)
+    start = time.perf_counter()
+    rollups = refresh_rollups(supabase, force=True, full=args.rebuild, path=path)
+    print(f"{len(rollups)} rollup rows written to {path} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
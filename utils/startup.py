@@ -0,0 +1,200 @@
+"""Server warmup and per-page startup timings.
+
+``app.py`` calls ``start_warmup()`` on every rerun; the first call in a
+server process starts one background thread that loads the model bundle and
+imports the libraries pages pull in lazily, so the first visitor to a page
+does not pay for them. Each task's duration is recorded.
+
+``track_render(page)`` wraps one page render. The first render of a page in
+a process includes importing its module, so ``page_timings()`` reports it
+separately from the steady-state renders.
+
+    python -m utils.startup   # cold import time of each page module, one fresh interpreter each
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.config import WARMUP_ENABLED
+from utils.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_MODULES = [
+    "Home",
+    "dashboards.login",
+    "dashboards.register",
+    "dashboards.select_role",
+    "dashboards.applicant",
+    "dashboards.bank",
+    "dashboards.admin",
+    "dashboards.public",
+    "dashboards.analytics",
+]
+
+# imported in this order; plotly and pandas back most pages, the rest only reports
+WARMUP_IMPORTS = ["pandas", "plotly.express", "fpdf", "xlsxwriter"]
+
+PROCESS_STARTED = time.time()
+
+_lock = threading.Lock()
+_warmup_thread = None
+_warmup = {"state": "not started", "tasks": {}, "seconds": 0.0, "errors": {}}
+_pages = {}
+
+
+def _warm_charts():
+    from utils.reports import load_chart_backend
+    load_chart_backend()
+    import pandas.plotting._matplotlib  # noqa: F401
+
+
+def _warm_model():
+    from utils.model_registry import get_model_bundle
+    get_model_bundle()
+
+
+def _warmup_tasks():
+    tasks = [(name, lambda name=name: importlib.import_module(name)) for name in WARMUP_IMPORTS]
+    tasks.append(("matplotlib", _warm_charts))
+    tasks.append(("model", _warm_model))
+    return tasks
+
+
+def _run_warmup():
+    start = time.perf_counter()
+    for name, task in _warmup_tasks():
+        task_start = time.perf_counter()
+        try:
+            task()
+        except Exception as e:
+            # a failed task is only a missed head start; the page that needs it retries
+            logger.warning("Warmup task %s failed: %s", name, e)
+            with _lock:
+                _warmup["errors"][name] = str(e)
+        with _lock:
+            _warmup["tasks"][name] = time.perf_counter() - task_start
+    with _lock:
+        _warmup["seconds"] = time.perf_counter() - start
+        _warmup["state"] = "done"
+    logger.info("Warmup finished in %.2fs", _warmup["seconds"])
+
+
+def start_warmup(enabled: bool = WARMUP_ENABLED):
+    """Start the background warmup once per process; later calls do nothing."""
+    global _warmup_thread
+    if _warmup_thread is not None or not enabled:
+        return
+    with _lock:
+        if _warmup_thread is not None:
+            return
+        _warmup["state"] = "running"
+        _warmup_thread = threading.Thread(target=_run_warmup, name="loanalyze-warmup", daemon=True)
+        _warmup_thread.start()
+
+
+def warmup_report() -> dict:
+    with _lock:
+        return {
+            "state": _warmup["state"],
+            "seconds": _warmup["seconds"],
+            "tasks": dict(_warmup["tasks"]),
+            "errors": dict(_warmup["errors"]),
+        }
+
+
+@contextmanager
+def track_render(page: str):
+    """Time one render of ``page``.
+
+    Streamlit ends a script early by raising (``st.stop()``, ``st.rerun()``),
+    so the time is recorded however the render exits.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        observe("loanalyze_page_render_seconds", seconds, page=page)
+        with _lock:
+            timing = _pages.get(page)
+            if timing is None:
+                _pages[page] = {
+                    "first_render_seconds": seconds,
+                    "first_render_after_start_seconds": time.time() - PROCESS_STARTED,
+                    "renders": 1,
+                    "total_seconds": 0.0,
+                    "last_seconds": seconds,
+                    "max_seconds": 0.0,
+                }
+            else:
+                timing["renders"] += 1
+                timing["total_seconds"] += seconds
+                timing["last_seconds"] = seconds
+                timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+
+def page_timings() -> list:
+    """One row per rendered page; ``mean_seconds`` excludes the first render."""
+    with _lock:
+        rows = []
+        for page, timing in sorted(_pages.items()):
+            later = timing["renders"] - 1
+            rows.append({
+                "page": page,
+                "first_render_seconds": timing["first_render_seconds"],
+                "first_render_after_start_seconds": timing["first_render_after_start_seconds"],
+                "renders": timing["renders"],
+                "mean_seconds": timing["total_seconds"] / later if later else None,
+                "max_seconds": timing["max_seconds"] if later else None,
+                "last_seconds": timing["last_seconds"],
+            })
+        return rows
+
+
+def uptime_seconds() -> float:
+    return time.time() - PROCESS_STARTED
+
+
+def measure_cold_import(module: str) -> float:
+    """Seconds to import ``module`` in a fresh interpreter."""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - start)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold import time of each page module.")
+    parser.add_argument("modules", nargs="*", default=PAGE_MODULES)
+    parser.add_argument("--out", help="Also write the timings to this JSON file")
+    args = parser.parse_args(argv)
+
+    timings = {}
+    for module in args.modules:
+        try:
+            timings[module] = measure_cold_import(module)
+            print(f"{module:<26} {timings[module]:8.3f}s")
+        except subprocess.CalledProcessError as e:
+            error = e.stderr.strip().splitlines()[-1] if e.stderr.strip() else f"exit {e.returncode}"
+            timings[module] = None
+            print(f"{module:<26} failed: {error}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(timings, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
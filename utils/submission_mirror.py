@@ -0,0 +1,313 @@
+"""Local Parquet mirrors of ``applicant_submissions`` for dashboard analytics.
+
+Analytics, bank and admin pages aggregate over every submission they may
+see. Instead of downloading the table on each visit they read a mirror,
+which lives in ``data/mirror/<identity>/applicant_submissions`` as Parquet
+part files and is kept in memory once loaded.
+
+Row-level security decides which submissions a client may read, so there is
+one mirror per ``auth_scope()`` and each is synced with the client of the
+session reading it. Only the ``MIRROR_MAX_LOADED`` most recently read mirrors
+keep their rows in memory; the others are read back from disk when needed.
+
+A sync fetches only rows created since the newest mirrored ``created_at``
+(minus ``MIRROR_LOOKBACK_SECONDS``), drops ids already mirrored and appends
+the rest as a new part file. Parts are compacted into one file once there
+are more than ``MIRROR_MAX_PARTS``. Syncs run at most every
+``MIRROR_SYNC_SECONDS``, or right away after the app itself has written a
+submission. Parts written by other server processes are picked up on the
+next sync.
+
+    python -m utils.submission_mirror          # list the mirrors on disk
+    python -m utils.submission_mirror --clear  # delete them; each is re-downloaded when next read
+"""
+import argparse
+import collections
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from utils.config import MIRROR_LOOKBACK_SECONDS, MIRROR_MAX_LOADED, MIRROR_MAX_PARTS, MIRROR_SYNC_SECONDS
+from utils.query_cache import query_cache
+from utils.repository import SUBMISSION_COLUMNS, iter_pages
+from utils.supabase_client import auth_scope
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIRROR_ROOT = os.path.join(BASE_DIR, "data", "mirror")
+TABLE = "applicant_submissions"
+
+# fixed dtypes so every part file has the same schema, whatever a page held
+MIRROR_DTYPES = {
+    "id": "string",
+    "user_id": "string",
+    "income": "float64",
+    "age": "Int64",
+    "experience": "Int64",
+    "marital_status": "string",
+    "house_ownership": "string",
+    "car_ownership": "string",
+    "profession": "string",
+    "city": "string",
+    "state": "string",
+    "job_years": "Int64",
+    "house_years": "Int64",
+    "loan_amount": "float64",
+    "loan_duration": "Int64",
+    "interest_rate": "float64",
+    "prediction": "Int64",
+    "default_probability": "float64",
+    "risk_band": "string",
+    "estimated_profit": "float64",
+    "prediction_status": "string",
+    "comments": "string",
+}
+
+
+def _normalize(page: pd.DataFrame) -> pd.DataFrame:
+    frame = pd.DataFrame(index=page.index)
+    for col in SUBMISSION_COLUMNS:
+        if col == "created_at":
+            frame[col] = pd.to_datetime(page[col], utc=True, format="ISO8601")
+        elif MIRROR_DTYPES[col] in ("Int64", "float64"):
+            frame[col] = pd.to_numeric(page[col], errors="coerce").astype(MIRROR_DTYPES[col])
+        else:
+            frame[col] = page[col].astype(MIRROR_DTYPES[col])
+    return frame
+
+
+def _empty() -> pd.DataFrame:
+    return _normalize(pd.DataFrame({col: pd.Series(dtype=object) for col in SUBMISSION_COLUMNS}))
+
+
+class SubmissionMirror:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._frame = None
+        self._parts = set()
+        self._last_sync = 0.0
+        self._synced_generation = None
+        self.last_sync_rows = 0
+        self.last_sync_seconds = 0.0
+        self.last_error = None
+
+    def _list_parts(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(".parquet"))
+
+    def _read_parts(self, names) -> pd.DataFrame:
+        frames = [pd.read_parquet(os.path.join(self.directory, name)) for name in names]
+        return pd.concat(frames, ignore_index=True) if frames else _empty()
+
+    def _load_new_parts(self):
+        """Merge part files written by other processes (or compactions) since the last look."""
+        names = self._list_parts()
+        if self._frame is not None and set(names) == self._parts:
+            return
+        try:
+            if self._frame is None or not self._parts <= set(names):
+                # first load, or parts were compacted away under us
+                frame = self._read_parts(names)
+            else:
+                frame = pd.concat([self._frame, self._read_parts(sorted(set(names) - self._parts))],
+                                  ignore_index=True)
+        except FileNotFoundError:
+            # a compaction removed a part between listing and reading
+            names = self._list_parts()
+            frame = self._read_parts(names)
+        self._frame = frame.drop_duplicates("id", keep="first", ignore_index=True)
+        self._parts = set(names)
+
+    def _write_part(self, frame: pd.DataFrame) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+        return name
+
+    def _compact(self):
+        old_parts = sorted(self._parts)
+        name = self._write_part(self._frame)
+        for old in old_parts:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except FileNotFoundError:
+                pass
+        self._parts = {name}
+
+    def _sync(self, supabase):
+        start = time.perf_counter()
+        self._load_new_parts()
+        frame = self._frame
+
+        gte = None
+        if not frame.empty:
+            since = frame["created_at"].max() - pd.Timedelta(seconds=MIRROR_LOOKBACK_SECONDS)
+            gte = {"created_at": since.isoformat()}
+            known = set(frame.loc[frame["created_at"] >= since, "id"])
+        else:
+            known = set()
+
+        pages = []
+        for page in iter_pages(supabase, TABLE, SUBMISSION_COLUMNS, gte=gte):
+            page = _normalize(page)
+            pages.append(page[~page["id"].isin(known)])
+        new_rows = pd.concat(pages, ignore_index=True) if pages else _empty()
+
+        if not new_rows.empty:
+            self._parts.add(self._write_part(new_rows))
+            self._frame = pd.concat([frame, new_rows], ignore_index=True)
+        if len(self._parts) > MIRROR_MAX_PARTS:
+            self._compact()
+
+        self.last_sync_rows = len(new_rows)
+        self.last_sync_seconds = time.perf_counter() - start
+
+    def _due(self, generation, force: bool) -> bool:
+        return (
+            force
+            or self._frame is None
+            or generation != self._synced_generation
+            or time.monotonic() - self._last_sync >= MIRROR_SYNC_SECONDS
+        )
+
+    def refresh(self, supabase, force: bool = False) -> pd.DataFrame:
+        """Sync the mirror if it is due and return the mirrored rows.
+
+        Sessions arriving while another one syncs get the current rows rather
+        than waiting. If the sync fails the rows mirrored so far keep being
+        served.
+        """
+        generation = query_cache.generation(TABLE)
+        # read once: unload() may drop the rows in the meantime
+        frame = self._frame
+        if frame is not None and not self._due(generation, force):
+            return frame
+        if not self._lock.acquire(blocking=frame is None or force):
+            return frame
+        try:
+            if self._due(generation, force):
+                try:
+                    self._sync(supabase)
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = str(e)
+                    if self._frame is None:
+                        raise
+                    logger.warning("Submission mirror sync failed, serving mirrored rows: %s", e)
+                self._last_sync = time.monotonic()
+                self._synced_generation = generation
+            return self._frame
+        finally:
+            self._lock.release()
+
+    def unload(self):
+        """Free the rows held in memory; the next refresh reads them back from disk."""
+        if self._lock.acquire(blocking=False):
+            try:
+                self._frame = None
+                self._parts = set()
+            finally:
+                self._lock.release()
+
+    def stats(self) -> dict:
+        frame = self._frame
+        return {
+            "rows": 0 if frame is None else len(frame),
+            "parts": len(self._parts),
+            "memory_bytes": 0 if frame is None else int(frame.memory_usage(deep=True).sum()),
+            "last_sync_rows": self.last_sync_rows,
+            "last_sync_seconds": self.last_sync_seconds,
+            "last_error": self.last_error,
+        }
+
+
+def _scope_dir(scope: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", scope)
+
+
+class SubmissionMirrors:
+    """One ``SubmissionMirror`` per identity, keyed by ``auth_scope()``."""
+
+    def __init__(self, root: str, max_loaded: int):
+        self.root = root
+        self.max_loaded = max(max_loaded, 1)
+        self._lock = threading.Lock()
+        self._mirrors = collections.OrderedDict()  # scope -> mirror, least recently read first
+
+    def for_client(self, supabase) -> SubmissionMirror:
+        scope = auth_scope(supabase)
+        with self._lock:
+            mirror = self._mirrors.get(scope)
+            if mirror is None:
+                mirror = SubmissionMirror(os.path.join(self.root, _scope_dir(scope), TABLE))
+                self._mirrors[scope] = mirror
+            self._mirrors.move_to_end(scope)
+            idle = list(self._mirrors.values())[:-self.max_loaded]
+        for other in idle:
+            other.unload()
+        return mirror
+
+    def clear(self):
+        with self._lock:
+            self._mirrors.clear()
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            mirrors = list(self._mirrors.values())
+        loaded = [mirror.stats() for mirror in mirrors if mirror._frame is not None]
+        return {
+            "identities": len(mirrors),
+            "loaded": len(loaded),
+            "max_loaded": self.max_loaded,
+            "memory_bytes": sum(stats["memory_bytes"] for stats in loaded),
+        }
+
+
+submission_mirrors = SubmissionMirrors(MIRROR_ROOT, MIRROR_MAX_LOADED)
+
+
+def load_submissions(supabase, columns=None) -> pd.DataFrame:
+    """Submissions ``supabase`` may read, from its identity's mirror, limited to ``columns`` if given.
+
+    Callers get their own frame and may add or replace columns on it.
+    """
+    frame = submission_mirrors.for_client(supabase).refresh(supabase)
+    if columns is not None:
+        return frame[list(columns)]
+    return frame.copy(deep=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List or clear the local applicant_submissions mirrors.")
+    parser.add_argument("--clear", action="store_true",
+                        help="Delete every mirror; each is downloaded again when its identity next reads it")
+    args = parser.parse_args(argv)
+
+    if args.clear:
+        submission_mirrors.clear()
+        print(f"Deleted the mirrors in {MIRROR_ROOT}")
+        return
+    scopes = sorted(os.listdir(MIRROR_ROOT)) if os.path.isdir(MIRROR_ROOT) else []
+    for scope in scopes:
+        mirror = SubmissionMirror(os.path.join(MIRROR_ROOT, scope, TABLE))
+        mirror._load_new_parts()
+        stats = mirror.stats()
+        print(f"{scope}: {stats['rows']:,} rows in {stats['parts']} part(s)")
+    if not scopes:
+        print(f"No mirrors in {MIRROR_ROOT}")
+
+
+if __name__ == "__main__":
+    main()
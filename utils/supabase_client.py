@@ -0,0 +1,186 @@
+"""Supabase clients sharing one keep-alive HTTP connection pool.
+
+``app.py`` used to build a new client on every rerun, so every interaction
+paid for client construction and often a fresh TLS handshake. Now one
+``httpx.Client`` per server process holds the pool. Clients are cheap
+wrappers around it:
+
+- ``session_client(st.session_state)``: one per browser session. Sign-in
+  state lives on the client, so sessions never share it.
+- ``service_client()``: one per process for background jobs and CLIs that
+  act without a signed-in user. It needs ``SUPABASE_SERVICE_KEY``.
+
+Row-level security decides what a client may read, so results shared
+between sessions are keyed by ``auth_scope(client)``.
+
+Every request through the pool is traced, so ``pool_stats()`` can report
+how many requests reused an open connection. Each request's latency and the
+rows it read are also recorded in ``utils.metrics``.
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+
+import httpx
+from supabase import Client, ClientOptions, create_client
+
+from utils.config import (
+    SUPABASE_KEEPALIVE_SECONDS,
+    SUPABASE_KEY,
+    SUPABASE_POOL_MAX_CONNECTIONS,
+    SUPABASE_POOL_MAX_KEEPALIVE,
+    SUPABASE_SERVICE_KEY,
+    SUPABASE_TIMEOUT_SECONDS,
+    SUPABASE_URL,
+)
+from utils.metrics import inc, observe
+
+SESSION_KEY = "_supabase_client"
+
+_lock = threading.Lock()
+_http_client = None
+_service_client = None
+_stats = {"requests": 0, "connections_opened": 0, "tls_handshakes": 0, "clients_created": 0}
+
+
+def _trace(event_name, info):
+    if event_name == "connection.connect_tcp.complete":
+        with _lock:
+            _stats["connections_opened"] += 1
+    elif event_name == "connection.start_tls.complete":
+        with _lock:
+            _stats["tls_handshakes"] += 1
+
+
+def _resource(path: str) -> str:
+    # /rest/v1/<table>, /rest/v1/rpc/<function>, /auth/v1/<endpoint>
+    parts = [part for part in path.split("/") if part]
+    if len(parts) >= 3 and parts[0] == "rest":
+        return "/".join(parts[2:4]) if parts[2] == "rpc" else parts[2]
+    return "/".join(parts[:3])
+
+
+def _rows_read(response) -> int:
+    # PostgREST reports the returned range as "0-999/*" (or "*/*" when empty)
+    content_range = response.headers.get("content-range", "")
+    returned = content_range.split("/")[0]
+    if "-" not in returned:
+        return 0
+    first, last = returned.split("-", 1)
+    return int(last) - int(first) + 1
+
+
+class _TracingTransport(httpx.HTTPTransport):
+    def handle_request(self, request):
+        with _lock:
+            _stats["requests"] += 1
+        request.extensions["trace"] = _trace
+        resource = _resource(request.url.path)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = super().handle_request(request)
+            status = str(response.status_code)
+        finally:
+            observe("loanalyze_supabase_request_seconds", time.perf_counter() - start,
+                    method=request.method, resource=resource, status=status)
+        if request.method == "GET" and response.status_code < 300:
+            rows = _rows_read(response)
+            if rows:
+                inc("loanalyze_supabase_rows_read_total", rows, resource=resource)
+        return response
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def http_client() -> httpx.Client:
+    """The process-wide pooled HTTP client all Supabase clients share."""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                limits = httpx.Limits(
+                    max_connections=SUPABASE_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=SUPABASE_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=SUPABASE_KEEPALIVE_SECONDS,
+                )
+                _http_client = httpx.Client(
+                    transport=_TracingTransport(limits=limits, http2=_http2_available()),
+                    timeout=SUPABASE_TIMEOUT_SECONDS,
+                    follow_redirects=True,
+                )
+    return _http_client
+
+
+def new_client(key: str = SUPABASE_KEY) -> Client:
+    """A Supabase client with its own auth state on the shared pool."""
+    client = create_client(SUPABASE_URL, key, options=ClientOptions(httpx_client=http_client()))
+    with _lock:
+        _stats["clients_created"] += 1
+    return client
+
+
+def session_client(session_state) -> Client:
+    """The client for one Streamlit session, created on first use.
+
+    Clearing the session state (logging out) drops the client and with it
+    the signed-in user.
+    """
+    client = session_state.get(SESSION_KEY)
+    if client is None:
+        client = new_client()
+        session_state[SESSION_KEY] = client
+    return client
+
+
+def service_client() -> Client:
+    """The shared client for code that runs outside a user session.
+
+    Raises ``RuntimeError`` if ``SUPABASE_SERVICE_KEY`` is not set, rather
+    than acting with the anon key's much narrower access.
+    """
+    global _service_client
+    if _service_client is None:
+        if not SUPABASE_SERVICE_KEY:
+            raise RuntimeError("SUPABASE_SERVICE_KEY is not set; batch jobs and CLIs need the service key.")
+        client = new_client(SUPABASE_SERVICE_KEY)
+        with _lock:
+            if _service_client is None:
+                _service_client = client
+    return _service_client
+
+
+def auth_scope(client: Client) -> str:
+    """Who ``client`` reads as: ``anon``, ``service_role`` or ``authenticated:<user id>``.
+
+    Taken from the claims of the token the client currently sends, so it
+    follows sign-in, sign-out and token refreshes.
+    """
+    header = client.options.headers.get("Authorization", "")
+    token = header.removeprefix("Bearer ").strip()
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        role, user_id = claims.get("role"), claims.get("sub")
+        if role:
+            return f"{role}:{user_id}" if user_id else role
+    except (IndexError, ValueError):
+        pass
+    # not a JWT we can read; never share results with another token
+    return "token:" + hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+def pool_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+    requests = stats["requests"]
+    stats["reuse_rate"] = 1 - stats["connections_opened"] / requests if requests else 0.0
+    return stats